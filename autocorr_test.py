@@ -7,10 +7,8 @@ from typing import List, Optional, Tuple
 import matplotlib.pyplot as plt
 import numpy as np
 
-
-def validate_image_file(image_path: str) -> bool:
-    path = Path(image_path)
-    return path.exists() and path.is_file() and os.access(path, os.R_OK)
+import compressibility_map
+from block_source import BlockSource, image_name, open_source, validate_image_file
 
 
 def read_image_block(image_path: str, offset: int, block_size: int) -> Optional[bytes]:
@@ -28,21 +26,90 @@ def read_image_block(image_path: str, offset: int, block_size: int) -> Optional[
         print(f"Помилка читання файлу: {e}")
         return None
 
-def calculate_autocorrelation(data: bytes, max_lag: int = 50):
-    values = np.frombuffer(data, dtype=np.uint8)
-    values = values - np.mean(values)
+def _lagged_products(values: np.ndarray, lags: int, tile: int = 32768) -> List[int]:
+    # sum(values[i + lag] * values[i]) для всіх зсувів. Блок обробляється
+    # плитками, що поміщаються в кеш: у float64 перетворюється лише плитка із
+    # запасом на зсуви, а не весь блок. Добутки 8- і 16-бітних цілих у float64
+    # підсумовуються без округлення, тож результат точний
+    n = len(values)
+    cross = np.zeros(lags)
+    for tile_start in range(0, n, tile):
+        chunk = values[tile_start:tile_start + tile + lags - 1].astype(np.float64)
+        head = chunk[:tile]
+        for lag in range(lags):
+            tail = chunk[lag:lag + len(head)]
+            cross[lag] += np.dot(head[:len(tail)], tail)
+    return [int(value) for value in cross]
+
+
+def _edge_sums(values: np.ndarray, lags: int) -> Tuple[List[int], List[int]]:
+    # Суми та суми квадратів перших k елементів, k = 0..lags-1
+    edge = values[:lags - 1].astype(np.int64)
+    sums = [0] + np.cumsum(edge).tolist()
+    squares = [0] + np.cumsum(edge * edge).tolist()
+    return sums, squares
+
+
+def calculate_autocorrelation(data, max_lag: int = 50):
+    """
+    Коефіцієнти автокореляції для всіх зсувів 0..max_lag-1 за один прохід.
+
+    Для кожного зсуву результат збігається з
+    np.corrcoef(values[lag:], values[:-lag])[0, 1]. Суми та суми квадратів
+    обох підпослідовностей - це повні суми без кількох перших чи останніх
+    елементів, а взаємні добутки для всіх зсувів рахуються разом у
+    _lagged_products. Усі суми цілі, тож коваріації та дисперсії точні, і
+    стала підпослідовність розпізнається як нульова дисперсія. Для таких
+    зсувів значення рахується як раніше, через np.corrcoef: воно залежить від
+    залишку округлення при центруванні (близьке до 0 або nan).
+
+    Args:
+        data: bytes/memoryview або numpy-масив 8- чи 16-бітних цілих чисел
+        max_lag: Кількість зсувів
+    """
+    if isinstance(data, np.ndarray):
+        values = data.ravel()
+        if values.dtype.kind not in 'iu' or values.dtype.itemsize > 2:
+            raise ValueError(f"Непідтримуваний тип даних: {values.dtype}")
+    else:
+        values = np.frombuffer(data, dtype=np.uint8)
+
+    n = len(values)
+    # Як і раніше, для кореляції потрібно щонайменше два елементи
+    lags = min(max_lag, n - 1)
+    if lags <= 0:
+        return []
+
+    cross = _lagged_products(values, lags)
+    total, total_sq = int(np.sum(values, dtype=np.int64)), cross[0]
+    head, head_sq = _edge_sums(values, lags)
+    tail, tail_sq = _edge_sums(values[::-1], lags)
 
     autocorr = []
-    for lag in range(max_lag):
-        if len(values[lag:]) < 2:  # Перевірка на мінімальну довжину для кореляції
-            break
-        correlation = np.corrcoef(values[lag:], values[: -lag if lag > 0 else None])[0, 1]
-        autocorr.append(correlation)
+    degenerate = []
+    for lag in range(lags):
+        m = n - lag
+        # a = values[lag:], b = values[:m]
+        sum_a, sum_b = total - head[lag], total - tail[lag]
+        var_a = m * (total_sq - head_sq[lag]) - sum_a * sum_a
+        var_b = m * (total_sq - tail_sq[lag]) - sum_b * sum_b
+        if var_a == 0 or var_b == 0:
+            degenerate.append(lag)
+            autocorr.append(math.nan)
+            continue
+        cov = m * cross[lag] - sum_a * sum_b
+        autocorr.append(max(-1.0, min(1.0, cov / (math.sqrt(var_a) * math.sqrt(var_b)))))
+
+    if degenerate:
+        # Рідкісний випадок: блок сталий поза першими чи останніми lags байтами
+        centered = values - np.mean(values)
+        for lag in degenerate:
+            autocorr[lag] = float(np.corrcoef(centered[lag:], centered[:n - lag])[0, 1])
 
     return autocorr
 
 def analyze_block(data: bytes, threshold: float = 0.05) -> Tuple[float, bool]:
-    if not data:
+    if len(data) == 0:
         return 0.0, False
 
     autocorr = calculate_autocorrelation(data)
@@ -54,25 +121,43 @@ def analyze_block(data: bytes, threshold: float = 0.05) -> Tuple[float, bool]:
 
     return mean_autocorr, is_encrypted
 
-def analyze_image_region(image_path: str, start_offset: int, block_size: int, num_blocks: int = 10) -> List[
-    Tuple[int, float, bool]]:
+def analyze_image_region(image_path: str, start_offset: int, block_size: int, num_blocks: int = 10,
+                         source: Optional[BlockSource] = None,
+                         block_map: Optional[compressibility_map.CompressibilityMap] = None) -> List[Tuple[int, float, bool]]:
     results = []
 
-    for i in range(num_blocks):
-        offset = start_offset + (i * block_size)
-        data = read_image_block(image_path, offset, block_size)
+    # Файл відкривається та перевіряється один раз на весь регіон
+    own_source = source is None
+    if own_source:
+        source = BlockSource(image_path)
 
-        if (offset / 1024 / 1024) % 1 == 0:
-            print(offset / 1024 / 1024, end='\r')
+    try:
+        # Блоки в дірах розрідженого файлу нульові, їх автокореляція не визначена
+        length = max(0, min(num_blocks * block_size, source.size - start_offset))
+        in_hole = source.hole_blocks(start_offset, length, block_size)
+        zeros = memoryview(bytes(block_size)) if block_map is not None and in_hole.any() else None
+
+        for i, (offset, data) in enumerate(source.blocks(start_offset, block_size, num_blocks)):
+            if (offset / 1024 / 1024) % 1 == 0:
+                print(offset / 1024 / 1024, end='\r')
+
+            if in_hole[i]:
+                if block_map is not None:
+                    block_map.submit(offset, zeros[:len(data)])
+                continue
 
-        if data is None:
-            break
+            # Той самий блок стискається для карти стиснення, поки рахується автокореляція
+            if block_map is not None:
+                block_map.submit(offset, data)
 
-        mean_autocorr, is_encrypted = analyze_block(data)
-        if not np.isnan(mean_autocorr):
-            results.append((offset, mean_autocorr, is_encrypted))
+            mean_autocorr, is_encrypted = analyze_block(data)
+            if not np.isnan(mean_autocorr):
+                results.append((offset, mean_autocorr, is_encrypted))
 
-        del data
+            del data
+    finally:
+        if own_source:
+            source.close()
 
     return results
 
@@ -157,16 +242,35 @@ def plot_autocorrelation(data: bytes, title: str = "График автокор
     plt.grid(True)
     plt.show()
 
-def analyze_image_file(image_path: str, bs: int, plot: bool):
-    image_size = os.stat(image_path).st_size
-    image_blocks = max(1, int(math.floor(image_size / bs)))
-
-    results = analyze_image_region(image_path, start_offset=0, num_blocks=image_blocks, block_size=bs)
-
+def analyze_image_file(image_path, bs: int, plot: bool, map_path: Optional[str] = None,
+                       workers: Optional[int] = None):
+    # image_path - шлях або compacted_image.CompactedImage; графік і карта
+    # стиснення показують зсуви оригінального образу
+    block_map = compressibility_map.CompressibilityMap(workers=workers) if map_path else None
+    with open_source(image_path) as source:
+        image_blocks = max(1, int(math.floor(source.size / bs)))
+
+        results = analyze_image_region(source.path, start_offset=0, num_blocks=image_blocks, block_size=bs,
+                                       source=source, block_map=block_map)
+        if block_map is not None:
+            # Блоки - представлення mmap, тому стиснення завершується до закриття
+            offsets, ratios = block_map.finish()
+
+    # Статистика враховує всі блоки, зокрема ті, що не мають зсуву в образі
     autocorr_stat = list()
     for _, autocorr, _ in results:
         autocorr_stat.append(autocorr)
 
+    if not isinstance(image_path, str):
+        # Зсуви представлення переводяться в координати оригінального образу
+        if block_map is not None:
+            results, offsets, ratios = compressibility_map.original_block_analysis(image_path, results, offsets, ratios)
+        else:
+            results, _, _ = compressibility_map.original_block_analysis(image_path, results)
+    if block_map is not None:
+        compressibility_map.save_block_analysis(map_path, results, offsets, ratios)
+    image_path = image_name(image_path)
+
     if not autocorr_stat:
         raise ValueError("File is empty")
 
@@ -0,0 +1,254 @@
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import sparse_extents
+
+
+def validate_image_file(image_path: str) -> bool:
+    path = Path(image_path)
+    return path.exists() and path.is_file() and os.access(path, os.R_OK)
+
+
+@contextmanager
+def open_source(image, use_mmap: bool = True):
+    """
+    BlockSource для шляху до образу. Вже відкрите джерело (наприклад,
+    compacted_image.CompactedImage) повертається як є і не закривається.
+    """
+    if isinstance(image, str):
+        with BlockSource(image, use_mmap) as source:
+            yield source
+    else:
+        yield image
+
+
+@contextmanager
+def open_file(image):
+    """
+    Файл образу без буферизації або представлення (CompactedImage), що
+    читається як файл з початку. Представлення не закривається.
+    """
+    if isinstance(image, str):
+        with open(image, 'rb', buffering=0) as file:
+            yield file
+    else:
+        image.seek(0)
+        yield image
+
+
+def image_name(image) -> str:
+    # Назва образу для результатів і файлів звітів
+    return image if isinstance(image, str) else image.path
+
+
+def original_offsets(image, offsets):
+    # Зсуви в координатах оригінального образу (для представлень зі зміненими зсувами)
+    return offsets if isinstance(image, str) else image.to_original(offsets)
+
+
+class BlockSource(object):
+    """
+    Джерело блоків образу, яке відкривається один раз на весь аналіз.
+
+    У режимі mmap блоки повертаються як memoryview на відображену пам'ять без
+    копіювання. Без mmap дані читаються через os.preadv у буфер, що
+    використовується повторно, тому memoryview дійсний лише до наступного читання.
+    """
+    def __init__(self, image_path: str, use_mmap: bool = True, buffer_size: int = 1048576):
+        if not validate_image_file(image_path):
+            raise ValueError(f"Неможливо прочитати файл образу: {image_path}")
+
+        self._path = image_path
+        self._fd = os.open(image_path, os.O_RDONLY)
+        self._size = os.fstat(self._fd).st_size
+        self._mmap = None
+        self._view = None
+        self._buffer = None
+        self._extents = None
+
+        # Файл нульового розміру неможливо відобразити
+        if use_mmap and self._size > 0:
+            self._mmap = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+            self._view = memoryview(self._mmap)
+        else:
+            self._buffer = memoryview(bytearray(buffer_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _load_extents(self) -> None:
+        # Карта даних визначається один раз при першому зверненні
+        if self._extents is None:
+            self._extents = sparse_extents.data_extents(self._fd, self._size)
+            self._holes = sparse_extents.holes_of(self._extents, self._size)
+
+    @property
+    def data_extents(self) -> List[Tuple[int, int]]:
+        self._load_extents()
+        return self._extents
+
+    @property
+    def holes(self) -> List[Tuple[int, int]]:
+        """
+        Діри розрідженого файлу (start, end), що читаються як нулі.
+        """
+        self._load_extents()
+        return self._holes
+
+    @property
+    def fills(self) -> List[Tuple[int, int, bytes]]:
+        # Файл не описує заповнених регіонів, на відміну від sparse_image.SparseImage
+        return []
+
+    def hole_blocks(self, offset: int, length: int, block_size: int) -> np.ndarray:
+        return sparse_extents.hole_blocks(self.holes, offset, length, block_size)
+
+    def read_block(self, offset: int, block_size: int) -> memoryview:
+        """
+        Повертає блок за зсувом offset. Біля кінця файлу блок коротший,
+        за межами файлу - порожній.
+        """
+        end = min(offset + block_size, self._size)
+        if offset >= end:
+            return memoryview(b"")
+
+        if self._view is not None:
+            return self._view[offset:end]
+
+        if len(self._buffer) < end - offset:
+            self._buffer = memoryview(bytearray(end - offset))
+        target = self._buffer[:end - offset]
+        n = 0
+        while n < len(target):
+            read = os.preadv(self._fd, [target[n:]], offset + n)
+            if not read:
+                break
+            n += read
+        return target[:n]
+
+    def blocks(self, start_offset: int, block_size: int, num_blocks: Optional[int] = None) -> Iterator[Tuple[int, memoryview]]:
+        offset = start_offset
+        i = 0
+        while num_blocks is None or i < num_blocks:
+            data = self.read_block(offset, block_size)
+            if not data:
+                break
+            yield offset, data
+            offset += block_size
+            i += 1
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ще існують представлення блоків; mmap закриється разом з останнім із них
+                pass
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ReadOnlyView(object):
+    """
+    Спільна частина представлень образу зі зміненими зсувами
+    (compacted_image.CompactedImage, sparse_image.SparseImage): blocks() та
+    інтерфейс файлу лише для читання.
+
+    Підклас задає _size, _position, read_block, номер фрагмента зсуву
+    _extent_index і _copy_into, що збирає дані з фрагментів у буфер.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _extent_index(self, offset: int) -> int:
+        raise NotImplementedError
+
+    def _copy_into(self, target: memoryview, offset: int, first: int) -> None:
+        raise NotImplementedError
+
+    def read_block(self, offset: int, block_size: int) -> memoryview:
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def blocks(self, start_offset: int, block_size: int, num_blocks: Optional[int] = None) -> Iterator[Tuple[int, memoryview]]:
+        offset = start_offset
+        i = 0
+        while num_blocks is None or i < num_blocks:
+            data = self.read_block(offset, block_size)
+            if not data:
+                break
+            yield offset, data
+            offset += block_size
+            i += 1
+
+    # Інтерфейс файлу лише для читання
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"Від'ємний зсув: {offset}")
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        target = memoryview(buffer).cast("B")
+        length = max(0, min(len(target), self._size - self._position))
+        if length:
+            self._copy_into(target[:length], self._position, self._extent_index(self._position))
+        self._position += length
+        return length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = max(0, self._size - self._position)
+        data = bytes(self.read_block(self._position, size))
+        self._position += len(data)
+        return data
@@ -0,0 +1,159 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from block_source import image_name, open_file
+
+# Теоретична функція розподілу (рівномірний розподіл), як у kolmogorov_test
+UNIFORM_CDF = np.linspace(1 / 256, 1, 256)
+
+
+def histogram_dtype(block_size: int):
+    # Найменший тип, у який гарантовано вміщується кількість байтів блоку
+    if block_size < 2 ** 16:
+        return np.uint16
+    if block_size < 2 ** 32:
+        return np.uint32
+    return np.uint64
+
+
+def chunk_block_histograms(chunk, block_size: int) -> np.ndarray:
+    """
+    Гістограми байтів кожного блоку фрагмента: матриця (кількість блоків, 256).
+    Останній блок може бути неповним.
+    """
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    n_blocks = -(-len(data) // block_size)
+    n_full = len(data) // block_size
+    histograms = np.zeros((n_blocks, 256), dtype=histogram_dtype(block_size))
+    if n_full and block_size < 4096:
+        # Для дрібних блоків одна bincount на весь фрагмент: номер блоку * 256 + байт
+        index = data[:n_full * block_size].reshape(n_full, block_size).astype(np.uint32)
+        index += (np.arange(n_full, dtype=np.uint32) * 256)[:, None]
+        histograms[:n_full] = np.bincount(index.ravel(), minlength=n_full * 256).reshape(n_full, 256)
+    else:
+        for i in range(n_full):
+            histograms[i] = np.bincount(data[i * block_size:(i + 1) * block_size], minlength=256)
+    if n_blocks > n_full:
+        histograms[n_full] = np.bincount(data[n_full * block_size:], minlength=256)
+    return histograms
+
+
+def create_block_histograms(filename, block_size: int, bs: int = 1048576) -> Tuple[str, np.ndarray]:
+    # filename - шлях або compacted_image.CompactedImage, що читається як файл
+    chunk_size = max(1, bs // block_size) * block_size
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    rows = []
+    n = 0
+    with open_file(filename) as file:
+        while True:
+            read = 0
+            # Фрагмент дочитується повністю, щоб межі блоків не зсувались
+            while read < chunk_size:
+                part = file.readinto(view[read:])
+                if not part:
+                    break
+                read += part
+            if not read:
+                break
+            rows.append(chunk_block_histograms(view[:read], block_size))
+            n += read
+            print(n / 1024 / 1024, end='\r')
+    if not rows:
+        raise ValueError("File is empty")
+    return image_name(filename), np.concatenate(rows)
+
+
+def save_block_histograms(path: str, histograms: np.ndarray) -> None:
+    np.save(path, histograms)
+
+
+def block_sizes(histograms: np.ndarray) -> np.ndarray:
+    return histograms.sum(axis=1, dtype=np.float64)
+
+
+def shannon_entropy(histograms: np.ndarray) -> np.ndarray:
+    # Ентропія Шеннона кожного блоку, біт на байт
+    n = block_sizes(histograms)[:, None]
+    p = histograms / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(histograms > 0, p * np.log2(p), 0.0)
+    return -terms.sum(axis=1)
+
+
+def min_entropy(histograms: np.ndarray) -> np.ndarray:
+    # Мін-ентропія: -log2 ймовірності найчастішого байта
+    return -np.log2(histograms.max(axis=1) / block_sizes(histograms))
+
+
+def chi_square(histograms: np.ndarray) -> np.ndarray:
+    # Критерій Пірсона кожного блоку, як у pearson_criterion
+    expected = block_sizes(histograms)[:, None] / 256
+    return (np.square(histograms - expected) / expected).sum(axis=1)
+
+
+def ks_statistic(histograms: np.ndarray) -> np.ndarray:
+    # Статистика Колмогорова-Смірнова кожного блоку, як у kolmogorov_test
+    empirical_cdf = np.cumsum(histograms, axis=1, dtype=np.float64) / block_sizes(histograms)[:, None]
+    return np.abs(empirical_cdf - UNIFORM_CDF).max(axis=1)
+
+
+def block_statistics(histograms: np.ndarray, block_size: int) -> dict:
+    """
+    Статистики всіх блоків за матрицею гістограм.
+
+    Returns:
+        Масиви за назвами: offset, size, shannon, min_entropy, chi_square, ks
+    """
+    return {
+        "offset": np.arange(len(histograms), dtype=np.uint64) * block_size,
+        "size": block_sizes(histograms).astype(np.uint64),
+        "shannon": shannon_entropy(histograms),
+        "min_entropy": min_entropy(histograms),
+        "chi_square": chi_square(histograms),
+        "ks": ks_statistic(histograms),
+    }
+
+
+def high_entropy_regions(statistics: dict, threshold: float = 7.95) -> List[Tuple[int, int]]:
+    """
+    Регіони (start, end) із суміжних блоків, ентропія Шеннона яких не менша
+    за threshold, у форматі prepare.find_empty_regions.
+    """
+    mask = statistics["shannon"] >= threshold
+    # Межі серій блоків, що перевищують поріг
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], mask, [False])).astype(np.int8)))
+    regions = []
+    offsets = statistics["offset"]
+    sizes = statistics["size"]
+    for first, last in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        regions.append((int(offsets[first]), int(offsets[last - 1] + sizes[last - 1])))
+    return regions
+
+
+def block_map_path(filename: str) -> str:
+    return f"{filename.split('/')[-1]}_blocks"
+
+
+def save_block_map(path: str, histograms: np.ndarray, statistics: dict,
+                   threshold: float = 7.95) -> List[Tuple[int, int]]:
+    """
+    Зберігає матрицю гістограм у {path}.npy, статистики блоків у {path}.txt і
+    регіони з ентропією не менше threshold у {path}_high_entropy.txt.
+
+    Returns:
+        Регіони з високою ентропією
+    """
+    save_block_histograms(f"{path}.npy", histograms)
+    with open(f"{path}.txt", "w") as file:
+        file.write("offset\tshannon\tmin_entropy\tchi_square\tks\n")
+        for row in zip(statistics["offset"].tolist(), statistics["shannon"].tolist(),
+                       statistics["min_entropy"].tolist(), statistics["chi_square"].tolist(),
+                       statistics["ks"].tolist()):
+            file.write("{}\t{:.6f}\t{:.6f}\t{:.3f}\t{:.6f}\n".format(*row))
+    regions = high_entropy_regions(statistics, threshold)
+    with open(f"{path}_high_entropy.txt", "w") as file:
+        for start, end in regions:
+            file.write(f"{start}\t{end}\n")
+    return regions
@@ -0,0 +1,88 @@
+from collections import Counter
+from typing import Tuple, Union
+
+import numpy as np
+
+from block_source import image_name, open_source
+
+
+def empty_histogram() -> np.ndarray:
+    return np.zeros(256, dtype=np.uint64)
+
+
+def update_histogram(histogram: np.ndarray, chunk) -> np.ndarray:
+    """
+    Додає до гістограми кількості байтів блоку. chunk може бути bytes,
+    bytearray або memoryview - дані не копіюються.
+    """
+    if len(chunk):
+        counts = np.bincount(np.frombuffer(chunk, dtype=np.uint8), minlength=256)
+        np.add(histogram, counts, out=histogram, casting="unsafe")
+    return histogram
+
+
+def histogram_of(chunk) -> np.ndarray:
+    return update_histogram(empty_histogram(), chunk)
+
+
+def as_counts(byte_counts: Union[np.ndarray, Counter, dict]) -> np.ndarray:
+    """
+    Приводить гістограму (масив з 256 елементів або Counter) до масиву uint64.
+    """
+    if isinstance(byte_counts, np.ndarray):
+        if byte_counts.shape != (256,):
+            raise ValueError(f"Гістограма повинна мати 256 елементів, а не {byte_counts.shape}")
+        return byte_counts.astype(np.uint64, copy=False)
+    counts = empty_histogram()
+    for byte_value, count in byte_counts.items():
+        counts[byte_value] = count
+    return counts
+
+
+def to_counter(histogram: np.ndarray) -> Counter:
+    # Counter, як у Counter(chunk): лише байти, що зустрічаються
+    return Counter({byte_value: count for byte_value, count in enumerate(histogram.tolist()) if count})
+
+
+def add_fills(histogram: np.ndarray, fills, start: int, end: int) -> int:
+    """
+    Додає до гістограми частини заповнених регіонів (start, end, шаблон), що
+    лежать у [start, end), без читання даних. Шаблон повторюється від початку регіону.
+
+    Returns:
+        Кількість врахованих байтів
+    """
+    total = 0
+    for fill_start, fill_end, pattern in fills:
+        first, last = max(start, fill_start), min(end, fill_end)
+        if first >= last:
+            continue
+        # Кількість кожного байта шаблону: повні повтори плюс залишок з урахуванням фази
+        phase = (first - fill_start) % len(pattern)
+        repeats, remainder = divmod(last - first, len(pattern))
+        rotated = np.frombuffer(pattern[phase:] + pattern[:phase], dtype=np.uint8)
+        counts = np.bincount(rotated, minlength=256) * repeats + np.bincount(rotated[:remainder], minlength=256)
+        np.add(histogram, counts, out=histogram, casting="unsafe")
+        total += last - first
+    return total
+
+
+def create_histogram(filename, bs: int) -> Tuple[str, int, np.ndarray]:
+    """
+    Гістограма байтів файлу (шлях, compacted_image.CompactedImage або
+    sparse_image.SparseImage). Діри розрідженого файлу не читаються, а
+    враховуються як нульові байти; заповнені регіони рахуються за шаблоном.
+    """
+    histogram = empty_histogram()
+    # Без mmap блоки читаються у буфер, що використовується повторно
+    with open_source(filename, use_mmap=False) as source:
+        size = source.size
+        extents = source.data_extents
+        filled = add_fills(histogram, source.fills, 0, size)
+        histogram[0] += size - filled - sum(end - start for start, end in extents)
+        for start, end in extents:
+            for offset, chunk in source.blocks(start, bs, -(-(end - start) // bs)):
+                chunk = chunk[:end - offset]
+                print((offset + len(chunk)) / 1024 / 1024, end='\r')
+                update_histogram(histogram, chunk)
+    return image_name(filename), size, histogram
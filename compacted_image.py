@@ -0,0 +1,232 @@
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import fill_detection
+import result_cache
+import sparse_extents
+from block_source import BlockSource, ReadOnlyView
+
+
+class CompactedImage(ReadOnlyView):
+    """
+    Представлення образу без порожніх регіонів, яке замінює файл _opt.
+
+    Дані не копіюються: читання (read, readinto, зрізи) переводиться у зсуви
+    оригінального образу, відкритого через BlockSource. Об'єкт також має
+    інтерфейс BlockSource (size, read_block, blocks, holes), тож його можна
+    передавати аналізаторам замість шляху до образу.
+    """
+    def __init__(self, image_path: str, extents: List[Tuple[int, int]], image_fingerprint: Optional[dict] = None):
+        self._image_path = image_path
+        self._extents = [(int(start), int(end)) for start, end in extents if end > start]
+        self._fingerprint = image_fingerprint or result_cache.fingerprint(image_path)
+        self._source = self._open_source(image_path)
+        self._holes = None
+        # Початки діапазонів в оригінальних і стиснених координатах
+        self._original = np.array([start for start, _ in self._extents], dtype=np.int64)
+        lengths = np.array([end - start for start, end in self._extents], dtype=np.int64)
+        self._compacted = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self._size = int(self._compacted[-1])
+        self._position = 0
+
+    @classmethod
+    def from_empty_regions(cls, image_path: str, empty_regions: List[Tuple[int, int]]) -> "CompactedImage":
+        size = os.path.getsize(image_path)
+        return cls(image_path, sparse_extents.holes_of(empty_regions, size))
+
+    @classmethod
+    def build(cls, image_path: str, block_size: int = 4096, kinds=fill_detection.DEFAULT_KINDS) -> "CompactedImage":
+        with BlockSource(image_path) as source:
+            empty_regions = fill_detection.scan_empty_regions(source, 0, source.size, block_size,
+                                                              fill_detection.resolve_kinds(kinds))
+        return cls.from_empty_regions(image_path, empty_regions)
+
+    @classmethod
+    def load(cls, path: str, image_path: Optional[str] = None) -> "CompactedImage":
+        with open(path, "r") as file:
+            meta = json.load(file)
+        image_path = image_path or meta["image_path"]
+        # Як і HistogramIndex, образ можна перемістити, але не змінити
+        current = result_cache.fingerprint(image_path)
+        if (current["size"], current["sample_hash"]) != (meta["fingerprint"]["size"], meta["fingerprint"]["sample_hash"]):
+            raise ValueError(f"Образ змінився після побудови карти діапазонів: {image_path}")
+        return cls(image_path, meta["extents"], current)
+
+    @classmethod
+    def open(cls, image_path: str, path: Optional[str] = None, block_size: int = 4096,
+             kinds=fill_detection.DEFAULT_KINDS) -> "CompactedImage":
+        """
+        Завантажує збережену карту діапазонів або будує і зберігає нову, якщо
+        карти немає, образ змінився або карта побудована з іншими параметрами.
+        """
+        path = path or extent_map_path(image_path)
+        params = map_params(block_size, kinds)
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                saved_params = json.load(file).get("params")
+            if saved_params == params:
+                try:
+                    return cls.load(path, image_path)
+                except ValueError:
+                    pass
+        image = cls.build(image_path, block_size, kinds)
+        image.save(path, params)
+        return image
+
+    def save(self, path: str, params: Optional[dict] = None) -> None:
+        """
+        Зберігає карту діапазонів (JSON) з відбитком образу і параметрами пошуку
+        порожніх регіонів.
+        """
+        with open(path, "w") as file:
+            json.dump({"image_path": self._image_path, "extents": self._extents, "fingerprint": self._fingerprint,
+                       "params": params}, file)
+
+    def _open_source(self, image_path: str):
+        return BlockSource(image_path)
+
+    def __reduce__(self):
+        # Процеси пулу відкривають власне представлення того ж образу
+        return self.__class__, (self._image_path, self._extents, self._fingerprint)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            if step != 1:
+                raise ValueError("Крок зрізу не підтримується")
+            return bytes(self.read_block(start, max(0, stop - start)))
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError("Зсув за межами образу")
+        return self.read_block(key, 1)[0]
+
+    @property
+    def image_path(self) -> str:
+        return self._image_path
+
+    @property
+    def path(self) -> str:
+        # Назва, під якою зберігаються результати, як раніше для файлу _opt
+        stem, extension = os.path.splitext(self._image_path)
+        return f"{stem}_opt{extension}"
+
+    @property
+    def extents(self) -> List[Tuple[int, int]]:
+        # Діапазони оригінального образу, що залишились
+        return list(self._extents)
+
+    @property
+    def empty_regions(self) -> List[Tuple[int, int]]:
+        # Вилучені регіони у форматі prepare.find_empty_regions
+        return sparse_extents.holes_of(self._extents, self._source.size)
+
+    @property
+    def data_extents(self) -> List[Tuple[int, int]]:
+        return [(0, self._size)] if self._size else []
+
+    @property
+    def holes(self) -> List[Tuple[int, int]]:
+        """
+        Діри оригінального образу, що лишились у діапазонах, у координатах
+        представлення. Якщо нульові блоки вважаються порожніми, діри вже вилучені.
+        """
+        if self._holes is None:
+            holes = []
+            for idx, ((start, _), offset) in enumerate(zip(self._extents, self._compacted[:-1].tolist())):
+                holes += [(hole_start - start + offset, hole_end - start + offset)
+                          for hole_start, hole_end in self._extent_holes(idx)]
+            self._holes = sparse_extents.merge(holes)
+        return self._holes
+
+    def _extent_holes(self, idx: int) -> List[Tuple[int, int]]:
+        # Діри оригінального образу в діапазоні idx
+        start, end = self._extents[idx]
+        return sparse_extents.clip(self._source.holes, start, end)
+
+    @property
+    def fills(self) -> List[Tuple[int, int, bytes]]:
+        return []
+
+    def hole_blocks(self, offset: int, length: int, block_size: int) -> np.ndarray:
+        return sparse_extents.hole_blocks(self.holes, offset, length, block_size)
+
+    def to_original(self, offset):
+        """
+        Зсув у стисненому образі -> зсув в оригінальному (число або масив).
+        """
+        offsets = np.asarray(offset, dtype=np.int64)
+        if ((offsets < 0) | (offsets > self._size)).any():
+            raise ValueError("Зсув за межами стисненого образу")
+        if not len(self._original):
+            return offsets if offsets.ndim else 0
+        # Кінець стисненого образу відповідає кінцю останнього діапазону
+        idx = np.minimum(np.searchsorted(self._compacted, offsets, side="right") - 1, len(self._original) - 1)
+        result = self._original[idx] + offsets - self._compacted[idx]
+        return result if result.ndim else int(result)
+
+    def to_compacted(self, offset):
+        """
+        Зсув в оригінальному образі -> зсув у стисненому. Зсув у вилученому
+        регіоні не має відповідника.
+        """
+        offsets = np.asarray(offset, dtype=np.int64)
+        order = self._original_order()
+        if not len(order):
+            raise ValueError("Зсув лежить у вилученому регіоні")
+        # Діапазони не обов'язково йдуть за зростанням зсувів в образі
+        position = np.maximum(np.searchsorted(self._original[order], offsets, side="right") - 1, 0)
+        idx = order[position]
+        inside = (offsets >= self._original[idx]) & (offsets - self._original[idx] < np.diff(self._compacted)[idx])
+        if not inside.all():
+            raise ValueError("Зсув лежить у вилученому регіоні")
+        result = self._compacted[idx] + offsets - self._original[idx]
+        return result if result.ndim else int(result)
+
+    def _original_order(self) -> np.ndarray:
+        # Номери діапазонів, що мають відповідник в образі, за зростанням зсуву
+        return np.argsort(self._original, kind="stable")
+
+    def _extent_index(self, offset: int) -> int:
+        return int(np.searchsorted(self._compacted, offset, side="right")) - 1
+
+    def read_block(self, offset: int, block_size: int) -> memoryview:
+        """
+        Блок стисненого образу. Блок у межах одного діапазону повертається без
+        копіювання, блок на межі діапазонів збирається в новий буфер.
+        """
+        end = min(offset + block_size, self._size)
+        if offset >= end:
+            return memoryview(b"")
+        first = self._extent_index(offset)
+        if end <= self._compacted[first + 1]:
+            return self._source.read_block(int(self._original[first] + offset - self._compacted[first]), end - offset)
+        buffer = bytearray(end - offset)
+        self._copy_into(memoryview(buffer), offset, first)
+        return memoryview(buffer)
+
+    def _copy_into(self, target: memoryview, offset: int, first: int) -> None:
+        position = 0
+        idx = first
+        while position < len(target):
+            extent_offset = offset + position - self._compacted[idx]
+            length = min(len(target) - position, int(self._compacted[idx + 1] - self._compacted[idx] - extent_offset))
+            target[position:position + length] = self._source.read_block(int(self._original[idx] + extent_offset),
+                                                                         length)
+            position += length
+            idx += 1
+
+    def close(self):
+        self._source.close()
+
+
+def map_params(block_size: int = 4096, kinds=fill_detection.DEFAULT_KINDS) -> dict:
+    # Параметри пошуку порожніх регіонів, з якими побудована карта
+    return {"block_size": block_size, "kinds": sorted(kinds)}
+
+
+def extent_map_path(filename: str) -> str:
+    return f"{filename.split('/')[-1]}_extents.json"
@@ -0,0 +1,90 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import compression_engine
+
+
+class CompressibilityMap(object):
+    """
+    Коефіцієнт стиснення кожного блоку, стиснутого незалежно швидким кодеком
+    (compression_engine.FAST_CODECS) на пулі потоків.
+
+    Блоки передаються з тими самими зсувами, що й в
+    autocorr_test.analyze_image_region, тож масиви обох аналізів збігаються.
+    Переданий блок має лишатися дійсним до завершення його стиснення
+    (memoryview на mmap або bytes).
+    """
+    def __init__(self, codec: str = "zstd", workers: Optional[int] = None):
+        codecs = dict(compression_engine.FAST_CODECS)
+        if codec not in codecs:
+            raise ValueError(f"Невідомий кодек: {codec}")
+        self._codec = codecs[codec]
+        workers = workers or os.cpu_count()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = deque()
+        self._max_pending = workers * 4
+        self._offsets = []
+        self._ratios = []
+
+    def _collect(self, limit: int) -> None:
+        while len(self._pending) > limit:
+            offset, size, future = self._pending.popleft()
+            self._offsets.append(offset)
+            self._ratios.append(size / future.result())
+
+    def submit(self, offset: int, data) -> None:
+        self._pending.append((offset, len(data), self._executor.submit(self._codec, data)))
+        self._collect(self._max_pending)
+
+    def finish(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (зсуви блоків, коефіцієнти стиснення) у порядку передачі блоків
+        """
+        try:
+            self._collect(0)
+        finally:
+            self._executor.shutdown()
+        return np.array(self._offsets, dtype=np.uint64), np.array(self._ratios, dtype=np.float32)
+
+
+def block_analysis_path(filename: str) -> str:
+    return f"{filename.split('/')[-1]}_block_analysis.npz"
+
+
+def save_block_analysis(path: str, autocorr_results: List[Tuple[int, float, bool]], offsets: np.ndarray,
+                        ratios: np.ndarray) -> None:
+    """
+    Зберігає карту стиснення разом з результатами analyze_image_region.
+    Блоки, для яких автокореляція не визначена (nan), мають autocorr = nan.
+    """
+    autocorr = np.full(len(offsets), np.nan, dtype=np.float64)
+    is_encrypted = np.zeros(len(offsets), dtype=bool)
+    positions = {offset: idx for idx, offset in enumerate(offsets.tolist())}
+    for offset, mean_autocorr, encrypted in autocorr_results:
+        idx = positions[offset]
+        autocorr[idx] = mean_autocorr
+        is_encrypted[idx] = encrypted
+    np.savez(path, offset=offsets, ratio=ratios, autocorr=autocorr, is_encrypted=is_encrypted)
+
+
+def original_block_analysis(view, autocorr_results: List[Tuple[int, float, bool]],
+                            offsets: Optional[np.ndarray] = None, ratios: Optional[np.ndarray] = None):
+    """
+    Результати analyze_image_region і карта стиснення представлення в
+    координатах оригінального образу. Блоки, що не мають відповідника в образі
+    (to_original повертає -1, наприклад ZERO діапазони логічних розділів),
+    пропускаються.
+    """
+    results = [(original, mean, is_enc) for original, mean, is_enc in
+               ((view.to_original(offset), mean, is_enc) for offset, mean, is_enc in autocorr_results)
+               if original >= 0]
+    if offsets is not None:
+        originals = np.asarray(view.to_original(offsets.astype(np.int64)), dtype=np.int64)
+        mapped = originals >= 0
+        offsets, ratios = originals[mapped].astype(np.uint64), ratios[mapped]
+    return results, offsets, ratios
@@ -0,0 +1,146 @@
+import bz2
+import lzma
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import lz4.frame
+import zstandard
+
+from block_source import open_source
+
+
+def _gzip_size(data) -> int:
+    # Як pigz: рівень 6, формат gzip
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return len(compressor.compress(data)) + len(compressor.flush())
+
+
+def _lz4_size(data) -> int:
+    return len(lz4.frame.compress(data))
+
+
+def _bz2_size(data) -> int:
+    # Як lbzip2: рівень 9 (блоки по 900 КБ)
+    return len(bz2.compress(data, 9))
+
+
+def _zstd_size(data) -> int:
+    # Як zstd без параметрів: рівень 3
+    return len(zstandard.ZstdCompressor(level=3).compress(data))
+
+
+def _xz_size(data) -> int:
+    # Як pixz: пресет 6
+    return len(lzma.compress(data, format=lzma.FORMAT_XZ, preset=6))
+
+
+# Кодеки у порядку compression_test.COMPRESSORS. Усі вони звільняють GIL на
+# час стиснення, тому фрагменти стискаються паралельно у пулі потоків
+CODECS: List[Tuple[str, Callable]] = [
+    ("gzip", _gzip_size),
+    ("lz4", _lz4_size),
+    ("bz2", _bz2_size),
+    ("zstd", _zstd_size),
+    ("xz", _xz_size),
+]
+
+
+def _zstd_fast_size(data) -> int:
+    return len(zstandard.ZstdCompressor(level=1).compress(data))
+
+
+# Швидкі налаштування для покаблочних карт, де важлива різниця між блоками,
+# а не точний коефіцієнт
+FAST_CODECS: List[Tuple[str, Callable]] = [
+    ("zstd", _zstd_fast_size),
+    ("lz4", _lz4_size),
+]
+
+
+class CompressionEngine(object):
+    """
+    Стискає незалежні фрагменти даних усіма кодеками на спільному пулі потоків
+    і рахує лише розмір виходу, нічого не записуючи.
+
+    submit() приймає фрагмент, що лишається дійсним до завершення (memoryview
+    на mmap або bytes), feed() копіює довільні блоки і формує з них фрагменти
+    розміром chunk_size. Кількість фрагментів в обробці обмежена, щоб пам'ять
+    не залежала від розміру образу.
+    """
+    def __init__(self, codecs: List[Tuple[str, Callable]] = None, workers: Optional[int] = None,
+                 chunk_size: int = 4194304):
+        self._codecs = codecs or CODECS
+        self._workers = workers or os.cpu_count()
+        self._chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        self._pending = deque()
+        self._max_pending = self._workers * 2 * len(self._codecs)
+        self._sizes = [0] * len(self._codecs)
+        self._input_size = 0
+        self._staging = bytearray()
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    def _collect(self, limit: int) -> None:
+        while len(self._pending) > limit:
+            idx, future = self._pending.popleft()
+            self._sizes[idx] += future.result()
+
+    def submit(self, chunk) -> None:
+        self._input_size += len(chunk)
+        for idx, (_, codec) in enumerate(self._codecs):
+            self._pending.append((idx, self._executor.submit(codec, chunk)))
+        self._collect(self._max_pending)
+
+    def feed(self, data) -> None:
+        self._staging += data
+        while len(self._staging) >= self._chunk_size:
+            self.submit(bytes(self._staging[:self._chunk_size]))
+            del self._staging[:self._chunk_size]
+
+    def finish(self) -> Dict[str, int]:
+        """
+        Returns:
+            Розмір стиснених даних для кожного кодека
+        """
+        # Порожній вхід теж стискається, щоб розмір заголовків був ненульовим
+        if self._staging or not self._input_size:
+            self.submit(bytes(self._staging))
+            self._staging = bytearray()
+        try:
+            self._collect(0)
+        finally:
+            self._executor.shutdown()
+        return {name: size for (name, _), size in zip(self._codecs, self._sizes)}
+
+    def ratios(self, sizes: Dict[str, int]) -> List[float]:
+        return [self._input_size / sizes[name] for name, _ in self._codecs]
+
+
+def compress_file(image_path, workers: Optional[int] = None, chunk_size: int = 4194304,
+                  codecs: List[Tuple[str, Callable]] = None) -> List[float]:
+    """
+    Коефіцієнти стиснення образу кожним кодеком за одне читання через mmap.
+
+    Args:
+        image_path: Шлях до образу або compacted_image.CompactedImage
+        workers: Кількість ядер для стиснення (за замовчуванням усі)
+        chunk_size: Розмір незалежно стиснених фрагментів
+        codecs: Кодеки (назва, функція розміру), за замовчуванням CODECS
+
+    Returns:
+        Коефіцієнти у порядку кодеків
+    """
+    engine = CompressionEngine(codecs, workers, chunk_size)
+    with open_source(image_path) as source:
+        for offset, chunk in source.blocks(0, chunk_size):
+            engine.submit(chunk)
+            print(offset / 1024 / 1024, end='\r')
+        # Фрагменти - представлення mmap, тому всі стиснення завершуються до закриття
+        sizes = engine.finish()
+    return engine.ratios(sizes)
@@ -0,0 +1,141 @@
+import math
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import compression_engine
+from block_source import BlockSource, open_source
+
+
+def ratio_interval(input_sizes, compressed_sizes, population: int,
+                   confidence: float = 0.95) -> Tuple[float, float, float]:
+    """
+    Оцінка коефіцієнта стиснення (сума входу / сума виходу) за вибіркою блоків
+    і довірчий інтервал з поправкою на скінченну сукупність.
+
+    Інтервал будується для частки стиснених даних (сума виходу / сума входу),
+    знаменник якої майже сталий, і потім обертається: пряма лінеаризація
+    коефіцієнта занижує верхню межу, коли вибірка змішує порожні й випадкові блоки.
+
+    Returns:
+        (оцінка, нижня межа, верхня межа)
+    """
+    input_sizes = np.asarray(input_sizes, dtype=np.float64)
+    compressed_sizes = np.asarray(compressed_sizes, dtype=np.float64)
+    n = len(input_sizes)
+    fraction = compressed_sizes.sum() / input_sizes.sum()
+    ratio = 1 / fraction
+    if n >= population:
+        # Стиснуто весь образ - значення точне
+        return ratio, ratio, ratio
+    if n < 2:
+        return ratio, 0.0, math.inf
+
+    residuals = compressed_sizes - fraction * input_sizes
+    fpc = 1 - n / population
+    standard_error = math.sqrt(fpc * residuals.var(ddof=1) / n) / input_sizes.mean()
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    low_fraction = fraction - z * standard_error
+    high_fraction = fraction + z * standard_error
+    return ratio, 1 / high_fraction, 1 / low_fraction if low_fraction > 0 else math.inf
+
+
+def stratified_offsets(size: int, block_size: int, samples: int, seed: int = 0) -> List[int]:
+    """
+    Зсуви вибірки блоків: образ ділиться на samples рівних страт, з кожної
+    випадково обирається один вирівняний блок.
+    """
+    n_blocks = max(1, -(-size // block_size))
+    if samples >= n_blocks:
+        return [i * block_size for i in range(n_blocks)]
+    rng = random.Random(seed)
+    bounds = np.linspace(0, n_blocks, samples + 1).astype(np.int64).tolist()
+    return [rng.randrange(lo, hi) * block_size for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def _compress_blocks(source: BlockSource, offsets: List[int], block_size: int, codecs, executor) -> np.ndarray:
+    # Розміри виходу: рядок на блок, стовпець на кодек
+    futures = [[executor.submit(codec, source.read_block(offset, block_size)) for _, codec in codecs]
+               for offset in offsets]
+    return np.array([[future.result() for future in row] for row in futures], dtype=np.int64).reshape(-1, len(codecs))
+
+
+def sample_ratios(image_path, samples: int = 128, block_size: int = 1048576, confidence: float = 0.95,
+                  workers: Optional[int] = None, seed: int = 0,
+                  codecs: List[Tuple[str, Callable]] = None) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Коефіцієнти стиснення за стратифікованою вибіркою блоків.
+
+    Returns:
+        {кодек: (оцінка, нижня межа, верхня межа)}
+    """
+    codecs = codecs or compression_engine.CODECS
+    with open_source(image_path) as source, ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        offsets = stratified_offsets(source.size, block_size, samples, seed)
+        input_sizes = [len(source.read_block(offset, block_size)) for offset in offsets]
+        compressed = _compress_blocks(source, offsets, block_size, codecs, executor)
+        population = max(1, -(-source.size // block_size))
+
+    return {name: ratio_interval(input_sizes, compressed[:, idx], population, confidence)
+            for idx, (name, _) in enumerate(codecs)}
+
+
+def early_stop_ratios(image_path, threshold: float = 1.1, block_size: int = 1048576, confidence: float = 0.99,
+                      min_blocks: int = 32, workers: Optional[int] = None, seed: int = 0,
+                      codecs: List[Tuple[str, Callable]] = None) -> Dict[str, dict]:
+    """
+    Потокова оцінка з ранньою зупинкою: блоки стискаються у випадковому порядку,
+    і кодек зупиняється, щойно довірчий інтервал коефіцієнта не містить threshold.
+    Кодек, що не зупинився, доходить до кінця образу і дає точне значення.
+
+    Returns:
+        {кодек: {"ratio", "low", "high", "bytes", "decision"}}, де decision -
+        "above", "below" або None, якщо коефіцієнт точно дорівнює порогу
+    """
+    codecs = codecs or compression_engine.CODECS
+    workers = workers or os.cpu_count()
+    results = dict()
+
+    with open_source(image_path) as source, ThreadPoolExecutor(max_workers=workers) as executor:
+        population = max(1, -(-source.size // block_size))
+        # Випадковий порядок блоків робить проміжну оцінку незміщеною
+        order = list(range(population))
+        random.Random(seed).shuffle(order)
+
+        active = list(range(len(codecs)))
+        input_sizes = []
+        compressed = [[] for _ in codecs]
+        # Блоки обробляються партіями, щоб завантажити всі потоки між перевірками
+        batch = max(1, workers)
+        position = 0
+        while active and position < population:
+            offsets = [block * block_size for block in order[position:position + batch]]
+            position += len(offsets)
+            active_codecs = [codecs[idx] for idx in active]
+            sizes = _compress_blocks(source, offsets, block_size, active_codecs, executor)
+            input_sizes.extend(len(source.read_block(offset, block_size)) for offset in offsets)
+            for column, idx in enumerate(active):
+                compressed[idx].extend(sizes[:, column].tolist())
+            print(f"{position}/{population}", end='\r')
+
+            if position < min(min_blocks, population):
+                continue
+            still_active = []
+            for idx in active:
+                ratio, low, high = ratio_interval(input_sizes[:len(compressed[idx])], compressed[idx], population,
+                                                  confidence)
+                if low > threshold or high < threshold or position >= population:
+                    results[codecs[idx][0]] = {
+                        "ratio": ratio, "low": low, "high": high,
+                        "bytes": sum(input_sizes[:len(compressed[idx])]),
+                        "decision": "above" if ratio > threshold else "below" if ratio < threshold else None,
+                    }
+                else:
+                    still_active.append(idx)
+            active = still_active
+
+    return {name: results[name] for name, _ in codecs}
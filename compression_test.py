@@ -1,7 +1,40 @@
+import asyncio
 import os
+import shlex
 import subprocess
+import threading
 import time
 
+import compression_engine
+import compression_estimate
+from block_source import image_name, open_file
+
+# Зовнішні компресори у порядку виводу результатів
+COMPRESSORS = [
+    ("gzip", "pigz"),
+    ("lz4", "lz4"),
+    ("bz2", "lbzip2"),
+    ("zstd", "zstd -T12"),
+    ("xz", "pixz"),
+]
+
+
+def format_compression_result(filename: str, ratios: list) -> str:
+    return f"\r{filename.split("/")[-1]} {' '.join(str(ratio) for ratio in ratios)}"
+
+
+def format_estimate_result(filename: str, estimates: dict) -> str:
+    # Оцінка з довірчим інтервалом; для ранньої зупинки також прочитаний обсяг і рішення
+    parts = []
+    for name, estimate in estimates.items():
+        if isinstance(estimate, dict):
+            parts.append(f"{name}={estimate['ratio']:.4f}[{estimate['low']:.4f},{estimate['high']:.4f}]"
+                         f"/{estimate['bytes']}B/{estimate['decision']}")
+        else:
+            parts.append(f"{name}={estimate[0]:.4f}[{estimate[1]:.4f},{estimate[2]:.4f}]")
+    return f"\r{filename.split('/')[-1]} {' '.join(parts)}"
+
+
 def compression_test(filename: str) -> str:
     filesize = os.path.getsize(filename)
     with open(filename, 'rb') as file:
@@ -27,4 +60,143 @@ def compression_test(filename: str) -> str:
             subprocess.check_output(f"pixz < {filename} | wc -c", shell=True).decode())
         # print("XZ", end=" ")
 
-    return f"\r{filename.split("/")[-1]} {gzip_compression} {lz4_compression} {bz2_compression} {zstd_compression} {xz_compression}"
+    return format_compression_result(filename, [gzip_compression, lz4_compression, bz2_compression, zstd_compression, xz_compression])
+
+
+async def _count_output(stream: asyncio.StreamReader) -> int:
+    compressed_size = 0
+    while True:
+        data = await stream.read(1048576)
+        if not data:
+            return compressed_size
+        compressed_size += len(data)
+
+
+async def _feed_compressor(process: asyncio.subprocess.Process, queue: asyncio.Queue) -> None:
+    broken = False
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            break
+        if broken:
+            # Черга вичитується до кінця, щоб не зупинити читання для інших компресорів
+            continue
+        try:
+            process.stdin.write(chunk)
+            # drain чекає, поки компресор не забере дані з каналу
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # Компресор завершився; помилку покаже його код повернення
+            broken = True
+    process.stdin.close()
+    try:
+        await process.stdin.wait_closed()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+
+class CompressorFanOut(object):
+    """
+    Подає блоки даних на stdin усіх зовнішніх компресорів COMPRESSORS і рахує
+    розмір їхнього виходу.
+
+    Процеси обслуговує цикл asyncio в окремому потоці, тож feed() можна
+    викликати з синхронного коду: з читання файлу (compression_test_fan_out)
+    або з конвеєра (pipeline.CompressionAnalyzer). Черга кожного компресора
+    обмежена, тож повільний компресор (pixz) зупиняє feed(), а не накопичує
+    дані в пам'яті; швидші можуть випереджати на queue_size блоків.
+    Блок, переданий у feed(), не повинен змінюватися після виклику.
+    """
+    def __init__(self, queue_size: int = 4):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._start(queue_size))
+        except BaseException:
+            self._stop()
+            raise
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _start(self, queue_size: int) -> None:
+        self._processes = [await asyncio.create_subprocess_exec(*shlex.split(command), stdin=asyncio.subprocess.PIPE,
+                                                                stdout=asyncio.subprocess.PIPE)
+                           for _, command in COMPRESSORS]
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in self._processes]
+        self._readers = [asyncio.create_task(_count_output(process.stdout)) for process in self._processes]
+        self._feeders = [asyncio.create_task(_feed_compressor(process, queue))
+                         for process, queue in zip(self._processes, self._queues)]
+
+    async def _put(self, chunk) -> None:
+        for queue in self._queues:
+            await queue.put(chunk)
+
+    async def _finish(self) -> list:
+        await self._put(None)
+        await asyncio.gather(*self._feeders)
+        compressed_sizes = await asyncio.gather(*self._readers)
+        for process, (_, command) in zip(self._processes, COMPRESSORS):
+            if await process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, command)
+        return compressed_sizes
+
+    def feed(self, chunk) -> None:
+        if len(chunk):
+            self._call(self._put(chunk))
+
+    def finish(self) -> list:
+        """
+        Закриває stdin компресорів і повертає розміри їхнього виходу в порядку COMPRESSORS.
+        """
+        try:
+            return self._call(self._finish())
+        finally:
+            self._stop()
+
+
+def compression_test_fan_out(filename, chunk_size: int = 4194304, queue_size: int = 4) -> str:
+    """
+    Ті самі зовнішні компресори, що й compression_test, але образ читається
+    один раз, а кожен блок одночасно подається на stdin усіх п'яти процесів.
+
+    Args:
+        filename: Шлях до образу або compacted_image.CompactedImage
+        chunk_size: Розмір блоку читання
+        queue_size: На скільки блоків компресор може відставати від читання
+    """
+    filesize = os.path.getsize(filename) if isinstance(filename, str) else filename.size
+    fan_out = CompressorFanOut(queue_size)
+    # filename - шлях або compacted_image.CompactedImage, що читається як файл
+    with open_file(filename) as file:
+        n = 0
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            n += len(chunk)
+            print(n / 1024 / 1024, end='\r')
+            fan_out.feed(chunk)
+    compressed_sizes = fan_out.finish()
+    return format_compression_result(image_name(filename), [filesize / size for size in compressed_sizes])
+
+
+def compression_test_in_process(filename, workers: int = None) -> str:
+    # Ті самі п'ять алгоритмів без зовнішніх програм, на спільному пулі з workers ядер
+    return format_compression_result(image_name(filename), compression_engine.compress_file(filename, workers))
+
+
+def compression_test_sampled(filename, workers: int = None, samples: int = 128) -> str:
+    return format_estimate_result(image_name(filename),
+                                  compression_estimate.sample_ratios(filename, samples, workers=workers))
+
+
+def compression_test_early_stop(filename, threshold: float, workers: int = None) -> str:
+    return format_estimate_result(image_name(filename), compression_estimate.early_stop_ratios(filename, threshold,
+                                                                                               workers=workers))
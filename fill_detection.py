@@ -0,0 +1,193 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import sparse_extents
+
+# Типи блоків
+DATA, ZERO, ERASED, CONSTANT, PERIODIC = range(5)
+
+FILL_KINDS = {
+    "zero": ZERO,          # 0x00
+    "erased": ERASED,      # 0xFF, стерта флеш-пам'ять
+    "constant": CONSTANT,  # будь-який інший повторюваний байт
+    "periodic": PERIODIC,  # повторюваний шаблон будь-якої довжини до max_period байтів
+}
+# За замовчуванням порожніми, як і раніше, вважаються лише нульові блоки;
+# інші типи вмикаються явно (--fill-kinds), бо 0xFF, сталі байти і шаблони
+# трапляються і в структурованих даних
+DEFAULT_KINDS = ("zero",)
+
+_ONES = np.uint64(0x0101010101010101)
+_ALL_SET = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def resolve_kinds(kinds=None) -> np.ndarray:
+    """
+    Таблиця типів блоків, які вважаються порожніми: mask[тип] == True.
+    """
+    mask = np.zeros(len(FILL_KINDS) + 1, dtype=bool)
+    for kind in kinds or DEFAULT_KINDS:
+        if kind not in FILL_KINDS:
+            raise ValueError(f"Невідомий тип заповнення: {kind}")
+        mask[FILL_KINDS[kind]] = True
+    return mask
+
+
+def _periodic_rows(rows: np.ndarray, candidates: np.ndarray, max_period: int) -> np.ndarray:
+    """
+    Рядки байтів з candidates, що повторюють шаблон з будь-яким періодом до
+    max_period байтів (але не довшим за половину рядка): rows[i, p:] == rows[i, :-p].
+    """
+    max_period = min(max_period, rows.shape[1] // 2)
+    if not len(candidates) or not max_period:
+        return candidates[:0]
+    # Спершу для всіх періодів порівнюються два перші байти, далі ще кілька
+    # байтів лише для пар (рядок, період), що пройшли; блоки з даними майже
+    # ніколи не доходять до повної перевірки
+    selected = rows if len(candidates) == len(rows) else rows[candidates]
+    prefix = min(8, rows.shape[1] - max_period)
+    matches = selected[:, 1:max_period + 1] == selected[:, :1]
+    if prefix > 1:
+        matches &= selected[:, 2:max_period + 2] == selected[:, 1:2]
+    row_index, periods = np.divmod(np.flatnonzero(matches), max_period)
+    row_index, periods = candidates[row_index], periods + 1
+    for i in range(2, prefix):
+        keep = rows[row_index, periods + i] == rows[row_index, i]
+        row_index, periods = row_index[keep], periods[keep]
+    periodic = np.zeros(len(rows), dtype=bool)
+    for period in np.unique(periods).tolist():
+        matching = row_index[(periods == period) & ~periodic[row_index]]
+        if len(matching):
+            block = rows[matching]
+            periodic[matching[(block[:, period:] == block[:, :-period]).all(axis=1)]] = True
+    return np.flatnonzero(periodic)
+
+
+def _classify_full(data: np.ndarray, block_size: int, max_period: int) -> np.ndarray:
+    n_blocks = len(data) // block_size
+    # Довгі слова, якщо блок їх вміщує, інакше побайтово
+    word_size = 8 if block_size % 8 == 0 else 1
+    words = data.view(np.uint64 if word_size == 8 else np.uint8).reshape(n_blocks, block_size // word_size)
+    first = words[:, 0]
+    kinds = np.full(n_blocks, DATA, dtype=np.uint8)
+
+    # Блок з однакових слів - заповнення з періодом, що ділить довжину слова
+    uniform = (words == first[:, None]).all(axis=1)
+    if word_size == 8:
+        constant = uniform & (first == (first & np.uint64(0xFF)) * _ONES)
+        kinds[uniform] = PERIODIC
+        kinds[constant] = CONSTANT
+        kinds[constant & (first == 0)] = ZERO
+        kinds[constant & (first == _ALL_SET)] = ERASED
+    else:
+        kinds[uniform] = CONSTANT
+        kinds[uniform & (first == 0)] = ZERO
+        kinds[uniform & (first == 0xFF)] = ERASED
+
+    # Інші періоди перевіряються лише для блоків, що не складаються з одного
+    # повторюваного слова
+    candidates = np.flatnonzero(kinds == DATA)
+    kinds[_periodic_rows(data.reshape(n_blocks, block_size), candidates, max_period)] = PERIODIC
+    return kinds
+
+
+def _classify_tail(data: np.ndarray, max_period: int) -> int:
+    # Неповний останній блок перевіряється побайтово
+    if (data == data[0]).all():
+        return ZERO if data[0] == 0 else ERASED if data[0] == 0xFF else CONSTANT
+    if len(_periodic_rows(data[None, :], np.zeros(1, dtype=np.intp), max_period)):
+        return PERIODIC
+    return DATA
+
+
+def classify_blocks(chunk, block_size: int, max_period: int = 512) -> np.ndarray:
+    """
+    Тип кожного блоку фрагмента (DATA, ZERO, ERASED, CONSTANT, PERIODIC).
+    Останній блок може бути неповним.
+    """
+    data = np.frombuffer(chunk, dtype=np.uint8)
+    n_full = len(data) // block_size
+    kinds = np.empty(-(-len(data) // block_size), dtype=np.uint8)
+    if n_full:
+        kinds[:n_full] = _classify_full(data[:n_full * block_size], block_size, max_period)
+    if len(kinds) > n_full:
+        kinds[n_full] = _classify_tail(data[n_full * block_size:], max_period)
+    return kinds
+
+
+def empty_blocks(chunk, block_size: int, kinds_mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Маска порожніх блоків фрагмента для типів з resolve_kinds.
+    """
+    if kinds_mask is None:
+        kinds_mask = resolve_kinds()
+    return kinds_mask[classify_blocks(chunk, block_size)]
+
+
+def block_runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Серії (перший, наступний після останнього) блоків, для яких mask == True.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], mask, [False])).astype(np.int8)))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+class RegionBuilder(object):
+    """
+    Збирає регіони (start, end) з масок порожніх блоків послідовних фрагментів
+    у форматі prepare.find_empty_regions.
+    """
+    def __init__(self):
+        self._regions = []
+
+    @property
+    def regions(self) -> List[Tuple[int, int]]:
+        return self._regions
+
+    def update(self, offset: int, mask: np.ndarray, block_size: int, length: int) -> None:
+        for first, last in block_runs(mask):
+            start = offset + first * block_size
+            end = offset + min(last * block_size, length)
+            # Регіон, що доходить до кінця попереднього фрагмента, продовжується
+            if self._regions and self._regions[-1][1] == start:
+                self._regions[-1] = (self._regions[-1][0], end)
+            else:
+                self._regions.append((start, end))
+
+
+def fill_kind(pattern: bytes) -> int:
+    # Тип блоку, заповненого повторюваним шаблоном
+    return _classify_tail(np.frombuffer(pattern * 2, dtype=np.uint8), len(pattern))
+
+
+def scan_empty_regions(source, start: int, end: int, block_size: int, kinds_mask: Optional[np.ndarray] = None,
+                       window: int = 16777216) -> List[Tuple[int, int]]:
+    """
+    Порожні регіони діапазону [start, end) відкритого BlockSource. Блоки, що
+    лежать у дірах розрідженого файлу, не читаються і вважаються нульовими.
+    Блоки в заповнених регіонах джерела (fills) класифікуються за шаблоном.
+    """
+    if kinds_mask is None:
+        kinds_mask = resolve_kinds()
+    builder = RegionBuilder()
+    window = max(1, window // block_size) * block_size
+    fills = source.fills
+    fill_kinds = np.array([fill_kind(pattern) for _, _, pattern in fills], dtype=np.uint8)
+    for offset in range(start, end, window):
+        length = min(window, end - offset)
+        in_hole = source.hole_blocks(offset, length, block_size)
+        kinds = np.full(len(in_hole), ZERO, dtype=np.uint8)
+        skipped = in_hole
+        if fills:
+            in_fill = sparse_extents.region_blocks(fills, offset, length, block_size)
+            kinds[in_fill >= 0] = fill_kinds[in_fill[in_fill >= 0]]
+            skipped = in_hole | (in_fill >= 0)
+        # Класифікуються лише серії блоків з даними
+        for first, last in block_runs(~skipped):
+            chunk = source.read_block(offset + first * block_size, min(last * block_size, length) - first * block_size)
+            kinds[first:last] = classify_blocks(chunk, block_size)
+            del chunk
+        builder.update(offset, kinds_mask[kinds], block_size, length)
+        print("Analyzing: ", (offset + length) / 1048576, end='\r')
+    return builder.regions
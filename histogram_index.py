@@ -0,0 +1,168 @@
+import argparse
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import block_statistics
+import byte_histogram
+import result_cache
+from block_source import BlockSource
+
+
+def _paths(path: str) -> Tuple[str, str]:
+    return f"{path}.cumulative.npy", f"{path}.meta.json"
+
+
+def _save_meta(meta_path: str, image_path: str, block_size: int, image_fingerprint: dict) -> None:
+    with open(meta_path, "w") as file:
+        json.dump({"image_path": image_path, "block_size": block_size, "fingerprint": image_fingerprint}, file)
+
+
+class HistogramIndex(object):
+    """
+    Індекс накопичених гістограм байтів: рядок i містить кількості байтів у
+    [0, i * block_size). Гістограма будь-якого вирівняного діапазону - різниця
+    двох рядків (O(256)), невирівняні краї дочитуються з образу.
+
+    Рядок займає 2 КіБ, тому блок індексу має бути великим (за замовчуванням
+    1 МіБ); для дрібних блоків є block_statistics.
+    """
+    def __init__(self, image_path: str, block_size: int, cumulative: np.ndarray, image_fingerprint: dict):
+        self._image_path = image_path
+        self._block_size = block_size
+        self._cumulative = cumulative
+        self._fingerprint = image_fingerprint
+        self._size = image_fingerprint["size"]
+        self._source = None
+
+    @classmethod
+    def build(cls, image_path: str, path: str, block_size: int = 1048576, bs: int = 1048576) -> "HistogramIndex":
+        """
+        Будує індекс за одне читання образу і одразу пише його на диск.
+        """
+        cumulative_path, meta_path = _paths(path)
+        image_fingerprint = result_cache.fingerprint(image_path)
+        n_blocks = -(-image_fingerprint["size"] // block_size)
+        cumulative = open_memmap(cumulative_path, mode="w+", dtype=np.uint64, shape=(n_blocks + 1, 256))
+        cumulative[0] = 0
+
+        row = 1
+        chunk_blocks = max(1, bs // block_size)
+        with BlockSource(image_path) as source:
+            for offset, chunk in source.blocks(0, chunk_blocks * block_size):
+                histograms = block_statistics.chunk_block_histograms(chunk, block_size)
+                cumulative[row:row + len(histograms)] = np.cumsum(histograms, axis=0, dtype=np.uint64) + \
+                    cumulative[row - 1]
+                row += len(histograms)
+                print(offset / 1024 / 1024, end='\r')
+        cumulative.flush()
+
+        _save_meta(meta_path, image_path, block_size, image_fingerprint)
+        return cls(image_path, block_size, cumulative, image_fingerprint)
+
+    @classmethod
+    def load(cls, path: str, image_path: Optional[str] = None) -> "HistogramIndex":
+        cumulative_path, meta_path = _paths(path)
+        with open(meta_path, "r") as file:
+            meta = json.load(file)
+        image_path = image_path or meta["image_path"]
+        # Образ можна перемістити, але не змінити: час зміни і шлях не перевіряються
+        current = result_cache.fingerprint(image_path)
+        if (current["size"], current["sample_hash"]) != (meta["fingerprint"]["size"], meta["fingerprint"]["sample_hash"]):
+            raise ValueError(f"Образ змінився після побудови індексу: {image_path}")
+        return cls(image_path, meta["block_size"], np.load(cumulative_path, mmap_mode="r"), meta["fingerprint"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def block_range_histogram(self, first_block: int, last_block: int) -> np.ndarray:
+        """
+        Гістограма блоків [first_block, last_block) за двома рядками індексу.
+        """
+        return self._cumulative[last_block] - self._cumulative[first_block]
+
+    def _read_histogram(self, start: int, end: int) -> np.ndarray:
+        if start >= end:
+            return byte_histogram.empty_histogram()
+        if self._source is None:
+            self._source = BlockSource(self._image_path)
+        return byte_histogram.histogram_of(self._source.read_block(start, end - start))
+
+    def range_histogram(self, start: int, end: int) -> Tuple[str, int, np.ndarray]:
+        """
+        Гістограма байтів діапазону [start, end) у форматі create_histogram,
+        тобто придатна для calculate_kolmogorov_smirnov,
+        calculate_pearson_criterion та entropy_estimation.
+
+        Повні блоки беруться з індексу, читаються лише неповні крайні блоки.
+        """
+        start = max(0, start)
+        end = min(end, self._size)
+        if start >= end:
+            raise ValueError(f"Порожній діапазон: [{start}, {end})")
+
+        first_block = -(-start // self._block_size)
+        last_block = end // self._block_size
+        if first_block >= last_block:
+            # Діапазон не містить жодного повного блоку
+            counts = self._read_histogram(start, end)
+        else:
+            counts = self.block_range_histogram(first_block, last_block)
+            counts = counts + self._read_histogram(start, first_block * self._block_size)
+            counts = counts + self._read_histogram(last_block * self._block_size, end)
+        return f"{self._image_path}[{start}:{end}]", end - start, counts
+
+    def close(self):
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+
+def histogram_index_path(filename: str) -> str:
+    return f"{filename.split('/')[-1]}_histograms"
+
+
+def main():
+    import kolmogorov_test
+    import pearson_criterion
+    import primary_analysis
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("mode", choices=["build", "query"])
+    parser.add_argument("input_path")
+    parser.add_argument("start", type=int, nargs="?")
+    parser.add_argument("end", type=int, nargs="?")
+    parser.add_argument("--block-size", type=int, default=1048576)
+    parser.add_argument("--index")
+
+    args = parser.parse_args()
+    index_path = args.index or histogram_index_path(args.input_path)
+
+    if args.mode == "build":
+        HistogramIndex.build(args.input_path, index_path, args.block_size)
+        return
+
+    if args.start is None or args.end is None:
+        parser.error("query потребує start та end")
+    with HistogramIndex.load(index_path, args.input_path) as index:
+        name, n, counts = index.range_histogram(args.start, args.end)
+    print(kolmogorov_test.calculate_kolmogorov_smirnov(name, n, counts, False))
+    print(pearson_criterion.calculate_pearson_criterion(name, n, counts))
+    print(primary_analysis.entropy_estimation(name, n, counts))
+
+
+if __name__ == "__main__":
+    main()
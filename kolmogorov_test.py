@@ -1,20 +1,19 @@
 import time
 from collections import Counter
-from typing import Tuple
+from typing import Tuple, Union
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 import scipy
 import seaborn as sns
 
+import byte_histogram
 
-def calculate_kolmogorov_smirnov(filename: str, n: int, counter: Counter, plot: bool) -> Tuple[float, dict]:
+
+def calculate_kolmogorov_smirnov(filename: str, n: int, counter: Union[np.ndarray, Counter], plot: bool) -> Tuple[float, dict]:
+    counts = byte_histogram.as_counts(counter)
     # Створюємо емпіричну функцію розподілу
-    empirical_cdf = np.zeros(256)
-    cumsum = 0
-    for i in range(256):
-        cumsum += counter.get(i, 0)
-        empirical_cdf[i] = cumsum / n
+    empirical_cdf = np.cumsum(counts) / n
 
     # Теоретична функція розподілу (рівномірний розподіл)
     theoretical_cdf = np.linspace(1 / 256, 1, 256)
@@ -40,7 +39,7 @@ def calculate_kolmogorov_smirnov(filename: str, n: int, counter: Counter, plot:
         plt.xlabel("Байт")
         plt.ylabel("Количество вхождений")
         plt.grid(True, alpha=0.3)
-        plt.bar(counter.keys(), counter.values())
+        plt.bar(np.arange(256), counts)
         plt.tight_layout()
         plt.savefig(f"/home/gilah/distrib_{filename.split('/')[-1]}.png")
 
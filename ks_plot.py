@@ -5,11 +5,13 @@ from matplotlib import pyplot as plt
 import seaborn as sns
 from collections import Counter
 
+import byte_histogram
+
 def plot_file_cdf(filename_unopt: str, filename_opt: str, bs: int) -> None:
     n_unopt = 0
     n_opt = 0
-    counter_unopt = Counter("")
-    counter_opt = Counter("")
+    counter_unopt = byte_histogram.empty_histogram()
+    counter_opt = byte_histogram.empty_histogram()
 
     with open(filename_unopt, 'rb') as unopt_file, open(filename_opt, 'rb') as opt_file:
         while True:
@@ -18,7 +20,7 @@ def plot_file_cdf(filename_unopt: str, filename_opt: str, bs: int) -> None:
                 break
             n_unopt += len(chunk_unopt)
             print(n_unopt/1024/1024, end='\r')
-            counter_unopt += Counter(chunk_unopt)
+            byte_histogram.update_histogram(counter_unopt, chunk_unopt)
             del chunk_unopt
         print()
         while True:
@@ -27,7 +29,7 @@ def plot_file_cdf(filename_unopt: str, filename_opt: str, bs: int) -> None:
                 break
             n_opt += len(chunk_opt)
             print(n_opt / 1024 / 1024, end='\r')
-            counter_opt += Counter(chunk_opt)
+            byte_histogram.update_histogram(counter_opt, chunk_opt)
             del chunk_opt
 
     # Створюємо емпіричну функцію розподілу
@@ -49,13 +51,8 @@ def plot_file_cdf(filename_unopt: str, filename_opt: str, bs: int) -> None:
     plt.savefig(f"/home/gilah/cdf_{filename_unopt.split('/')[-1]}_{filename_opt.split('/')[-1]}.png")
 
 
-def calculate_emp_cdf(counter: Counter, n):
-    empirical_cdf = np.zeros(256)
-    cumsum = 0
-    for i in range(256):
-        cumsum += counter.get(i, 0)
-        empirical_cdf[i] = cumsum / n
-    return empirical_cdf
+def calculate_emp_cdf(counter, n):
+    return np.cumsum(byte_histogram.as_counts(counter)) / n
 
 with ProcessPoolExecutor(max_workers=8) as executor:
     executor.submit(plot_file_cdf,"/dataset/images/random_32M.img", "/dataset/images/plaintext.txt", bs=1048576)
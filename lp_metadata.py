@@ -0,0 +1,363 @@
+import hashlib
+import logging
+import os
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import result_cache
+import sparse_image
+from compacted_image import CompactedImage
+from pygpt.gpt_file import GPTFile
+from pygpt.partition_table_header import PartitionTableHeader
+
+# Формат метаданих динамічних розділів Android (system/core/fs_mgr/liblp/include/liblp/metadata_format.h)
+LP_METADATA_GEOMETRY_MAGIC = 0x616C4467
+LP_METADATA_HEADER_MAGIC = 0x414C5030
+LP_METADATA_MAJOR_VERSION = 10
+LP_PARTITION_RESERVED_BYTES = 4096
+LP_METADATA_GEOMETRY_SIZE = 4096
+LP_SECTOR_SIZE = 512
+
+LP_TARGET_TYPE_LINEAR = 0
+LP_TARGET_TYPE_ZERO = 1
+
+LP_PARTITION_ATTR_READONLY = 1 << 0
+LP_PARTITION_ATTR_SLOT_SUFFIXED = 1 << 1
+
+_GEOMETRY = struct.Struct("<II32sIII")
+_HEADER = struct.Struct("<IHHI32sI32s12I")
+_TABLE_DESCRIPTORS = ("partitions", "extents", "groups", "block_devices")
+_PARTITION = struct.Struct("<36sIIII")
+_EXTENT = struct.Struct("<QIQI")
+_GROUP = struct.Struct("<36sIQ")
+_BLOCK_DEVICE = struct.Struct("<QIIQ36sI")
+
+
+def _checksum_ok(raw: bytes, checksum_offset: int, checksum: bytes) -> bool:
+    # SHA-256 структури з обнуленим полем контрольної суми
+    data = bytearray(raw)
+    data[checksum_offset:checksum_offset + 32] = bytes(32)
+    return hashlib.sha256(data).digest() == checksum
+
+
+def _name(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode("ascii", "replace")
+
+
+class LpGeometry(object):
+    """
+    Геометрія метаданих: максимальний розмір і кількість слотів
+    """
+    def __init__(self, raw: bytes):
+        magic, struct_size, checksum, self._metadata_max_size, self._metadata_slot_count, \
+            self._logical_block_size = _GEOMETRY.unpack(raw[:_GEOMETRY.size])
+        if magic != LP_METADATA_GEOMETRY_MAGIC:
+            raise ValueError("Геометрію LP метаданих не знайдено")
+        if not _checksum_ok(raw[:struct_size], 8, checksum):
+            raise ValueError("Неправильна контрольна сума геометрії LP метаданих")
+
+    @property
+    def metadata_max_size(self) -> int:
+        return self._metadata_max_size
+
+    @property
+    def metadata_slot_count(self) -> int:
+        return self._metadata_slot_count
+
+    @property
+    def logical_block_size(self) -> int:
+        return self._logical_block_size
+
+
+class LpExtent(object):
+    def __init__(self, raw: bytes):
+        self._num_sectors, self._target_type, self._target_data, self._target_source = _EXTENT.unpack(raw)
+
+    def __repr__(self):
+        return '<LpExtent sectors={} type={} data={} source={}>'.format(
+            self._num_sectors, self._target_type, self._target_data, self._target_source)
+
+    @property
+    def num_sectors(self) -> int:
+        return self._num_sectors
+
+    @property
+    def target_type(self) -> int:
+        return self._target_type
+
+    @property
+    def target_data(self) -> int:
+        # Для LINEAR - перший сектор на блоковому пристрої target_source
+        return self._target_data
+
+    @property
+    def target_source(self) -> int:
+        return self._target_source
+
+    @property
+    def is_zero(self) -> bool:
+        return self._target_type == LP_TARGET_TYPE_ZERO
+
+
+class LpPartition(object):
+    def __init__(self, raw: bytes):
+        name, self._attributes, self._first_extent_index, self._num_extents, self._group_index = _PARTITION.unpack(raw)
+        self._name = _name(name)
+
+    def __repr__(self):
+        return '<LpPartition("{}") extents:[{} +{}], attributes: {}>'.format(
+            self._name, self._first_extent_index, self._num_extents, self._attributes)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def attributes(self) -> int:
+        return self._attributes
+
+    @property
+    def first_extent_index(self) -> int:
+        return self._first_extent_index
+
+    @property
+    def num_extents(self) -> int:
+        return self._num_extents
+
+    @property
+    def group_index(self) -> int:
+        return self._group_index
+
+
+class LpMetadata(object):
+    """
+    Метадані динамічних розділів (заголовок, таблиці розділів, діапазонів,
+    груп і блокових пристроїв) одного слоту, прочитані з розділу super, що
+    починається у base_offset образу. source - BlockSource або
+    sparse_image.SparseImage. Як і pygpt, при помилці основної копії читається резервна.
+    """
+    def __init__(self, source, base_offset: int = 0, slot: int = 0):
+        self._source = source
+        self._base_offset = base_offset
+        self._geometry = self._load_geometry()
+        if not 0 <= slot < self._geometry.metadata_slot_count:
+            raise ValueError(f"Слот {slot} відсутній (слотів: {self._geometry.metadata_slot_count})")
+        self._load_metadata(slot)
+
+    def _read(self, offset: int, length: int) -> bytes:
+        data = bytes(self._source.read_block(self._base_offset + offset, length))
+        if len(data) < length:
+            raise ValueError("LP метадані виходять за межі образу")
+        return data
+
+    def _load_geometry(self) -> LpGeometry:
+        try:
+            return LpGeometry(self._read(LP_PARTITION_RESERVED_BYTES, LP_METADATA_GEOMETRY_SIZE))
+        except ValueError as e:
+            logging.debug('Primary LP geometry is invalid ({}), trying the backup'.format(e))
+        return LpGeometry(self._read(LP_PARTITION_RESERVED_BYTES + LP_METADATA_GEOMETRY_SIZE,
+                                     LP_METADATA_GEOMETRY_SIZE))
+
+    def _load_metadata(self, slot: int) -> None:
+        metadata_start = LP_PARTITION_RESERVED_BYTES + 2 * LP_METADATA_GEOMETRY_SIZE
+        max_size = self._geometry.metadata_max_size
+        primary = metadata_start + slot * max_size
+        backup = metadata_start + (self._geometry.metadata_slot_count + slot) * max_size
+        try:
+            self._parse_metadata(self._read(primary, max_size))
+        except ValueError as e:
+            logging.debug('Primary LP metadata is invalid ({}), trying the backup'.format(e))
+            self._parse_metadata(self._read(backup, max_size))
+
+    def _parse_metadata(self, raw: bytes) -> None:
+        fields = _HEADER.unpack(raw[:_HEADER.size])
+        magic, major, self._minor_version, header_size, header_checksum, tables_size, tables_checksum = fields[:7]
+        if magic != LP_METADATA_HEADER_MAGIC:
+            raise ValueError("Заголовок LP метаданих не знайдено")
+        if major != LP_METADATA_MAJOR_VERSION:
+            raise ValueError(f"Непідтримувана версія LP метаданих: {major}.{self._minor_version}")
+        if not _checksum_ok(raw[:header_size], 12, header_checksum):
+            raise ValueError("Неправильна контрольна сума заголовка LP метаданих")
+        tables = raw[header_size:header_size + tables_size]
+        if hashlib.sha256(tables).digest() != tables_checksum:
+            raise ValueError("Неправильна контрольна сума таблиць LP метаданих")
+
+        entries = dict()
+        for idx, name in enumerate(_TABLE_DESCRIPTORS):
+            offset, num_entries, entry_size = fields[7 + idx * 3:10 + idx * 3]
+            entries[name] = [tables[offset + i * entry_size:offset + (i + 1) * entry_size] for i in range(num_entries)]
+
+        self._partitions = [LpPartition(entry[:_PARTITION.size]) for entry in entries["partitions"]]
+        self._extents = [LpExtent(entry[:_EXTENT.size]) for entry in entries["extents"]]
+        self._groups = [_name(_GROUP.unpack(entry[:_GROUP.size])[0]) for entry in entries["groups"]]
+        self._block_devices = [_name(_BLOCK_DEVICE.unpack(entry[:_BLOCK_DEVICE.size])[4])
+                               for entry in entries["block_devices"]]
+
+    @property
+    def geometry(self) -> LpGeometry:
+        return self._geometry
+
+    @property
+    def partitions(self) -> List[LpPartition]:
+        return self._partitions
+
+    @property
+    def extents(self) -> List[LpExtent]:
+        return self._extents
+
+    @property
+    def groups(self) -> List[str]:
+        return self._groups
+
+    @property
+    def block_devices(self) -> List[str]:
+        return self._block_devices
+
+    def partition_extents(self, partition: LpPartition) -> Tuple[List[Tuple[int, int]], List[bool]]:
+        """
+        Діапазони (start, end) логічного розділу в байтах образу і ознаки
+        ZERO діапазонів, для яких (0, довжина) - лише місце у розділі.
+        """
+        extents = []
+        zero = []
+        for extent in self._extents[partition.first_extent_index:partition.first_extent_index + partition.num_extents]:
+            length = extent.num_sectors * LP_SECTOR_SIZE
+            if not length:
+                continue
+            if extent.is_zero:
+                extents.append((0, length))
+                zero.append(True)
+                continue
+            if extent.target_type != LP_TARGET_TYPE_LINEAR or extent.target_source != 0:
+                # Інші блокові пристрої (retrofit) в образі super відсутні
+                raise ValueError(f"Розділ {partition.name} використовує інший блоковий пристрій: "
+                                 f"{self._block_devices[extent.target_source]}")
+            start = self._base_offset + extent.target_data * LP_SECTOR_SIZE
+            extents.append((start, start + length))
+            zero.append(False)
+        return extents, zero
+
+
+class LogicalPartitionView(CompactedImage):
+    """
+    Логічний розділ super як послідовність діапазонів оригінального образу
+    (звичайного або Android sparse), без lpunpack. Аналізатори отримують його
+    замість шляху, як compacted_image.CompactedImage. ZERO діапазони
+    читаються як нулі і повідомляються як діри; зсувів в образі вони не мають.
+    """
+    def __init__(self, image_path: str, name: str, extents: List[Tuple[int, int]], zero: Optional[List[bool]] = None,
+                 image_fingerprint: Optional[dict] = None):
+        self._name = name
+        self._zero = list(zero) if zero is not None else [False] * len(extents)
+        super().__init__(image_path, extents, image_fingerprint)
+
+    def _open_source(self, image_path: str):
+        return sparse_image.open_image(image_path)
+
+    def __reduce__(self):
+        return self.__class__, (self._image_path, self._name, self._extents, self._zero, self._fingerprint)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def partition_id(self) -> str:
+        return self._name
+
+    @property
+    def path(self) -> str:
+        # Як файли lpunpack
+        return os.path.join(os.path.dirname(self._image_path), f"{self._name}.img")
+
+    def to_original(self, offset):
+        """
+        Зсув у розділі -> зсув в образі. ZERO діапазони не мають відповідника
+        в образі, для них повертається -1.
+        """
+        result = np.asarray(super().to_original(offset), dtype=np.int64)
+        if any(self._zero):
+            offsets = np.asarray(offset, dtype=np.int64)
+            idx = np.minimum(np.searchsorted(self._compacted, offsets, side="right") - 1, len(self._original) - 1)
+            result = np.where(np.array(self._zero)[idx], -1, result)
+        return result if result.ndim else int(result)
+
+    def _original_order(self) -> np.ndarray:
+        # Місця ZERO діапазонів (0, довжина) не є зсувами образу
+        order = super()._original_order()
+        return order[~np.array(self._zero, dtype=bool)[order]]
+
+    def _extent_holes(self, idx: int) -> List[Tuple[int, int]]:
+        if self._zero[idx]:
+            return [self._extents[idx]]
+        return super()._extent_holes(idx)
+
+    def read_block(self, offset: int, block_size: int) -> memoryview:
+        end = min(offset + block_size, self._size)
+        if offset >= end:
+            return memoryview(b"")
+        first = self._extent_index(offset)
+        if not self._zero[first] and end <= self._compacted[first + 1]:
+            return self._source.read_block(int(self._original[first] + offset - self._compacted[first]), end - offset)
+        buffer = bytearray(end - offset)
+        self._copy_into(memoryview(buffer), offset, first)
+        return memoryview(buffer)
+
+    def _copy_into(self, target: memoryview, offset: int, first: int) -> None:
+        position = 0
+        idx = first
+        while position < len(target):
+            extent_offset = offset + position - self._compacted[idx]
+            length = min(len(target) - position, int(self._compacted[idx + 1] - self._compacted[idx] - extent_offset))
+            if self._zero[idx]:
+                target[position:position + length] = bytes(length)
+            else:
+                target[position:position + length] = self._source.read_block(
+                    int(self._original[idx] + extent_offset), length)
+            position += length
+            idx += 1
+
+
+def super_offset(image_path: str) -> int:
+    """
+    Зсув розділу super в образі: 0 для образу super.img (зокрема sparse) або
+    початок розділу з назвою super у GPT образі диска.
+    """
+    with sparse_image.open_image(image_path) as source:
+        geometry = bytes(source.read_block(LP_PARTITION_RESERVED_BYTES, 4))
+        is_sparse = isinstance(source, sparse_image.SparseImage)
+    if len(geometry) == 4 and struct.unpack("<I", geometry)[0] == LP_METADATA_GEOMETRY_MAGIC:
+        return 0
+    if not is_sparse:
+        with GPTFile(image_path) as gpt_file:
+            try:
+                partition_table = PartitionTableHeader(gpt_file)
+            except Exception:
+                partition_table = None
+            if partition_table is not None:
+                for partition in partition_table.valid_entries():
+                    if partition.name == "super":
+                        return gpt_file.partition_range(partition)[0]
+    raise ValueError(f"LP метадані не знайдено: {image_path}")
+
+
+def logical_partitions(image_path: str, slot: int = 0, names=None) -> List[LogicalPartitionView]:
+    """
+    Представлення логічних розділів super з метаданих слоту slot. names
+    обмежує вибір назвами розділів.
+    """
+    base_offset = super_offset(image_path)
+    image_fingerprint = result_cache.fingerprint(image_path)
+    with sparse_image.open_image(image_path) as source:
+        metadata = LpMetadata(source, base_offset, slot)
+    views = []
+    for partition in metadata.partitions:
+        if names and partition.name not in names:
+            continue
+        extents, zero = metadata.partition_extents(partition)
+        views.append(LogicalPartitionView(image_path, partition.name, extents, zero, image_fingerprint))
+    if names and not views:
+        raise ValueError(f"Логічні розділи не знайдено: {', '.join(names)}")
+    return views
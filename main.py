@@ -1,12 +1,28 @@
 import autocorr_test
+import block_statistics
+import byte_histogram
 import signature_analysis
 import kolmogorov_test
 import primary_analysis
 import compression_test
+import compacted_image
+import compressibility_map
+import compression_engine
+import fill_detection
 import signature_analysis
+import signature_db
 import prepare
+import result_cache
+import pipeline
+import parallel_executor
+import lp_metadata
+import partition_view
+import sparse_image
+from block_source import image_name
+from pygpt.partition_types import PartitionTypes
 
 from pathlib import Path
+import argparse
 import sys
 import math
 import os
@@ -14,44 +30,450 @@ import time
 from collections import Counter
 
 def create_counter(filename: str, bs: int) -> Counter:
-    byte_counts = Counter()
-    n = 0
-    with open(filename, 'rb') as file:
-        while True:
-            chunk = file.read(bs)
-            if not chunk:
-                break
-            n += len(chunk)
-            print(n/1024/1024, end='\r')
-            byte_counts += Counter(chunk)
-            del chunk
-    return filename, n, byte_counts
+    # Сумісність зі старим інтерфейсом; гістограма рахується через byte_histogram
+    filename, n, histogram = byte_histogram.create_histogram(filename, bs)
+    return filename, n, byte_histogram.to_counter(histogram)
+
+def stage_params(autocorr_block_size: int, families=None, compression: str = "external",
+                 compression_threshold: float = 1.1, compacted: bool = False, partition=None,
+                 kinds=fill_detection.DEFAULT_KINDS) -> dict:
+    # Параметри, від яких залежать результати етапів. Пороги на результати не
+    # впливають, тож їх можна змінювати без повторного аналізу
+    params = {
+        "Autocorr": {"block_size": autocorr_block_size},
+        "Counter": {},
+        "Compression": compression_params(compression, compression_threshold),
+        "Signatures": {"families": signature_db.resolve_families(families),
+                       "database": signature_db.database_hash()},
+        "Empty regions": {"block_size": 4096, "kinds": tuple(sorted(kinds))},
+    }
+    if compacted:
+        # Результати стисненого представлення зберігаються окремо від повного образу і
+        # залежать від того, які блоки вилучені
+        for name in ("Autocorr", "Counter", "Compression", "Signatures"):
+            params[name] = dict(params[name], compacted=True, kinds=tuple(sorted(kinds)))
+    if partition is not None:
+        # Кеш ключується образом, тому розділи розрізняються за GUID
+        params = {name: dict(stage, partition=str(partition)) for name, stage in params.items()}
+    return params
+
+
+def open_compacted(image, kinds=fill_detection.DEFAULT_KINDS):
+    """
+    Стиснене представлення образу або розділу (partition_view.PartitionView).
+    Розділ звужується за картою діапазонів усього образу.
+    """
+    if isinstance(image, str):
+        return prepare.compact_disk_image(image, 4096, kinds)
+    with prepare.compact_disk_image(image.image_path, 4096, kinds) as image_map:
+        return image.compacted(image_map)
+
+
+def load_cached_stages(cache, names: list, params: dict) -> tuple:
+    results = dict()
+    timings = dict()
+    if cache is None:
+        return results, timings
+    for name in names:
+        lookup_start = time.time()
+        result = cache.get(name, params[name])
+        if result is not None:
+            results[name] = result
+            timings[name] = time.time() - lookup_start
+    return results, timings
+
+
+def save_block_map(fname: str, histograms, block_size: int, entropy_threshold: float = 7.95) -> int:
+    # Карта блоків разом з регіонами високої ентропії (ймовірно зашифрованими); повертає кількість регіонів
+    statistics = block_statistics.block_statistics(histograms, block_size)
+    regions = block_statistics.save_block_map(block_statistics.block_map_path(fname), histograms, statistics,
+                                              entropy_threshold)
+    return len(regions)
+
+
+def compression_params(compression: str, compression_threshold: float) -> dict:
+    if compression in ("external", "fan-out"):
+        # Обидва режими дають точні коефіцієнти тих самих програм
+        return {"compressors": compression_test.COMPRESSORS}
+    params = {"mode": compression, "codecs": [name for name, _ in compression_engine.CODECS]}
+    if compression == "early-stop":
+        # Лише ця оцінка залежить від порогу
+        params["threshold"] = compression_threshold
+    return params
+
+
+def run_compression(fname, compression: str = "external", workers: int = None,
+                    compression_threshold: float = 1.1) -> str:
+    if compression == "in-process":
+        return compression_test.compression_test_in_process(fname, workers)
+    if compression == "sampled":
+        return compression_test.compression_test_sampled(fname, workers)
+    if compression == "early-stop":
+        return compression_test.compression_test_early_stop(fname, compression_threshold, workers)
+    # Стиснене представлення подається компресорам з одного читання
+    if compression == "fan-out" or not isinstance(fname, str):
+        return compression_test.compression_test_fan_out(fname)
+    return compression_test.compression_test(fname)
+
+
+def cached_stage(cache, name: str, params: dict, compute):
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(name, params, compute)
+
+
+def run_pipeline_mode(fname, extents_path: str, block_size: int, autocorr_block_size: int,
+                      index_path: str = None, families=None, cache=None, block_map_size: int = None,
+                      compression: str = "external", workers: int = None, compression_threshold: float = 1.1,
+                      map_path: str = None, compacted: bool = False, kinds=fill_detection.DEFAULT_KINDS):
+    image = fname
+    write_extents = False
+    analyzers = [
+        pipeline.AutocorrAnalyzer(autocorr_block_size, map_path, workers),
+        pipeline.HistogramAnalyzer(),
+        pipeline.SignatureAnalyzer(index_path, families),
+    ]
+    if compacted:
+        # Аналізується стиснене представлення; його вилучені регіони і є порожніми регіонами
+        compact_start = time.time()
+        image = open_compacted(fname, kinds)
+        compact_time = time.time() - compact_start
+    else:
+        # Карта діапазонів стисненого образу зберігається після того ж проходу, якщо її ще немає
+        write_extents = extents_path is not None and not os.path.exists(extents_path)
+        analyzers.append(pipeline.EmptyRegionAnalyzer(4096, kinds=kinds))
+    # Вибіркові оцінки стиснення читають лише частину блоків і виконуються окремо
+    if compression in ("external", "fan-out"):
+        analyzers.insert(2, pipeline.CompressionAnalyzer())
+    elif compression == "in-process":
+        analyzers.insert(2, pipeline.InProcessCompressionAnalyzer(workers))
+    if block_map_size:
+        analyzers.append(pipeline.BlockMapAnalyzer(block_map_size))
+    params = stage_params(autocorr_block_size, families, compression, compression_threshold, compacted,
+                          getattr(fname, "partition_id", None), kinds)
+
+    # Індекс сигнатур, карта діапазонів, карта блоків і карта стиснення створюються лише під час аналізу
+    cacheable = [analyzer.name for analyzer in analyzers
+                 if analyzer.name != "Block map"
+                 and not (analyzer.name == "Autocorr" and map_path is not None)
+                 and not (analyzer.name == "Signatures" and index_path is not None)
+                 and not (analyzer.name == "Empty regions" and write_extents)]
+    cached_results, cached_timings = load_cached_stages(cache, cacheable, params)
+    if "Signatures" in cached_results:
+        signature_analysis.save_signature_totals(image_name(image), cached_results["Signatures"])
+
+    pending = [analyzer for analyzer in analyzers if analyzer.name not in cached_results]
+    new_results, new_timings = pipeline.run_pipeline(image, pending, block_size) if pending else (dict(), dict())
+    if cache is not None:
+        for name, result in new_results.items():
+            if name in params:
+                cache.put(name, params[name], result)
+
+    # Порядок звіту відповідає порядку аналізаторів
+    results = dict()
+    timings = dict()
+    for analyzer in analyzers:
+        if analyzer.name in cached_results:
+            results[analyzer.name] = cached_results[analyzer.name]
+            timings[analyzer.name] = cached_timings[analyzer.name]
+        else:
+            results[analyzer.name] = new_results[analyzer.name]
+            timings[analyzer.name] = new_timings[analyzer.name]
+    if compacted:
+        results["Empty regions"] = image.empty_regions
+        timings["Empty regions"] = compact_time
+    elif write_extents:
+        with compacted_image.CompactedImage.from_empty_regions(fname, results["Empty regions"]) as extents:
+            extents.save(extents_path, compacted_image.map_params(4096, kinds))
+
+    if "Compression" not in results:
+        cmp_start = time.time()
+        results["Compression"] = cached_stage(cache, "Compression", params["Compression"],
+                                              lambda: run_compression(image, compression, workers,
+                                                                      compression_threshold))
+        timings["Compression"] = time.time() - cmp_start
+
+    if block_map_size:
+        map_start = time.time()
+        results["High entropy"] = save_block_map(image_name(image), results["Block map"][2], block_map_size)
+        timings["High entropy"] = time.time() - map_start
+
+    counter_fname, n, counter = results["Counter"]
+
+    ks_start = time.time()
+    results["K-S"] = kolmogorov_test.calculate_kolmogorov_smirnov(counter_fname, n, counter, False)
+    timings["K-S"] = time.time() - ks_start
+
+    e_start = time.time()
+    results["Entropy"] = primary_analysis.entropy_estimation(counter_fname, n, counter)
+    timings["Entropy"] = time.time() - e_start
+
+    if compacted:
+        image.close()
+    pipeline.print_report(results, timings)
+    return results
+
+
+def run_parallel_mode(fname, block_size: int, autocorr_block_size: int, workers: int, backend: str,
+                      index_path: str = None, families=None, cache=None, block_map_size: int = None,
+                      compression: str = "external", compression_threshold: float = 1.1, map_path: str = None,
+                      compacted: bool = False, kinds=fill_detection.DEFAULT_KINDS):
+    stage_names = {"histogram": "Counter", "autocorr": "Autocorr", "signatures": "Signatures",
+                   "empty": "Empty regions"}
+    params = stage_params(autocorr_block_size, families, compression, compression_threshold, compacted,
+                          getattr(fname, "partition_id", None), kinds)
+
+    image = fname
+    results, timings = dict(), dict()
+    if compacted:
+        # Аналізується стиснене представлення; його вилучені регіони і є порожніми регіонами
+        compact_start = time.time()
+        image = open_compacted(fname, kinds)
+        results["Empty regions"] = image.empty_regions
+        timings["Empty regions"] = time.time() - compact_start
+
+    cacheable = [name for name in stage_names.values()
+                 if name not in results and not (name == "Signatures" and index_path is not None)]
+    cached_results, cached_timings = load_cached_stages(cache, cacheable, params)
+    results.update(cached_results)
+    timings.update(cached_timings)
+    if "Signatures" in results:
+        signature_analysis.save_signature_totals(image_name(image), results["Signatures"])
+
+    stages = tuple(stage for stage in parallel_executor.STAGES if stage_names[stage] not in results)
+    if stages:
+        parallel_start = time.time()
+        new_results = parallel_executor.run_sharded_analysis(image, block_size, autocorr_block_size, 4096, workers,
+                                                             backend, stages, index_path, families, kinds)
+        parallel_end = time.time()
+        # Етапи виконуються одночасно, тому для них відомий лише загальний час
+        for name, result in new_results.items():
+            results[name] = result
+            timings[name] = parallel_end - parallel_start
+            if cache is not None:
+                cache.put(name, params[name], result)
+
+    counter_fname, n, counter = results["Counter"]
+
+    ks_start = time.time()
+    results["K-S"] = kolmogorov_test.calculate_kolmogorov_smirnov(counter_fname, n, counter, False)
+    timings["K-S"] = time.time() - ks_start
+
+    cmp_start = time.time()
+    results["Compression"] = cached_stage(cache, "Compression", params["Compression"],
+                                          lambda: run_compression(image, compression, workers,
+                                                                  compression_threshold))
+    timings["Compression"] = time.time() - cmp_start
+
+    e_start = time.time()
+    results["Entropy"] = primary_analysis.entropy_estimation(counter_fname, n, counter)
+    timings["Entropy"] = time.time() - e_start
+
+    if block_map_size:
+        map_start = time.time()
+        map_fname, histograms = block_statistics.create_block_histograms(image, block_map_size, block_size)
+        high_entropy = save_block_map(map_fname, histograms, block_map_size)
+        results["Block map"] = map_fname, len(histograms)
+        results["High entropy"] = high_entropy
+        timings["Block map"] = timings["High entropy"] = time.time() - map_start
+
+    if map_path:
+        # Шарди не зберігають результати окремих блоків, тому карта будується окремим проходом
+        map_start = time.time()
+        autocorr_test.analyze_image_file(image, autocorr_block_size, False, map_path, workers)
+        results["Compressibility map"] = (map_path,)
+        timings["Compressibility map"] = time.time() - map_start
+
+    if compacted:
+        image.close()
+
+    pipeline.print_report(results, timings)
+    return results
+
+
+def run_partitions_mode(views: list, block_size: int, args, cache, compression_threshold: float):
+    """
+    Аналіз кількох розділів GPT або логічних розділів super одного образу за
+    один запуск, на місці, без витягування у файли. Кожен розділ проходить конвеєр (або --parallel) зі
+    своїм звітом, у кінці виводиться підсумок по розділах.
+    """
+    summary = []
+    for view in views:
+        extents = ", ".join(f"{start}-{end}" for start, end in view.extents)
+        print(f"=== {view.name or view.partition_id} ({view.partition_id}): {extents}")
+        size = view.size
+        if args.compacted:
+            with open_compacted(view, args.fill_kinds) as compacted:
+                size = compacted.size
+        if not size:
+            print("\t Partition is empty")
+            summary.append((view, "empty"))
+            view.close()
+            continue
+
+        min_counts = 16
+        autocorr_block_size = min(1048576, pow(2, math.floor(math.log2(size/min_counts))))
+        index_path = signature_analysis.signature_index_path(view.path) if args.signature_index else None
+        map_path = compressibility_map.block_analysis_path(view.path) if args.compressibility_map else None
+
+        # Помилка одного розділу (наприклад, розділ лише з нулями) не зупиняє аналіз решти
+        try:
+            if args.parallel:
+                results = run_parallel_mode(view, block_size, autocorr_block_size, args.workers, args.backend,
+                                            index_path, args.families, cache, args.block_map, args.compression,
+                                            compression_threshold, map_path, args.compacted, args.fill_kinds)
+            else:
+                results = run_pipeline_mode(view, None, block_size, autocorr_block_size, index_path, args.families,
+                                            cache, args.block_map, args.compression, args.workers,
+                                            compression_threshold, map_path, args.compacted, args.fill_kinds)
+        except ValueError as e:
+            print("\t", e)
+            results = str(e)
+        finally:
+            view.close()
+        summary.append((view, results))
+
+    print("=== Partitions")
+    for view, results in summary:
+        if isinstance(results, str):
+            print(f"{view.name}\t{view.partition_id}\t{results}")
+            continue
+        print(f"{view.name}\t{view.partition_id}\t{results['Counter'][1]}\tautocorr={results['Autocorr'][1]}"
+              f"\tks={results['K-S'][1]}\tentropy={results['Entropy'][1]}"
+              f"\tcompression={str(results['Compression']).strip()}")
+    return summary
+
 
 def main():
-    if len(sys.argv) < 1:
-        print("Не указано имя файла.")
-        sys.exit(1)
-    fname = sys.argv[1]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_path")
+    parser.add_argument("--pipeline", action="store_true", help="Всі етапи за одне читання образу")
+    parser.add_argument("--parallel", action="store_true", help="Розподілити етапи між ядрами за діапазонами образу")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", choices=["process", "thread"], default="process")
+    parser.add_argument("--signature-index", action="store_true", help="Зберегти зсуви всіх знайдених сигнатур")
+    parser.add_argument("--families", nargs="+",
+                        choices=list(signature_db.FAMILIES) + list(signature_db.FAMILY_GROUPS),
+                        help="Шукати лише сигнатури вибраних родин")
+    parser.add_argument("--block-map", type=int, metavar="BLOCK_SIZE",
+                        help="Зберегти гістограми та статистики кожного блоку заданого розміру і регіони "
+                             "з високою ентропією")
+    parser.add_argument("--compression", choices=["external", "fan-out", "in-process", "sampled", "early-stop"],
+                        default="external",
+                        help="Зовнішні компресори по черзі або з одного читання, вбудовані кодеки на --workers "
+                             "ядрах, оцінка за вибіркою блоків або потокова оцінка з зупинкою після рішення "
+                             "щодо порогу")
+    parser.add_argument("--compressibility-map", action="store_true",
+                        help="Зберегти коефіцієнт стиснення кожного блоку автокореляції разом з її результатами")
+    parser.add_argument("--compacted", action="store_true",
+                        help="Аналізувати образ без порожніх регіонів (зсуви у звітах - оригінальні)")
+    parser.add_argument("--fill-kinds", nargs="+", choices=list(fill_detection.FILL_KINDS),
+                        default=list(fill_detection.DEFAULT_KINDS),
+                        help="Які заповнені блоки вважати порожніми (порожні регіони, --compacted)")
+    parser.add_argument("--partitions", nargs="+", metavar="NAME",
+                        help="Аналізувати розділи GPT з такими назвами або GUID на місці, без витягування")
+    parser.add_argument("--all-partitions", action="store_true",
+                        help="Аналізувати всі розділи GPT образу, зі звітом для кожного")
+    parser.add_argument("--skip-types", nargs="*", default=list(partition_view.DEFAULT_SKIP_TYPES),
+                        choices=[partition_type.name for partition_type in PartitionTypes],
+                        help="Типи розділів, які не аналізуються")
+    parser.add_argument("--sector-size", type=int, default=512)
+    parser.add_argument("--super", action="store_true",
+                        help="--partitions і --all-partitions вибирають логічні розділи super (LP метадані)")
+    parser.add_argument("--slot", type=int, default=0, help="Слот LP метаданих")
+    parser.add_argument("--no-cache", action="store_true", help="Не використовувати збережені результати етапів")
+    parser.add_argument("--cache-dir", default=result_cache.CACHE_DIR)
+
+    args = parser.parse_args()
+    fname = args.input_path
+
+    # Android sparse образ аналізується без розгортання simg2img
+    sparse = sparse_image.SparseImage(fname) if sparse_image.is_sparse_image(fname) else None
+    if sparse is not None and (args.compacted or ((args.partitions or args.all_partitions) and not args.super)):
+        sparse.close()
+        raise ValueError("Для Android sparse образу --compacted і аналіз розділів GPT не підтримуються")
+    if args.super and args.compacted:
+        raise ValueError("--compacted не підтримується для логічних розділів super")
+    source_image = sparse if sparse is not None else fname
 
-    file_size = os.path.getsize(fname)
+    # Замість файлу _opt зберігається лише карта діапазонів стисненого образу
+    extents_path = compacted_image.extent_map_path(fname) if sparse is None else None
+    compacted = prepare.compact_disk_image(fname, 4096, args.fill_kinds) if args.compacted else None
+
+    if compacted is not None:
+        file_size = compacted.size
+    else:
+        file_size = sparse.size if sparse is not None else os.path.getsize(fname)
+    if not file_size:
+        raise ValueError("File is empty")
     block_size, autocorr_threshold, ks_test_threshold, compression_threshold, signature_threshold, entropy_threshold = 1048576, 0.125, 0.1, 1.1, 150, 7.95
 
     min_counts = 16
     autocorr_block_size = min(1048576, pow(2, math.floor(math.log2(file_size/min_counts))))
 
-    file_stem, file_extension = os.path.splitext(fname)
-    opt_fname = f"{file_stem}_opt{file_extension}"
+    index_path = signature_analysis.signature_index_path(fname) if args.signature_index else None
+    map_path = compressibility_map.block_analysis_path(fname) if args.compressibility_map else None
+
+    # Результати етапів зберігаються між запусками і перевіряються за відбитком образу
+    cache = None if args.no_cache else result_cache.ResultCache(fname, args.cache_dir)
+
+    if args.partitions or args.all_partitions:
+        # Розділи аналізуються як діапазони образу; карта діапазонів образу вже побудована
+        if compacted is not None:
+            compacted.close()
+        if sparse is not None:
+            sparse.close()
+        if args.super:
+            views = lp_metadata.logical_partitions(fname, args.slot, args.partitions)
+        else:
+            views = partition_view.partition_views(fname, args.sector_size, args.skip_types, args.partitions)
+        run_partitions_mode(views, block_size, args, cache, compression_threshold)
+        return
+
+    params = stage_params(autocorr_block_size, args.families, args.compression, compression_threshold,
+                          args.compacted, kinds=args.fill_kinds)
+
+    if args.pipeline or args.parallel:
+        # Режими відкривають представлення самі
+        if compacted is not None:
+            compacted.close()
+
+    if args.pipeline:
+        run_pipeline_mode(source_image, extents_path, block_size, autocorr_block_size, index_path, args.families,
+                          cache, args.block_map, args.compression, args.workers, compression_threshold, map_path,
+                          args.compacted, args.fill_kinds)
+        if sparse is not None:
+            sparse.close()
+        return
+
+    if args.parallel:
+        run_parallel_mode(source_image, block_size, autocorr_block_size, args.workers, args.backend, index_path,
+                          args.families, cache, args.block_map, args.compression, compression_threshold, map_path,
+                          args.compacted, args.fill_kinds)
+        if sparse is not None:
+            sparse.close()
+        return
+
+    if compacted is None and sparse is None:
+        # Карта діапазонів будується один раз і перевіряється за відбитком образу
+        prepare.compact_disk_image(fname, 4096, args.fill_kinds).close()
+    image = compacted if compacted is not None else source_image
 
-    if not os.path.exists(opt_fname):
-        prepare.optimize_disk_image(fname, 4096)
-    
     autocorr_start = time.time()
-    autocorr_test.analyze_image_file(fname, autocorr_block_size, False)
+    if map_path:
+        # Карта стиснення рахується з тих самих блоків, тому етап не береться з кешу
+        result = autocorr_test.analyze_image_file(image, autocorr_block_size, False, map_path, args.workers)
+        if cache is not None:
+            cache.put("Autocorr", params["Autocorr"], result)
+    else:
+        cached_stage(cache, "Autocorr", params["Autocorr"],
+                     lambda: autocorr_test.analyze_image_file(image, autocorr_block_size, False))
     autocorr_end = time.time()
     print("Autocorr: ", autocorr_end - autocorr_start)
 
     counter_start = time.time()
-    counter_fname, n, counter = create_counter(fname, block_size)
+    counter_fname, n, counter = cached_stage(cache, "Counter", params["Counter"],
+                                             lambda: byte_histogram.create_histogram(image, block_size))
     counter_end = time.time()
     print("Counter: ", counter_end - counter_start)
 
@@ -61,12 +483,22 @@ def main():
     print("K-S: ", ks_end - ks_start)
 
     cmp_start = time.time()
-    compression_test.compression_test(fname)
+    cached_stage(cache, "Compression", params["Compression"],
+                 lambda: run_compression(image, args.compression, args.workers, compression_threshold))
     cmp_end = time.time()
     print("Compression: ", cmp_end - cmp_start)
 
     sig_start = time.time()
-    signature_analysis.perform_signature_analysis(fname, block_size)
+    found_signatures = None
+    # Індекс сигнатур створюється лише під час сканування
+    if cache is not None and index_path is None:
+        found_signatures = cache.get("Signatures", params["Signatures"])
+    if found_signatures is None:
+        found_signatures = signature_analysis.perform_signature_analysis(image, block_size, index_path, args.families)
+        if cache is not None:
+            cache.put("Signatures", params["Signatures"], found_signatures)
+    else:
+        signature_analysis.save_signature_totals(image_name(image), found_signatures)
     sig_end = time.time()
     print("Signatures: ", sig_end - sig_start)
 
@@ -74,6 +506,19 @@ def main():
     primary_analysis.entropy_estimation(counter_fname, n, counter)
     e_end = time.time()
     print("Entropy: ", e_end - e_start)
+
+    if args.block_map:
+        map_start = time.time()
+        map_fname, histograms = block_statistics.create_block_histograms(image, args.block_map, block_size)
+        high_entropy = save_block_map(map_fname, histograms, args.block_map, entropy_threshold)
+        map_end = time.time()
+        print("Block map: ", map_end - map_start)
+        print("High entropy regions: ", high_entropy)
+
+    if compacted is not None:
+        compacted.close()
+    if sparse is not None:
+        sparse.close()
     
 
 if __name__ == "__main__":
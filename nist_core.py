@@ -0,0 +1,242 @@
+from math import floor, log, sqrt
+
+import numba
+import numpy as np
+from scipy.special import erfc, gammaincc
+from scipy.stats import norm
+
+# Векторизовані тести NIST SP 800-22 над масивами бітів (uint8, значення 0/1).
+# Назви, параметри і результати (p_value, verdict) повторюють randomness_testsuite,
+# тож тести можна підставляти замість бібліотечних без зміни рядка вердиктів.
+
+# Параметри тесту найдовшої серії одиниць: (довжина блоку, k, v_0, ймовірності класів)
+_LONGEST_RUN_PARAMS = (
+    (6272, 8, 3, 1, [0.21484375, 0.3671875, 0.23046875, 0.1875]),
+    (750000, 128, 5, 4, [0.1174035788, 0.242955959, 0.249363483, 0.17517706, 0.102701071, 0.112398847]),
+    (None, 10000, 6, 10, [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727]),
+)
+
+# Ймовірності класів тесту лінійної складності, як у randomness_testsuite
+_LINEAR_COMPLEXITY_PI = [0.01047, 0.03125, 0.125, 0.5, 0.25, 0.0625, 0.020833]
+
+_ONE = np.uint64(1)
+_WORD_BITS = np.uint64(64)
+
+
+def to_bits(data) -> np.ndarray:
+    """
+    Байти -> масив бітів. Порядок бітів визначений: байти йдуть у порядку
+    файлу, біти кожного байта - від старшого до молодшого, як у NIST STS.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def to_str(bits: np.ndarray) -> str:
+    # Рядок '0'/'1' для тестів, які приймають лише рядки
+    return (np.asarray(bits, dtype=np.uint8) + ord('0')).tobytes().decode('ascii')
+
+
+def monobit_test(bits: np.ndarray):
+    n = len(bits)
+    count = 2 * int(np.count_nonzero(bits)) - n
+    p_value = float(erfc(abs(count / sqrt(n)) / sqrt(2)))
+    return p_value, p_value >= 0.01
+
+
+def block_frequency(bits: np.ndarray, block_size: int = 128):
+    n = len(bits)
+    if n < block_size:
+        block_size = n
+    number_of_blocks = n // block_size
+    if number_of_blocks == 1:
+        return monobit_test(bits[:block_size])
+    # Частка одиниць у кожному повному блоці
+    ones = bits[:number_of_blocks * block_size].reshape(number_of_blocks, block_size).sum(axis=1, dtype=np.int64)
+    proportion_sum = float(np.sum((ones / block_size - 0.5) ** 2))
+    p_value = float(gammaincc(number_of_blocks / 2, 4.0 * block_size * proportion_sum / 2))
+    return p_value, p_value >= 0.01
+
+
+def run_test(bits: np.ndarray):
+    n = len(bits)
+    pi = int(np.count_nonzero(bits)) / n
+    if abs(pi - 0.5) >= 2 / sqrt(n):
+        return 0.0, False
+    # Кількість серій = кількість змін біта + 1
+    v_obs = int(np.count_nonzero(bits[1:] != bits[:-1])) + 1
+    p_value = float(erfc(abs(v_obs - 2 * n * pi * (1 - pi)) / (2 * sqrt(2 * n) * pi * (1 - pi))))
+    return p_value, p_value > 0.01
+
+
+def longest_runs(blocks: np.ndarray) -> np.ndarray:
+    """
+    Довжина найдовшої серії одиниць у кожному рядку матриці блоків.
+    """
+    number_of_blocks, m = blocks.shape
+    padded = np.zeros((number_of_blocks, m + 2), dtype=np.int8)
+    padded[:, 1:-1] = blocks
+    edges = np.diff(padded, axis=1)
+    # Початки і кінці серій у порядку рядків, тож вони утворюють пари
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    result = np.zeros(number_of_blocks, dtype=np.int64)
+    np.maximum.at(result, rows, ends - starts)
+    return result
+
+
+def longest_one_block_test(bits: np.ndarray):
+    n = len(bits)
+    if n < 128:
+        return 0.0, False, 'Error: Not enough data to run this test'
+    m, k, v_0, pi_values = next((m, k, v_0, pi_values) for limit, m, k, v_0, pi_values in _LONGEST_RUN_PARAMS
+                                if limit is None or n < limit)
+    number_of_blocks = n // m
+    runs = longest_runs(bits[:number_of_blocks * m].reshape(number_of_blocks, m))
+    # Класи v_0 і менше, v_1, ..., v_{k-1}, більше за v_{k-1}
+    frequencies = np.bincount(np.clip(runs - v_0, 0, k), minlength=k + 1)
+    expected = number_of_blocks * np.array(pi_values)
+    x_obs = float(np.sum((frequencies - expected) ** 2 / expected))
+    p_value = float(gammaincc(k / 2, x_obs / 2))
+    return p_value, p_value > 0.01
+
+
+def spectral_test(bits: np.ndarray):
+    n = len(bits)
+    # Для дійсного сигналу достатньо першої половини спектра
+    modulus = np.abs(np.fft.rfft(2.0 * bits - 1.0)[:n // 2])
+    tau = sqrt(log(1 / 0.05) * n)
+    count_n0 = 0.95 * (n / 2)
+    count_n1 = int(np.count_nonzero(modulus < tau))
+    d = (count_n1 - count_n0) / sqrt(n * 0.95 * 0.05 / 4)
+    p_value = float(erfc(abs(d) / sqrt(2)))
+    return p_value, p_value >= 0.01
+
+
+def cumulative_sums_test(bits: np.ndarray, mode: int = 0):
+    n = len(bits)
+    steps = 2 * bits.astype(np.int64) - 1
+    if mode != 0:
+        steps = steps[::-1]
+    sums = np.cumsum(steps)
+    abs_max = int(max(sums.max(), -sums.min()))
+
+    k = np.arange(int(floor(0.25 * floor(-n / abs_max) + 1)), int(floor(0.25 * floor(n / abs_max) - 1)) + 1)
+    terms_one = norm.cdf((4 * k + 1) * abs_max / sqrt(n)) - norm.cdf((4 * k - 1) * abs_max / sqrt(n))
+    k = np.arange(int(floor(0.25 * floor(-n / abs_max - 3))), int(floor(0.25 * floor(n / abs_max) - 1)) + 1)
+    terms_two = norm.cdf((4 * k + 3) * abs_max / sqrt(n)) - norm.cdf((4 * k + 1) * abs_max / sqrt(n))
+
+    p_value = float(1.0 - np.sum(terms_one) + np.sum(terms_two))
+    return p_value, p_value >= 0.01
+
+
+@numba.njit(cache=True, nogil=True)
+def _low_bits(word_index, count):
+    # Маска молодших count бітів усього бітсету в межах слова word_index
+    low = word_index * 64
+    if count >= low + 64:
+        return ~np.uint64(0)
+    if count <= low:
+        return np.uint64(0)
+    return (_ONE << np.uint64(count - low)) - _ONE
+
+
+@numba.njit(cache=True, nogil=True)
+def _parity(word):
+    word ^= word >> np.uint64(32)
+    word ^= word >> np.uint64(16)
+    word ^= word >> np.uint64(8)
+    word ^= word >> np.uint64(4)
+    word ^= word >> np.uint64(2)
+    word ^= word >> _ONE
+    return int(word & _ONE)
+
+
+@numba.njit(cache=True, nogil=True)
+def _berlekamp_massey(block, c, b, t, window):
+    """
+    Berlekamp-Massey над бітсетами з 64-бітних слів. Повторює
+    ComplexityTest.berlekamp_massey_algorithm з randomness_testsuite крок у крок,
+    разом з його особливістю: до c додаються лише перші l коефіцієнтів b, тож
+    перше розходження (l = 0) не змінює c.
+
+    window містить s_i, s_{i-1}, ... від молодшого біта, тож розходження - це
+    парність c & window у межах бітів 0..l.
+    """
+    n = len(block)
+    c[:] = 0
+    b[:] = 0
+    window[:] = 0
+    c[0] = _ONE
+    b[0] = _ONE
+    l = 0
+    m = -1
+    for i in range(n):
+        # Біти вище за i ще порожні в усіх бітсетах
+        words = (i >> 6) + 1
+        for w in range(words - 1, 0, -1):
+            window[w] = (window[w] << _ONE) | (window[w - 1] >> np.uint64(63))
+        window[0] = (window[0] << _ONE) | np.uint64(block[i])
+
+        acc = np.uint64(0)
+        for w in range(words):
+            acc ^= c[w] & window[w] & _low_bits(w, l + 1)
+        if _parity(acc) == 1:
+            t[:words] = c[:words]
+            if l > 0:
+                # c ^= (перші l коефіцієнтів b) << (i - m)
+                shift = i - m
+                word_shift = shift >> 6
+                bit_shift = np.uint64(shift & 63)
+                source_words = ((l - 1) >> 6) + 1
+                for w in range(source_words):
+                    word = b[w] & _low_bits(w, l)
+                    c[w + word_shift] ^= word << bit_shift
+                    if bit_shift and w + word_shift + 1 < len(c):
+                        c[w + word_shift + 1] ^= word >> (_WORD_BITS - bit_shift)
+            if 2 * l <= i:
+                l = i + 1 - l
+                m = i
+                b[:words] = t[:words]
+    return l
+
+
+@numba.njit(cache=True, parallel=True)
+def _block_complexities(blocks):
+    number_of_blocks, block_size = blocks.shape
+    words = (block_size + 63) // 64
+    result = np.zeros(number_of_blocks, dtype=np.int64)
+    for k in numba.prange(number_of_blocks):
+        c = np.zeros(words, dtype=np.uint64)
+        b = np.zeros(words, dtype=np.uint64)
+        t = np.zeros(words, dtype=np.uint64)
+        window = np.zeros(words, dtype=np.uint64)
+        result[k] = _berlekamp_massey(blocks[k], c, b, t, window)
+    return result
+
+
+def linear_complexities(bits: np.ndarray, block_size: int = 500) -> np.ndarray:
+    """
+    Лінійна складність кожного повного блоку з block_size бітів; блоки
+    обробляються паралельно.
+    """
+    number_of_blocks = len(bits) // block_size
+    blocks = np.ascontiguousarray(bits[:number_of_blocks * block_size], dtype=np.uint8)
+    return _block_complexities(blocks.reshape(number_of_blocks, block_size))
+
+
+def linear_complexity_test(bits: np.ndarray, block_size: int = 500):
+    number_of_blocks = len(bits) // block_size
+    if number_of_blocks <= 1:
+        return -1.0, False
+    t2 = (block_size / 3.0 + 2.0 / 9) / 2 ** block_size
+    mean = 0.5 * block_size + (1 / 36) * (9 + (-1) ** (block_size + 1)) - t2
+    t = -1.0 * (((-1) ** block_size) * (linear_complexities(bits, block_size) - mean) + 2.0 / 9)
+    vg = np.histogram(t, bins=[-9999999999, -2.5, -1.5, -0.5, 0.5, 1.5, 2.5, 9999999999])[0][::-1]
+    # Порядок додавання як у бібліотеці, щоб p_value збігалося точно
+    x_obs = 0.0
+    for observed, pi in zip(vg, _LINEAR_COMPLEXITY_PI):
+        x_obs += ((observed - number_of_blocks * pi) ** 2) / (number_of_blocks * pi)
+    p_value = float(gammaincc(6 / 2.0, x_obs / 2.0))
+    return p_value, p_value >= 0.01
@@ -1,31 +1,22 @@
-import sys
-
-from randomness_testsuite import (ApproximateEntropy, Complexity,
-                                  CumulativeSum, FrequencyTest,
-                                  RandomExcursions, RunTest, Serial, Spectral,
+from randomness_testsuite import (ApproximateEntropy, RandomExcursions, Serial,
                                   TemplateMatching, Universal)
 
+import nist_core
+
 
 def to_bin(data):
-    if type(data) == str:
-        data = data.encode()
-        return bin(int.from_bytes(data, byteorder=sys.byteorder))[2:]
-    elif type(data) in [bytes, bytearray]:
-        return bin(int.from_bytes(data, byteorder=sys.byteorder))[2:]
+    # Біти від старшого до молодшого в порядку байтів файлу, з ведучими нулями
+    if type(data) in [str, bytes, bytearray]:
+        return nist_core.to_str(nist_core.to_bits(data))
     else:
         raise TypeError
 
 
 def nist_tests(filename: str, bs: int):
-    freq = FrequencyTest.FrequencyTest()
-    runs = RunTest.RunTest()
-    fft = Spectral.SpectralTest()
     matcher = TemplateMatching.TemplateMatching()
     maurer = Universal.Universal()
-    linear_c = Complexity.ComplexityTest()
     serial = Serial.Serial()
     entropy = ApproximateEntropy.ApproximateEntropy()
-    cusum = CumulativeSum.CumulativeSums()
     exc = RandomExcursions.RandomExcursions()
 
     n = 0
@@ -36,21 +27,23 @@ def nist_tests(filename: str, bs: int):
                 break
             n += len(chunk)
             print(n / 1024 / 1024, end='\r')
-            d = to_bin(chunk)
+            bits = nist_core.to_bits(chunk)
+            # Рядок потрібен лише тестам randomness_testsuite, які ще не векторизовані
+            d = nist_core.to_str(bits)
             try:
-                _, monobit_verdict = freq.monobit_test(d)
-                _, block_freq_verdict = freq.block_frequency(d)
-                _, runs_verdict = runs.run_test(d)
-                _, longest_run_verdict = runs.longest_one_block_test(d)
-                _, fft_verdict = fft.spectral_test(d)
+                _, monobit_verdict = nist_core.monobit_test(bits)
+                _, block_freq_verdict = nist_core.block_frequency(bits)
+                _, runs_verdict = nist_core.run_test(bits)
+                _, longest_run_verdict = nist_core.longest_one_block_test(bits)
+                _, fft_verdict = nist_core.spectral_test(bits)
                 _, nonoverlap_verdict = matcher.non_overlapping_test(d)
                 _, overlap_verdict = matcher.overlapping_patterns(d)
                 _, maurer_verdict = maurer.statistical_test(d)
-                _, linear_verdict = linear_c.linear_complexity_test(d)
+                _, linear_verdict = nist_core.linear_complexity_test(bits)
                 _, serial_verdict = serial.serial_test(d)[1]
                 _, entropy_verdict = entropy.approximate_entropy_test(d)
-                _, cusum_forward_verdict = cusum.cumulative_sums_test(d, 0)
-                _, cusum_backward_verdict = cusum.cumulative_sums_test(d, 1)
+                _, cusum_forward_verdict = nist_core.cumulative_sums_test(bits, 0)
+                _, cusum_backward_verdict = nist_core.cumulative_sums_test(bits, 1)
                 excursions_data = exc.random_excursions_test(d)
                 excursions_var_data = exc.variant_test(d)
             except:
@@ -63,7 +56,7 @@ def nist_tests(filename: str, bs: int):
             excursions_var_verdict = False
             for excursion in excursions_var_data:
                 excursions_var_verdict = excursions_var_verdict and excursion[4]
-            del chunk
+            del chunk, bits, d
 
             print([
                 monobit_verdict,
@@ -0,0 +1,228 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import autocorr_test
+import byte_histogram
+import fill_detection
+import signature_analysis
+import signature_db
+import signature_engine
+import sparse_extents
+from signature_index import SignatureIndex
+from block_source import BlockSource, image_name, original_offsets
+
+STAGES = ("histogram", "autocorr", "signatures", "empty")
+
+
+def split_ranges(size: int, n_shards: int, alignment: int) -> List[Tuple[int, int]]:
+    """
+    Розбиває [0, size) на діапазони з межами, кратними alignment.
+    """
+    aligned_blocks = max(1, math.ceil(size / alignment))
+    blocks_per_shard = max(1, math.ceil(aligned_blocks / n_shards))
+    shard_size = blocks_per_shard * alignment
+    return [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+
+
+def moments(values: List[float]) -> Tuple[int, float, float]:
+    # (кількість, середнє, сума квадратів відхилень)
+    if not values:
+        return 0, 0.0, 0.0
+    values = np.asarray(values)
+    mean = float(np.mean(values))
+    return len(values), mean, float(np.sum(np.square(values - mean)))
+
+
+def merge_moments(a: Tuple[int, float, float], b: Tuple[int, float, float]) -> Tuple[int, float, float]:
+    # Об'єднання моментів двох вибірок (формула Чана)
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def merge_regions(regions: List[Tuple[int, int]], shard_regions: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # Регіон, що закінчується на межі шарда, зшивається з регіоном наступного шарда
+    for start, end in shard_regions:
+        if regions and regions[-1][1] == start:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def analyze_shard(source, start: int, end: int, bs: int, autocorr_bs: int, empty_bs: int, stages=STAGES,
+                  record_hits: bool = False, families=None, close_source: Optional[bool] = None,
+                  kinds=fill_detection.DEFAULT_KINDS) -> dict:
+    """
+    Обробляє діапазон [start, end) образу. source - відкритий BlockSource
+    (потоки) або шлях до образу (процеси відкривають власний mmap того ж файлу).
+    Представлення CompactedImage потоки ділять, а процеси отримують власну
+    копію, яку закривають (close_source).
+    """
+    own_source = isinstance(source, str) if close_source is None else close_source
+    if isinstance(source, str):
+        source = BlockSource(source)
+
+    result = dict()
+    try:
+        if "histogram" in stages:
+            byte_counts = byte_histogram.empty_histogram()
+            # Діри не читаються і враховуються як нульові байти, заповнені регіони - за шаблоном
+            extents = sparse_extents.clip(source.data_extents, start, end)
+            filled = byte_histogram.add_fills(byte_counts, source.fills, start, end)
+            byte_counts[0] += (end - start) - filled - sum(e - s for s, e in extents)
+            for extent_start, extent_end in extents:
+                for offset, chunk in source.blocks(extent_start, bs, math.ceil((extent_end - extent_start) / bs)):
+                    byte_histogram.update_histogram(byte_counts, chunk[:extent_end - offset])
+            result["histogram"] = byte_counts
+
+        if "autocorr" in stages:
+            # Як і analyze_image_file, неповний останній блок не аналізується
+            num_blocks = max(1, int(math.floor(source.size / autocorr_bs)))
+            autocorr_stat = list()
+            # Блоки в дірах нульові, їх автокореляція не визначена і не враховується
+            in_hole = source.hole_blocks(start, end - start, autocorr_bs)
+            for i, (offset, data) in enumerate(source.blocks(start, autocorr_bs, math.ceil((end - start) / autocorr_bs))):
+                if offset // autocorr_bs >= num_blocks:
+                    break
+                if in_hole[i]:
+                    continue
+                mean_autocorr, _ = autocorr_test.analyze_block(data)
+                if not np.isnan(mean_autocorr):
+                    autocorr_stat.append(mean_autocorr)
+            result["autocorr"] = moments(autocorr_stat)
+
+        if "signatures" in stages:
+            # Процеси пулу завантажують готовий автомат з дискового кешу signature_db
+            matcher = signature_db.get_matcher(families)
+            # Сканер заходить на max_length байтів за межі шарда з обох боків: збіги
+            # на межах рахує шард, у якому вони починаються, а попередні збіги
+            # враховуються для перекриття
+            overlap = matcher.max_length
+            scan_start = max(0, start - overlap)
+            scan_end = min(source.size, end + overlap)
+            scanner = signature_engine.SignatureScanner(matcher, start, end, scan_start, record_hits)
+            for offset, chunk in source.blocks(scan_start, bs, math.ceil((scan_end - scan_start) / bs)):
+                scanner.feed(chunk[:scan_end - offset])
+            scanner.finish()
+            result["signatures"] = scanner.totals()
+            if record_hits:
+                result["signature_hits"] = scanner.hits()
+
+        if "empty" in stages:
+            # Блоки класифікуються вікнами розміром bs, вирівняними на empty_bs
+            result["empty"] = fill_detection.scan_empty_regions(source, start, end, empty_bs,
+                                                                fill_detection.resolve_kinds(kinds), window=bs)
+    finally:
+        if own_source:
+            source.close()
+
+    return result
+
+
+def run_sharded_analysis(image_path, bs: int = 1048576, autocorr_bs: Optional[int] = None, empty_bs: int = 4096,
+                         workers: Optional[int] = None, backend: str = "process", stages=STAGES,
+                         index_path: Optional[str] = None, families=None, kinds=fill_detection.DEFAULT_KINDS) -> dict:
+    """
+    Запускає гістограму, автокореляцію, пошук сигнатур і порожніх регіонів на
+    пулі потоків або процесів, розбиваючи образ на діапазони.
+
+    Межі діапазонів кратні розмірам блоків усіх етапів, тож об'єднані
+    результати точно збігаються з послідовними create_histogram,
+    analyze_image_file, perform_signature_analysis та find_empty_regions.
+    Виняток - ланцюжок перекривних збігів однієї сигнатури, довший за
+    перекриття шардів: такий ланцюжок на межі може бути розбитий інакше.
+
+    Returns:
+        Результати за назвами етапів, як у pipeline.run_pipeline
+    """
+    if backend not in ("process", "thread"):
+        raise ValueError(f"Невідомий тип пулу: {backend}")
+
+    workers = workers or os.cpu_count()
+    # image_path - шлях або compacted_image.CompactedImage
+    own_source = isinstance(image_path, str)
+    source = BlockSource(image_path) if own_source else image_path
+    size = source.size
+    if autocorr_bs is None:
+        autocorr_bs = bs
+
+    alignment = math.lcm(bs, autocorr_bs, empty_bs)
+    # Більше шардів, ніж потоків, щоб вирівняти навантаження
+    ranges = split_ranges(size, workers * 4, alignment)
+
+    if backend == "thread":
+        # Потоки користуються одним спільним mmap
+        executor = ThreadPoolExecutor(max_workers=workers)
+        shard_source = source
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # Представлення передається процесам копією, що відкриває той самий образ
+        shard_source = image_path
+
+    histogram = byte_histogram.empty_histogram()
+    autocorr_moments = (0, 0.0, 0.0)
+    found_signatures_total = None
+    empty_regions = []
+    hit_offsets = []
+    hit_ids = []
+
+    try:
+        with executor:
+            futures = [executor.submit(analyze_shard, shard_source, start, end, bs, autocorr_bs, empty_bs, stages,
+                                       index_path is not None, families, backend == "process", kinds)
+                       for start, end in ranges]
+            # Результати об'єднуються в порядку діапазонів
+            for done, future in enumerate(futures):
+                partial = future.result()
+                print(f"{done + 1}/{len(futures)}", end='\r')
+                if "histogram" in partial:
+                    histogram += partial["histogram"]
+                if "autocorr" in partial:
+                    autocorr_moments = merge_moments(autocorr_moments, partial["autocorr"])
+                if "signatures" in partial:
+                    if found_signatures_total is None:
+                        found_signatures_total = partial["signatures"]
+                    else:
+                        for sig_type, count in partial["signatures"].items():
+                            found_signatures_total[sig_type] += count
+                if "signature_hits" in partial:
+                    hit_offsets.append(partial["signature_hits"][0])
+                    hit_ids.append(partial["signature_hits"][1])
+                if "empty" in partial:
+                    merge_regions(empty_regions, partial["empty"])
+    finally:
+        if own_source:
+            source.close()
+
+    results = dict()
+    image = image_path
+    image_path = image_name(image)
+    if "autocorr" in stages:
+        n, _, m2 = autocorr_moments
+        if n == 0:
+            raise ValueError("File is empty")
+        results["Autocorr"] = image_path, np.sqrt(m2 / n)
+    if "histogram" in stages:
+        results["Counter"] = image_path, size, histogram
+    if "signatures" in stages:
+        if found_signatures_total is None:
+            found_signatures_total = dict.fromkeys(signature_db.get_matcher(families).names, 0)
+        signature_analysis.save_signature_totals(image_path, found_signatures_total)
+        if index_path is not None:
+            SignatureIndex.build(list(found_signatures_total.keys()),
+                                 original_offsets(image, np.concatenate(hit_offsets)) if hit_offsets else [],
+                                 np.concatenate(hit_ids) if hit_ids else []).save(index_path)
+        results["Signatures"] = found_signatures_total
+    if "empty" in stages:
+        results["Empty regions"] = empty_regions
+
+    return results
@@ -0,0 +1,96 @@
+import os
+from typing import List, Optional, Tuple
+
+import result_cache
+import sparse_extents
+from compacted_image import CompactedImage
+from pygpt.gpt_file import GPTFile
+from pygpt.partition_table_header import PartitionTableHeader
+
+# Розділи, які зазвичай не аналізуються: прошивки і метадані перевірки
+DEFAULT_SKIP_TYPES = ("QualcommFirmware", "QualcommVbmeta")
+
+
+class PartitionView(CompactedImage):
+    """
+    Розділ GPT як діапазон байтів оригінального образу, без витягування у
+    файл {partition_id}.bin. Аналізатори отримують його замість шляху так само,
+    як CompactedImage; зсуви у звітах переводяться в зсуви образу.
+
+    compacted() звужує розділ до непорожніх діапазонів з карти всього образу.
+    """
+    def __init__(self, image_path: str, partition_id, name: str, byte_range: Tuple[int, int],
+                 extents: Optional[List[Tuple[int, int]]] = None, image_fingerprint: Optional[dict] = None,
+                 compacted: bool = False):
+        self._partition_id = partition_id
+        self._name = name
+        self._range = tuple(byte_range)
+        self._is_compacted = compacted
+        super().__init__(image_path, [self._range] if extents is None else extents, image_fingerprint)
+
+    def __reduce__(self):
+        return self.__class__, (self._image_path, self._partition_id, self._name, self._range, self._extents,
+                                self._fingerprint, self._is_compacted)
+
+    @property
+    def partition_id(self):
+        return self._partition_id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def byte_range(self) -> Tuple[int, int]:
+        return self._range
+
+    @property
+    def path(self) -> str:
+        # Ті самі назви, що у файлів prepare.split_image і режиму both
+        suffix = "_opt" if self._is_compacted else ""
+        return os.path.join(os.path.dirname(self._image_path), f"{self._partition_id}{suffix}.bin")
+
+    @property
+    def empty_regions(self) -> List[Tuple[int, int]]:
+        # Відносно початку розділу, як EmptyRegionAnalyzer для нестисненого розділу
+        start, end = self._range
+        return [(region_start - start, region_end - start) for region_start, region_end
+                in sparse_extents.clip(sparse_extents.holes_of(self._extents, end), start, end)]
+
+    def compacted(self, image_map: CompactedImage) -> "PartitionView":
+        """
+        Розділ без порожніх регіонів за картою діапазонів усього образу
+        (prepare.compact_disk_image), тож образ сканується лише один раз.
+        """
+        start, end = self._range
+        return self.__class__(self._image_path, self._partition_id, self._name, self._range,
+                              sparse_extents.clip(image_map.extents, start, end), self._fingerprint, True)
+
+
+def type_name(partition) -> str:
+    # Назва типу з PartitionTypes або GUID невідомого типу
+    return getattr(partition.partition_type, "name", str(partition.partition_type))
+
+
+def partition_views(image_path: str, sector_size: int = 512, skip_types=DEFAULT_SKIP_TYPES,
+                    names=None) -> List[PartitionView]:
+    """
+    Представлення всіх розділів з PartitionTableHeader.valid_entries(), крім
+    розділів типів skip_types. names обмежує вибір назвами або GUID розділів.
+    """
+    skip_types = set(skip_types or ())
+    # Відбиток образу спільний для всіх розділів
+    image_fingerprint = result_cache.fingerprint(image_path)
+    views = []
+    with GPTFile(image_path, sector_size) as gpt_file:
+        partition_table = PartitionTableHeader(gpt_file)
+        for partition in partition_table.valid_entries():
+            if type_name(partition) in skip_types:
+                continue
+            if names and partition.name not in names and str(partition.partition_id) not in names:
+                continue
+            views.append(PartitionView(image_path, partition.partition_id, partition.name,
+                                       gpt_file.partition_range(partition), image_fingerprint=image_fingerprint))
+    if names and not views:
+        raise ValueError(f"Розділи не знайдено: {', '.join(names)}")
+    return views
@@ -4,16 +4,16 @@ from typing import List, Union, Any
 
 import numpy as np
 
+import byte_histogram
 
-def calculate_pearson_criterion(filename: str, n: int, byte_counts: Counter) -> tuple[str, int | Any]:
+
+def calculate_pearson_criterion(filename: str, n: int, byte_counts: Union[np.ndarray, Counter]) -> tuple[str, int | Any]:
+    observed = byte_histogram.as_counts(byte_counts).astype(np.float64)
     # Очікувана кількість для рівномірного розподілу
     expected = n / 256
 
     # Розрахунок критерію Пірсона
-    chi_square = 0
-    for byte_value in range(256):
-        observed = byte_counts.get(byte_value, 0)
-        chi_square += (observed - expected) ** 2 / expected
+    chi_square = float(np.sum(np.square(observed - expected) / expected))
 
     return filename, chi_square
 
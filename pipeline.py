@@ -0,0 +1,338 @@
+import math
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import autocorr_test
+import block_statistics
+import byte_histogram
+import compressibility_map
+import compression_engine
+import compression_test
+import fill_detection
+import signature_analysis
+import signature_db
+import signature_engine
+import sparse_extents
+from block_source import image_name, open_file
+from signature_index import SignatureIndex
+
+
+class Analyzer(object):
+    """
+    Базовий аналізатор для однопрохідного конвеєра.
+
+    Конвеєр читає кожен блок файлу один раз і передає його всім зареєстрованим
+    аналізаторам. Розмір блоку конвеєра завжди кратний block_size аналізатора.
+    Блоки, що повністю лежать у дірах розрідженого файлу, не читаються і
+    передаються в skip().
+    """
+    name = "analyzer"
+    block_size = 1
+    # Представлення образу (compacted_image.CompactedImage), яке читає конвеєр
+    _view = None
+
+    def start(self, filename: str, file_size: int):
+        pass
+
+    def update(self, offset: int, chunk: memoryview):
+        raise NotImplementedError
+
+    def skip(self, offset: int, length: int):
+        # За замовчуванням діра обробляється як звичайні нульові дані
+        self.update(offset, memoryview(bytes(length)))
+
+    def finish(self):
+        raise NotImplementedError
+
+    def original_offsets(self, offsets):
+        # Зсуви, що зберігаються у файлах результатів, - в координатах оригінального образу
+        return offsets if self._view is None else self._view.to_original(offsets)
+
+
+class HistogramAnalyzer(Analyzer):
+    name = "Counter"
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        self._n = 0
+        self._byte_counts = byte_histogram.empty_histogram()
+
+    def update(self, offset, chunk):
+        self._n += len(chunk)
+        byte_histogram.update_histogram(self._byte_counts, chunk)
+
+    def skip(self, offset, length):
+        self._n += length
+        self._byte_counts[0] += length
+
+    def finish(self):
+        return self._filename, self._n, self._byte_counts
+
+
+class BlockMapAnalyzer(Analyzer):
+    """
+    Матриця гістограм байтів кожного блоку (n_blocks x 256) для
+    block_statistics: ентропії, критерію Пірсона та K-S по блоках.
+    """
+    name = "Block map"
+
+    def __init__(self, block_size: int = 4096):
+        self.block_size = block_size
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        self._rows = []
+
+    def update(self, offset, chunk):
+        self._rows.append(block_statistics.chunk_block_histograms(chunk, self.block_size))
+
+    def skip(self, offset, length):
+        rows = np.zeros((-(-length // self.block_size), 256), dtype=block_statistics.histogram_dtype(self.block_size))
+        rows[:, 0] = self.block_size
+        rows[-1, 0] = length - (len(rows) - 1) * self.block_size
+        self._rows.append(rows)
+
+    def finish(self):
+        histograms = np.concatenate(self._rows) if self._rows else np.zeros((0, 256), dtype=np.uint16)
+        return self._filename, len(histograms), histograms
+
+
+class AutocorrAnalyzer(Analyzer):
+    """
+    Якщо задано map_path, блоки також стискаються для карти стиснення, яка
+    зберігається разом з автокореляцією блоків (як в analyze_image_file).
+    """
+    name = "Autocorr"
+
+    def __init__(self, block_size: int, map_path: Optional[str] = None, workers: Optional[int] = None):
+        self.block_size = block_size
+        self._map_path = map_path
+        self._workers = workers
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        # Як і analyze_image_file, неповний останній блок не аналізується
+        self._num_blocks = max(1, int(math.floor(file_size / self.block_size)))
+        self._autocorr_stat = list()
+        self._block_results = list()
+        self._block_map = compressibility_map.CompressibilityMap(workers=self._workers) if self._map_path else None
+
+    def update(self, offset, chunk):
+        for pos in range(0, len(chunk), self.block_size):
+            if (offset + pos) // self.block_size >= self._num_blocks:
+                break
+            block = chunk[pos:pos + self.block_size]
+            if self._block_map is not None:
+                # Буфер конвеєра використовується повторно, тому блок копіюється
+                self._block_map.submit(offset + pos, bytes(block))
+            mean_autocorr, is_encrypted = autocorr_test.analyze_block(block)
+            if not np.isnan(mean_autocorr):
+                self._autocorr_stat.append(mean_autocorr)
+                if self._block_map is not None:
+                    self._block_results.append((offset + pos, mean_autocorr, is_encrypted))
+
+    def skip(self, offset, length):
+        # Автокореляція нульових блоків не визначена, тож діра впливає лише на карту стиснення
+        if self._block_map is not None:
+            self.update(offset, memoryview(bytes(length)))
+
+    def finish(self):
+        if self._block_map is not None:
+            offsets, ratios = self._block_map.finish()
+            block_results = self._block_results
+            if self._view is not None:
+                block_results, offsets, ratios = compressibility_map.original_block_analysis(
+                    self._view, block_results, offsets, ratios)
+            compressibility_map.save_block_analysis(self._map_path, block_results, offsets, ratios)
+        if not self._autocorr_stat:
+            raise ValueError("File is empty")
+        return self._filename, np.std(self._autocorr_stat)
+
+
+class SignatureAnalyzer(Analyzer):
+    name = "Signatures"
+
+    def __init__(self, index_path: Optional[str] = None, families=None):
+        self._index_path = index_path
+        self._families = families
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        # Сканер зберігає стан між блоками, тож вирівнювання блоків не потрібне
+        self._matcher = signature_db.get_matcher(self._families)
+        self._scanner = signature_engine.SignatureScanner(self._matcher, record_hits=self._index_path is not None)
+
+    def update(self, offset, chunk):
+        self._scanner.feed(chunk)
+
+    def finish(self):
+        self._scanner.finish()
+        found_signatures_total = self._scanner.totals()
+        signature_analysis.save_signature_totals(self._filename, found_signatures_total)
+        if self._index_path is not None:
+            hit_offsets, hit_ids = self._scanner.hits()
+            SignatureIndex.build(self._matcher.names, self.original_offsets(hit_offsets), hit_ids).save(self._index_path)
+        return found_signatures_total
+
+
+class EmptyRegionAnalyzer(Analyzer):
+    """
+    Пошук порожніх (заповнених) регіонів, еквівалентний prepare.find_empty_regions.
+
+    Якщо задано output_path, непорожні блоки одразу записуються у стиснений
+    образ (як prepare.optimize_disk_image), без окремого читання файлу.
+    """
+    name = "Empty regions"
+
+    def __init__(self, block_size: int = 4096, output_path: Optional[str] = None,
+                 kinds=fill_detection.DEFAULT_KINDS):
+        self.block_size = block_size
+        self._output_path = output_path
+        self._kinds_mask = fill_detection.resolve_kinds(kinds)
+
+    def start(self, filename, file_size):
+        self._builder = fill_detection.RegionBuilder()
+        self._out = open(self._output_path, 'wb') if self._output_path else None
+
+    def update(self, offset, chunk):
+        mask = fill_detection.empty_blocks(chunk, self.block_size, self._kinds_mask)
+        self._builder.update(offset, mask, self.block_size, len(chunk))
+        if self._out is not None:
+            # Непорожні блоки записуються суцільними серіями
+            for first, last in fill_detection.block_runs(~mask):
+                self._out.write(chunk[first * self.block_size:last * self.block_size])
+
+    def skip(self, offset, length):
+        if not self._kinds_mask[fill_detection.ZERO]:
+            # Нульові блоки не вважаються порожніми і мають потрапити у стиснений образ
+            super().skip(offset, length)
+            return
+        self._builder.update(offset, np.ones(-(-length // self.block_size), dtype=bool), self.block_size, length)
+
+    def finish(self):
+        if self._out is not None:
+            self._out.close()
+        return self._builder.regions
+
+
+class CompressionAnalyzer(Analyzer):
+    """
+    Ті самі зовнішні компресори, що й у compression_test, але дані подаються
+    на stdin усіх процесів з одного читання файлу через
+    compression_test.CompressorFanOut.
+    """
+    name = "Compression"
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        self._file_size = file_size
+        self._fan_out = compression_test.CompressorFanOut()
+
+    def update(self, offset, chunk):
+        # Буфер конвеєра використовується повторно, а черги тримають блок, тому подається копія
+        self._fan_out.feed(bytes(chunk))
+
+    def finish(self):
+        ratios = [self._file_size / size for size in self._fan_out.finish()]
+        return compression_test.format_compression_result(self._filename, ratios)
+
+
+class InProcessCompressionAnalyzer(Analyzer):
+    """
+    Стиснення вбудованими кодеками compression_engine на спільному пулі потоків.
+    """
+    name = "Compression"
+
+    def __init__(self, workers: Optional[int] = None):
+        self._workers = workers
+
+    def start(self, filename, file_size):
+        self._filename = filename
+        self._engine = compression_engine.CompressionEngine(workers=self._workers)
+
+    def update(self, offset, chunk):
+        # Буфер конвеєра використовується повторно, тому feed копіює дані
+        self._engine.feed(chunk)
+
+    def finish(self):
+        sizes = self._engine.finish()
+        return compression_test.format_compression_result(self._filename, self._engine.ratios(sizes))
+
+
+def run_pipeline(filename: str, analyzers: List[Analyzer], bs: int = 1048576) -> Tuple[dict, dict]:
+    """
+    Читає файл один раз і передає кожен блок усім аналізаторам.
+
+    Args:
+        filename: Шлях до образу або compacted_image.CompactedImage
+        analyzers: Список аналізаторів
+        bs: Бажаний розмір блоку читання (округлюється до кратного блокам аналізаторів)
+
+    Returns:
+        (результати за назвою аналізатора, час роботи кожного аналізатора)
+    """
+    file_size = os.path.getsize(filename) if isinstance(filename, str) else filename.size
+    step = math.lcm(*(analyzer.block_size for analyzer in analyzers))
+    chunk_size = max(1, math.ceil(bs / step)) * step
+
+    timings = dict.fromkeys((analyzer.name for analyzer in analyzers), 0.0)
+    for analyzer in analyzers:
+        start = time.time()
+        if not isinstance(filename, str):
+            analyzer._view = filename
+        analyzer.start(image_name(filename), file_size)
+        timings[analyzer.name] += time.time() - start
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open_file(filename) as file:
+        if isinstance(filename, str):
+            holes = sparse_extents.holes_of(sparse_extents.data_extents(file.fileno(), file_size), file_size)
+        else:
+            holes = filename.holes
+        for offset, length, in_hole in sparse_extents.chunks(file_size, chunk_size, holes):
+            if in_hole:
+                for analyzer in analyzers:
+                    start = time.time()
+                    analyzer.skip(offset, length)
+                    timings[analyzer.name] += time.time() - start
+                continue
+
+            file.seek(offset)
+            n = 0
+            # Дочитуємо блок повністю, щоб межі блоків аналізаторів не зсувались
+            while n < length:
+                read = file.readinto(view[n:length])
+                if not read:
+                    break
+                n += read
+            if not n:
+                break
+            chunk = view[:n]
+            for analyzer in analyzers:
+                start = time.time()
+                analyzer.update(offset, chunk)
+                timings[analyzer.name] += time.time() - start
+            print((offset + n) / 1024 / 1024, end='\r')
+
+    results = dict()
+    for analyzer in analyzers:
+        start = time.time()
+        results[analyzer.name] = analyzer.finish()
+        timings[analyzer.name] += time.time() - start
+
+    return results, timings
+
+
+def print_report(results: dict, timings: dict) -> None:
+    for name, result in results.items():
+        print(f"{name}: ", timings[name])
+        if isinstance(result, tuple) and isinstance(result[-1], np.ndarray):
+            # Повну гістограму не виводимо
+            result = result[:-1]
+        elif isinstance(result, dict):
+            result = sum(result.values())
+        print("\t", result)
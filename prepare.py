@@ -1,15 +1,22 @@
 import argparse
+import errno
 import os
-import mmap
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List
+
+import fill_detection
+import sparse_extents
+import sparse_image
+from block_source import BlockSource
+from compacted_image import CompactedImage, extent_map_path
 from pygpt.gpt_file import GPTFile
 from pygpt.partition_table_header import PartitionTableHeader
 
 class GPTReader(object):
-    def __init__(self, filename, sector_size=512, little_endian=True):
+    def __init__(self, filename, sector_size=512, little_endian=True, use_mmap=False):
         self._filename = filename
         self._sector_size = sector_size
-        self._file = GPTFile(filename, sector_size)
+        self._file = GPTFile(filename, sector_size, use_mmap=use_mmap)
         self._pth = PartitionTableHeader(self._file, little_endian)
 
     @property
@@ -22,7 +29,8 @@ class GPTReader(object):
 
 
 def split_image(fname: str, sector_size=512, dry_run=False) -> list:
-    reader = GPTReader(fname, sector_size=sector_size)
+    # Розділи копіюються великими фрагментами прямо з відображеного образу
+    reader = GPTReader(fname, sector_size=sector_size, use_mmap=True)
     files = list()
 
     if len(list(reader.partition_table.valid_entries())) == 0:
@@ -36,105 +44,166 @@ def split_image(fname: str, sector_size=512, dry_run=False) -> list:
 
         if not dry_run:
             with open(out_file, "wb+") as fout:
-                for block in reader.block_reader.blocks_in_range(
+                for extent in reader.block_reader.extents_in_range(
                     partition.first_block, partition.length
                 ):
-                    fout.write(block)
+                    fout.write(extent)
 
+    reader.block_reader.close()
     return files
 
-def find_empty_regions(file_path: str, block_size: int = 512) -> List[Tuple[int, int]]:
-    empty_regions = []
-    region_start = None
-    
-    with open(file_path, 'rb') as f:
-        # Використовуємо mmap для ефективної роботи з великими файлами
-        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-        file_size = len(mm)
-        
-        for pos in range(0, file_size, block_size):
-            # Читаємо блок даних
-            current_offset = min(pos + block_size, file_size)
-            block = mm[pos:current_offset]
-            if (current_offset / 1048576) % 1 == 0:
-                print("Analyzing: ", current_offset/1048576, end='\r')
-            # Перевіряємо чи блок порожній (містить лише нулі)
-            is_empty = all(b == 0 for b in block)
-            
-            if is_empty and region_start is None:
-                region_start = pos
-            elif not is_empty and region_start is not None:
-                empty_regions.append((region_start, pos))
-                region_start = None
-        
-        # Додаємо останній регіон, якщо він порожній
-        if region_start is not None:
-            empty_regions.append((region_start, file_size))
+
+def partition_ranges(fname: str, sector_size=512) -> list:
+    """
+    Байтові діапазони (partition_id, start, end) розділів образу для аналізу
+    на місці, без створення окремих файлів.
+    """
+    with GPTFile(fname, sector_size) as gpt_file:
+        partition_table = PartitionTableHeader(gpt_file)
+        return [(partition.partition_id, *gpt_file.partition_range(partition))
+                for partition in partition_table.valid_entries()]
+
+def find_empty_regions(file_path: str, block_size: int = 512, kinds=fill_detection.DEFAULT_KINDS,
+                       window: int = 16777216) -> List[Tuple[int, int]]:
+    """
+    Регіони (start, end) із суміжних блоків, заповнених нулями, 0xFF, іншим
+    сталим байтом або повторюваним шаблоном (типи kinds з
+    fill_detection.FILL_KINDS, за замовчуванням лише нулі).
+    Блоки класифікуються векторно вікнами по window байтів, діри розрідженого
+    файлу не читаються.
+    """
+    kinds_mask = fill_detection.resolve_kinds(kinds)
+
+    # Використовуємо mmap для ефективної роботи з великими файлами; Android
+    # sparse образ читається без розгортання
+    with sparse_image.open_image(file_path) as source:
+        empty_regions = fill_detection.scan_empty_regions(source, 0, source.size, block_size, kinds_mask, window)
         print('')
-        mm.close()
-    
+
     return empty_regions
 
-def optimize_disk_image(input_path: str, block_size: int = 512):
-    # Знаходимо порожні регіони
+def compact_disk_image(input_path: str, block_size: int = 512, kinds=fill_detection.DEFAULT_KINDS) -> CompactedImage:
+    """
+    Стиснений образ без копіювання даних: зберігається лише карта діапазонів
+    ({назва}_extents.json), а аналізатори читають CompactedImage.
+    """
+    return CompactedImage.open(input_path, extent_map_path(input_path), block_size, kinds)
+
+
+def optimize_disk_image(input_path: str, block_size: int = 512, kinds=fill_detection.DEFAULT_KINDS):
+    # Файл _opt потрібен лише для зовнішніх програм; він записується зі стисненого представлення
     input_path_split = os.path.splitext(input_path)
     output_path = f"{input_path_split[0]}_opt{input_path_split[1]}"
-    empty_regions = find_empty_regions(input_path, block_size)
-    
-    # Якщо порожніх регіонів немає, просто копіюємо файл
-    if not empty_regions:
-        if input_path != output_path:
-            with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
-                dst.write(src.read())
-        return
-    
-    # Створюємо новий файл без порожніх регіонів
-    with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
-        current_pos = 0
-        
-        for start, end in empty_regions:
-            # Копіюємо дані до порожнього регіону
-
-            if current_pos < start:
-                src.seek(current_pos)
-                # Читаємо та записуємо файл блоками по 1 МБ
-                bytes_to_copy = start - current_pos
-                buffer_size = 512
-
-                while bytes_to_copy > 0:
-                    print(f"Copying {bytes_to_copy} bytes from {start} to {end}                             ", end='\r')
-                    chunk_size = min(buffer_size, bytes_to_copy)
-                    chunk = src.read(chunk_size)
-                    if not chunk:
-                        break
-                    dst.write(chunk)
-                    bytes_to_copy -= len(chunk)
-            
-            # Пропускаємо порожній регіон
-            current_pos = end
-        
-        # Копіюємо залишок даних після останнього порожнього регіону
-        if current_pos < os.path.getsize(input_path):
-            src.seek(current_pos)
-            dst.write(src.read())
+    empty_regions = find_empty_regions(input_path, block_size, kinds)
+
+    if sparse_image.is_sparse_image(input_path):
+        # Дані sparse образу існують лише при читанні, тому копіюються через SparseImage
+        with sparse_image.SparseImage(input_path) as image, open(output_path, 'wb') as dst:
+            for start, end in sparse_extents.holes_of(empty_regions, image.size):
+                for offset, chunk in image.blocks(start, 1048576, -(-(end - start) // 1048576)):
+                    dst.write(chunk[:end - offset])
+    else:
+        write_extents(input_path, output_path, sparse_extents.holes_of(empty_regions, os.path.getsize(input_path)))
 
     print(f"{input_path.split("/")[-1]} -> {output_path.split("/")[-1]}: Done")
 
+# Помилки, з якими ядро не підтримує копіювання між цими файлами
+_COPY_UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP)
+
+
+def _copy_chunk(src_fd: int, dst_fd: int, offset: int, length: int) -> int:
+    # Копіювання засобами ядра: copy_file_range, sendfile, інакше через буфер
+    if hasattr(os, "copy_file_range"):
+        try:
+            return os.copy_file_range(src_fd, dst_fd, length, offset)
+        except OSError as e:
+            if e.errno not in _COPY_UNSUPPORTED:
+                raise
+    try:
+        return os.sendfile(dst_fd, src_fd, offset, length)
+    except OSError as e:
+        if e.errno not in _COPY_UNSUPPORTED:
+            raise
+    return os.write(dst_fd, os.pread(src_fd, min(length, 1048576), offset))
+
+
+def write_extents(input_path: str, output_path: str, extents: List[Tuple[int, int]]) -> None:
+    """
+    Записує діапазони (start, end) вхідного файлу один за одним у вихідний файл.
+    Дані не проходять через Python, якщо ядро підтримує copy_file_range або sendfile.
+    """
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        for start, end in extents:
+            offset = start
+            while offset < end:
+                copied = _copy_chunk(src.fileno(), dst.fileno(), offset, end - offset)
+                if not copied:
+                    raise ValueError(f"Файл {input_path} коротший, ніж очікувалось")
+                offset += copied
+
+
+def compact_partition(fname: str, partition_id, start: int, end: int, block_size: int = 4096,
+                      kinds=fill_detection.DEFAULT_KINDS) -> str:
+    """
+    Записує розділ [start, end) образу одразу без порожніх регіонів, як
+    optimize_disk_image для файлу з split_image, але без проміжного файлу.
+    Розділ читається двічі: scan_empty_regions, потім write_extents.
+    Блоки вирівняні від початку розділу, тож результат такий самий.
+    """
+    out_file = os.path.join(os.getcwd(), f"{partition_id}_opt.bin")
+    with BlockSource(fname) as source:
+        empty_regions = fill_detection.scan_empty_regions(source, start, end, block_size,
+                                                          fill_detection.resolve_kinds(kinds))
+    # Доповнення порожніх регіонів у межах розділу
+    extents = sparse_extents.clip(sparse_extents.holes_of(empty_regions, end), start, end)
+    write_extents(fname, out_file, extents)
+    return out_file
+
+
+def split_and_compact(fname: str, sector_size=512, block_size: int = 4096, kinds=fill_detection.DEFAULT_KINDS,
+                      io_workers: int = 4) -> list:
+    """
+    Режим "both" без проміжних файлів розділів: кожен розділ читається з образу
+    двічі (пошук порожніх регіонів, потім копіювання решти через
+    copy_file_range) і записується лише у файл _opt. Одночасно обробляється до
+    io_workers розділів.
+    """
+    partitions = partition_ranges(fname, sector_size)
+    if len(partitions) == 0:
+        raise ValueError("No valid partitions found")
+
+    with ThreadPoolExecutor(max_workers=io_workers) as executor:
+        futures = [executor.submit(compact_partition, fname, partition_id, start, end, block_size, kinds)
+                   for partition_id, start, end in partitions]
+        files = []
+        for (partition_id, _, _), future in zip(partitions, futures):
+            files.append(future.result())
+            print(f"{partition_id} -> {files[-1].split('/')[-1]}: Done")
+
+    return files
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("mode")
     parser.add_argument("input_path")
+    parser.add_argument("--fill-kinds", nargs="+", choices=list(fill_detection.FILL_KINDS),
+                        default=list(fill_detection.DEFAULT_KINDS), help="Які заповнені блоки вважати порожніми")
+    parser.add_argument("--io-workers", type=int, default=4,
+                        help="Скільки розділів одночасно обробляти в режимі both")
 
     args = parser.parse_args()
 
+    if args.mode != "optimize" and sparse_image.is_sparse_image(args.input_path):
+        raise ValueError("Android sparse образ підтримується лише в режимі optimize")
+
     if args.mode == "optimize":
-        optimize_disk_image(args.input_path, block_size=4096)
+        optimize_disk_image(args.input_path, block_size=4096, kinds=args.fill_kinds)
+    elif args.mode == "compact":
+        compact_disk_image(args.input_path, block_size=4096, kinds=args.fill_kinds).close()
     elif args.mode == "split":
         split_image(args.input_path)
     elif args.mode == "both":
-        splits = split_image(args.input_path)
-        for split in splits:
-            optimize_disk_image(split, block_size=4096)
+        split_and_compact(args.input_path, block_size=4096, kinds=args.fill_kinds, io_workers=args.io_workers)
     else:
         raise ValueError("Invalid mode")
 
@@ -3,7 +3,11 @@ from concurrent.futures.process import ProcessPoolExecutor
 import mpmath
 import parted
 from collections import Counter
-from typing import List
+from typing import List, Union
+
+import numpy as np
+
+import byte_histogram
 
 
 def parted_check(filename: str) -> List[str]:
@@ -20,10 +24,12 @@ def parted_check(filename: str) -> List[str]:
         return [filename, ex]
 
 
-def entropy_estimation(filename: str, n: int, byte_counts: Counter):
+def entropy_estimation(filename: str, n: int, byte_counts: Union[np.ndarray, Counter]):
     entropy = mpmath.mpf(0)
 
-    for count in byte_counts.values():
+    # Відсутні байти не дають внеску в ентропію
+    counts = byte_histogram.as_counts(byte_counts)
+    for count in counts[counts > 0].tolist():
         p = mpmath.fdiv(count, n)
         entropy = mpmath.fadd(entropy, mpmath.fmul(p, mpmath.log(p, 2)))
 
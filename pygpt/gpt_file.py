@@ -1,11 +1,18 @@
+import mmap
 import os
 import logging
 
+DEFAULT_CHUNK_SIZE = 4194304
+
 class GPTFile(object):
     """
     Simple wrapper to abstract accessing blocks of a file using LBA
+
+    Contiguous ranges are read in chunks of chunk_size bytes. With use_mmap the
+    file is memory-mapped and extents are returned as zero-copy memoryviews,
+    valid until the file is closed.
     """
-    def __init__(self, filename, blocksz=512):
+    def __init__(self, filename, blocksz=512, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
         """
         Initialize a GPTFile wrapper for the given file, using the specified block size
         """
@@ -17,6 +24,7 @@ class GPTFile(object):
             raise Exception('The image file is less than one block in size. Aborting.')
 
         self._total_blocks = self._nr_bytes // blocksz
+        self._chunk_blocks = max(1, chunk_size // blocksz)
 
         logging.debug('There are {} blocks in this file'.format(self._total_blocks))
 
@@ -24,12 +32,22 @@ class GPTFile(object):
 
         self._offset = 0
 
-    def read_blocks(self, lba_start, nr_blocks=1):
-        """
-        Read a number of LBA-sized blocks from the file.
+        self._mmap = None
+        self._view = None
+        if use_mmap:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
 
-        If the starting LBA is negative, it's assumed you want last block + lba_start as
-        the starting block
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _start_block(self, lba_start, nr_blocks):
+        """
+        Resolve the starting LBA (negative values count from the end) and check
+        that the requested range lies within the file
         """
         start_block = lba_start
         if start_block < 0:
@@ -43,6 +61,20 @@ class GPTFile(object):
             logging.debug("start-block {} requested-blocks {} total-blocks {}".format(start_block, nr_blocks, self._total_blocks))
             raise Exception('Total requested blocks out of range')
 
+        return start_block
+
+    def read_blocks(self, lba_start, nr_blocks=1):
+        """
+        Read a number of LBA-sized blocks from the file.
+
+        If the starting LBA is negative, it's assumed you want last block + lba_start as
+        the starting block
+        """
+        start_block = self._start_block(lba_start, nr_blocks)
+
+        if self._view is not None:
+            return self._view[start_block * self._blocksz:(start_block + nr_blocks) * self._blocksz].tobytes()
+
         if self._offset != start_block * self._blocksz:
             self._file.seek(start_block * self._blocksz)
             self._offset = start_block * self._blocksz
@@ -53,10 +85,67 @@ class GPTFile(object):
 
         return data
 
+    def read_extent(self, lba_start, nr_blocks):
+        """
+        Read a contiguous range of blocks as a single buffer. In mmap mode this is a
+        memoryview into the mapping and no data is copied.
+        """
+        if self._view is not None:
+            start_block = self._start_block(lba_start, nr_blocks)
+            return self._view[start_block * self._blocksz:(start_block + nr_blocks) * self._blocksz]
+        return self.read_blocks(lba_start, nr_blocks)
+
+    def extents_in_range(self, lba_start, nr_blocks, chunk_size=None):
+        """
+        Yield the range of blocks in chunks of up to chunk_size bytes (rounded down to
+        whole blocks, the file's chunk size by default)
+        """
+        chunk_blocks = self._chunk_blocks if chunk_size is None else max(1, chunk_size // self._blocksz)
+        # Validate the whole range up front, so that nothing is yielded for a bad request
+        start_block = self._start_block(lba_start, nr_blocks)
+        for i in range(0, nr_blocks, chunk_blocks):
+            yield self.read_extent(start_block + i, min(chunk_blocks, nr_blocks - i))
+
     def blocks_in_range(self, lba_start, nr_blocks):
-        for i in range(0, nr_blocks):
-            yield self.read_blocks(lba_start + i, 1)
+        for extent in self.extents_in_range(lba_start, nr_blocks):
+            for i in range(0, len(extent), self._blocksz):
+                yield extent[i:i + self._blocksz]
+
+    def byte_range(self, lba_start, nr_blocks):
+        """
+        Byte offsets (start, end) of a range of blocks in the file
+        """
+        start_block = self._start_block(lba_start, nr_blocks)
+        return start_block * self._blocksz, (start_block + nr_blocks) * self._blocksz
+
+    def partition_range(self, partition):
+        """
+        Byte offsets (start, end) of a partition table entry, e.g. for analyzing the
+        partition in place instead of splitting it into a separate file
+        """
+        return self.byte_range(partition.first_block, partition.length)
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Extents handed out are still alive; the mapping is freed with the last of them
+                pass
+            self._mmap = None
+        self._file.close()
+
+    @property
+    def filename(self):
+        return self._filename
 
     @property
     def sector_size(self):
         return self._blocksz
+
+    @property
+    def total_blocks(self):
+        return self._total_blocks
@@ -62,8 +62,8 @@ def main():
             logging.debug('Writing partition to file {}'.format(out_file))
 
             with open(out_file, 'wb+') as fout:
-                for block in reader.block_reader.blocks_in_range(partition.first_block, partition.length):
-                    fout.write(block)
+                for extent in reader.block_reader.extents_in_range(partition.first_block, partition.length):
+                    fout.write(extent)
 
 if __name__ == '__main__':
     main()
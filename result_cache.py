@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Callable, Optional
+
+CACHE_DIR = os.environ.get("RESULT_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "dec24_results"))
+
+
+def fingerprint(image_path: str, sample_size: int = 65536, samples: int = 16) -> dict:
+    """
+    Відбиток образу: шлях, розмір, час зміни та sha256 вибірки блоків
+    (перший, останній і рівномірно розподілені між ними).
+    """
+    stat = os.stat(image_path)
+    size = stat.st_size
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as file:
+        if size <= sample_size * samples:
+            digest.update(file.read())
+        else:
+            step = (size - sample_size) // (samples - 1)
+            for i in range(samples):
+                file.seek(i * step)
+                digest.update(file.read(sample_size))
+    return {
+        "path": os.path.abspath(image_path),
+        "size": size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sample_hash": digest.hexdigest(),
+    }
+
+
+class ResultCache(object):
+    """
+    Кеш результатів етапів аналізу одного образу.
+
+    Запис ключується шляхом образу, назвою етапу та його параметрами, а
+    всередині зберігає відбиток образу. Якщо образ змінився (розмір, час зміни
+    або вибірковий хеш), запис вважається застарілим і видаляється.
+    """
+    def __init__(self, image_path: str, cache_dir: str = CACHE_DIR):
+        self._image_path = image_path
+        self._cache_dir = cache_dir
+        self._fingerprint = fingerprint(image_path)
+
+    @property
+    def fingerprint(self) -> dict:
+        return self._fingerprint
+
+    def _entry_path(self, stage: str, params: dict) -> str:
+        key = json.dumps([self._fingerprint["path"], stage, params], sort_keys=True, default=str)
+        return os.path.join(self._cache_dir, f"{hashlib.sha256(key.encode()).hexdigest()}.pickle")
+
+    def get(self, stage: str, params: dict) -> Optional[Any]:
+        """
+        Результат етапу або None, якщо його немає в кеші чи він застарів.
+        """
+        entry_path = self._entry_path(stage, params)
+        try:
+            with open(entry_path, 'rb') as file:
+                entry = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+        if entry.get("fingerprint") != self._fingerprint:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            return None
+        return entry["result"]
+
+    def put(self, stage: str, params: dict, result: Any) -> None:
+        entry_path = self._entry_path(stage, params)
+        entry = {"fingerprint": self._fingerprint, "stage": stage, "params": params, "result": result}
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            # Без доступу на запис аналіз працює як без кешу
+            pass
+
+    def get_or_compute(self, stage: str, params: dict, compute: Callable[[], Any]) -> Any:
+        result = self.get(stage, params)
+        if result is None:
+            result = compute()
+            self.put(stage, params, result)
+        return result
@@ -2,6 +2,11 @@ import re
 from typing import Any
 import time
 
+import signature_db
+import signature_engine
+from block_source import image_name, open_source, original_offsets
+from signature_index import SignatureIndex
+
 def split_dict_equally(input_dict, chunks=2):
     "Splits dict by keys. Returns a list of dictionaries."
     # prep with empty dicts
@@ -18,579 +23,45 @@ def split_dict_equally(input_dict, chunks=2):
 def find_bytes_pattern(data: bytes, regex: re.Pattern) -> int:
    return len(regex.findall(data)) # [match.start() for match in regex.finditer(data)]
 
-def perform_signature_analysis(filename: str, bs: int) -> dict[str | Any, int]:
+def build_signatures(families=None) -> dict[str, re.Pattern]:
+    # Таблиця сигнатур зберігається в signatures.json і читається лише під час першого виклику
+    return signature_db.compile_signatures(families)
+
+
+def save_signature_totals(filename: str, found_signatures_total: dict[str, int]) -> None:
+    with open(f"{filename.split("/")[-1]}_signatures_total.txt", "w") as file:
+        file.write(f"{filename}\t{sum(found_signatures_total.values())}\t{found_signatures_total}")
+
+
+def signature_index_path(filename: str) -> str:
+    return f"{filename.split('/')[-1]}_signatures"
 
-    signatures = {
-        '1Password 4 Cloud Keychain encrypted data': re.compile(r'(6f70646174613031)', re.IGNORECASE),
-        '1Password 4 Cloud Keychain': re.compile(r'(4f50434c444154)', re.IGNORECASE),
-        '3GPP/2 video file': re.compile(r'(000000)(14|20)(66747970336770)', re.IGNORECASE),
-        '3GPP/2 multimedia file': re.compile(r'(66747970336732|66747970336765|66747970336767|66747970336770|66747970336773|0000001466747970)', re.IGNORECASE),
-        '7-zip archive': re.compile(r'(377a5c3237345c3235375c3034375c303334)', re.IGNORECASE),
-        '7-Zip Compressed file': re.compile(r'(377abcaf271c)', re.IGNORECASE),
-        'AAC audio': re.compile(r'(41444946|fff9|fff94c80)', re.IGNORECASE),
-        'Access Data FTK evidence': re.compile(r'(a90d000000000000)', re.IGNORECASE),
-        'ACE archive': re.compile(r'(2a2a4143452a2a)', re.IGNORECASE),
-        'Acronis True Image': re.compile(r'(b46e6844)', re.IGNORECASE),
-        'Adaptive Multi-Rate ACELP Codec (GSM)': re.compile(r'(2321414d52)', re.IGNORECASE),
-        'Adobe encapsulated PostScript': re.compile(r'(c5d0d3c6)', re.IGNORECASE),
-        'Adobe flash video file': re.compile(r'(464c5601)', re.IGNORECASE),
-        'Adobe FrameMaker': re.compile(r'(3c426f6f6b|3c4d494646696c65|3c4d4d4c|3c4d616b6572|3c4d616b657244696374696f6e617279|3c4d616b657246696c65|3c4d616b657253637265656e466f6e|3c4d616b657253637265656e466f6e74)', re.IGNORECASE),
-        'Adobe Portable Document Format file': re.compile(r'(0d0a25504446|25504446)', re.IGNORECASE),
-        'Adobe Shockwave Flash file': re.compile(r'(435753)', re.IGNORECASE),
-        'Agent newsreader character map': re.compile(r'(4e616d653a20)', re.IGNORECASE),
-        'Alcohol 120% Image Data File': re.compile(r'(4d454449412044455343524950544f5201)', re.IGNORECASE),
-        'Alcohol 120% Virtual CD image': re.compile(r'(00ffffffffffffffffffff0000020001)', re.IGNORECASE),
-        'Allegro Generic Packfile': re.compile(r'(736c682)(1|e)', re.IGNORECASE),
-        'Alzip archive': re.compile(r'(414c5a)', re.IGNORECASE),
-        'AMR audio': re.compile(r'(2321414d525c6e|2321414d525f4d43312e305c6e)', re.IGNORECASE),
-        'AMR-WB audio': re.compile(r'(2321414d522d57425c6e|2321414d522d57425f4d43312e305c6e)', re.IGNORECASE),
-        'Antenna data file': re.compile(r'(5245564e554d3a2c)', re.IGNORECASE),
-        'AOL ART file': re.compile(r'(4a47030e|4a47040e)', re.IGNORECASE),
-        'AOL file': re.compile(r'(414f4c)(2046656564|4442|494458|494e444558|564d313030)', re.IGNORECASE),
-        'AOL HTML mail': re.compile(r'(3c21646f63747970)', re.IGNORECASE),
-        'AOL parameter|info files': re.compile(r'(41435344)', re.IGNORECASE),
-        'AportisDoc document': re.compile(r'(5445587452454164|54455874546c4463)', re.IGNORECASE),
-        'AppImage application bundle': re.compile(r'(454c46)', re.IGNORECASE),
-        'Apple audio and video files': re.compile(r'(00000020667479704d3441)', re.IGNORECASE),
-        'Apple CD Image File': re.compile(r'(45520200)', re.IGNORECASE),
-        'Apple Core Audio File': re.compile(r'(63616666)', re.IGNORECASE),
-        'Apple HyperCard Stack': re.compile(r'(5354414b)', re.IGNORECASE),
-        'Apple Lossless Audio Codec file': re.compile(r'(667479704d344120)', re.IGNORECASE),
-        'Applix document': re.compile(r'(2a424547494e|2a424547494e20535052454144534845455453)', re.IGNORECASE),
-        'Approach index file': re.compile(r'(0300000041505052)', re.IGNORECASE),
-        'AR archive': re.compile(r'(213c617263683e|3c61723e)', re.IGNORECASE),
-        'ARC archive': re.compile(r'(1a020000|1a030000|1a040000|1a060000|1a080000|1a090000)', re.IGNORECASE),
-        'ASF video': re.compile(r'(3026b275|5b5265666572656e63655d)', re.IGNORECASE),
-        'Atari 7800': re.compile(r'(415441524937383030)', re.IGNORECASE),
-        'Audacity audio file': re.compile(r'(646e732e)', re.IGNORECASE),
-        'Autodesk FBX Interchange File': re.compile(r'(464258)', re.IGNORECASE),
-        'AV1 Image format sequence (AVIS)': re.compile(r'(66747970617669)(66|73)', re.IGNORECASE),
-        'AVG6 Integrity database': re.compile(r'(415647365f496e74)', re.IGNORECASE),
-        'AWK script': re.compile(r'(2321202f62696e2f61776b|2321202f62696e2f6761776b|2321202f7573722f62696e2f61776b|2321202f7573722f62696e2f6761776b|2321202f7573722f6c6f63616c2f62696e2f6761776b|23212f62696e2f61776b|23212f62696e2f6761776b|23212f7573722f62696e2f61776b|23212f7573722f62696e2f6761776b|23212f7573722f6c6f63616c2f62696e2f6761776b)', re.IGNORECASE),
-        'BASE85 file': re.compile(r'(3c7e363c5c255f30675371683b)', re.IGNORECASE),
-        'BDF font': re.compile(r'(5354415254464f4e545c303430)', re.IGNORECASE),
-        'Better Portable Graphics': re.compile(r'(425047fb)', re.IGNORECASE),
-        'BGBlitz position database file': re.compile(r'(aced000573720012)', re.IGNORECASE),
-        'BibTeX document': re.compile(r'(2520546869732066696c652077617320637265617465642077697468204a6162526566)', re.IGNORECASE),
-        'binary differences between files': re.compile(r'(4253444946463430|42534449464e3430)', re.IGNORECASE),
-        'Binary Property list': re.compile(r'(62706c697374)', re.IGNORECASE),
-        'BinHex 4 Compressed Archive': re.compile(r'(2854686973206669)', re.IGNORECASE),
-        'Bink video file': re.compile(r'(534d4b34)', re.IGNORECASE),
-        'BIOS details in RAM': re.compile(r'(001400000102)', re.IGNORECASE),
-        'Bitcoin Core wallet.dat file': re.compile(r'(000000006231050009000000002000000009000000000000)', re.IGNORECASE),
-        'Bitcoin-Qt blockchain block file': re.compile(r'(f9beb4d9)', re.IGNORECASE),
-        'BitLocker boot sector': re.compile(r'(eb)(52|58)(902d4656452d)', re.IGNORECASE),
-        'BitTorrent seed file': re.compile(r'(64383a616e6e6f756e6365)', re.IGNORECASE),
-        'Blender scene': re.compile(r'(424c454e444552)', re.IGNORECASE),
-        'BlindWrite Stream File': re.compile(r'(425754352053545245414d205349474e)', re.IGNORECASE),
-        'Blink compressed archive': re.compile(r'(426c696e6b)', re.IGNORECASE),
-        'Blue Iris Video File': re.compile(r'(424c5545)', re.IGNORECASE),
-        'BZIP2 Compressed Archive file': re.compile(r'(425a68)', re.IGNORECASE),
-        'Calculux Indoor lighting project file': re.compile(r'(43616c63756c757820496e646f6f7220)', re.IGNORECASE),
-        'CALS raster bitmap': re.compile(r'(737263646f636964)', re.IGNORECASE),
-        'Canon RAW file': re.compile(r'(4949)(1a0000004845|5c7831615c7830305c7830305c7830304845415043434452)', re.IGNORECASE),
-        'CCMX color correction file': re.compile(r'(43434d58)', re.IGNORECASE),
-        'CD Table Of Contents': re.compile(r'(434154414c4f472022|43445f44415c6e|43445f524f4d5c6e|43445f524f4d5f58415c6e|43445f5445585420)', re.IGNORECASE),
-        'ChromaGraph Graphics Card Bitmap': re.compile(r'(504943540008)', re.IGNORECASE),
-        'Cinema 4D Model File': re.compile(r'(5843344443344436)', re.IGNORECASE),
-        'Cisco VPN Settings': re.compile(r'(5b6d61696e5d)', re.IGNORECASE),
-        'COM+ Catalog': re.compile(r'(434f4d2b)', re.IGNORECASE),
-        'Compressed archive file': re.compile(r'(2d6c68)', re.IGNORECASE),
-        'Compressed ISO CD image': re.compile(r'(4349534f)', re.IGNORECASE),
-        'Compressed ISO image': re.compile(r'(49735a21)', re.IGNORECASE),
-        'Corel Binary metafile': re.compile(r'(434d5831)', re.IGNORECASE),
-        'Corel Draw drawing': re.compile(r'(434452587672736e)', re.IGNORECASE),
-        'Corel Paint Shop Pro image': re.compile(r'(7e424b00)', re.IGNORECASE),
-        'Corel Photopaint file': re.compile(r'(4350543746494c45|43505446494c45)', re.IGNORECASE),
-        'cpio archive': re.compile(r'(3037303730|303730373031|303730373032)', re.IGNORECASE),
-        'CR2': re.compile(r'(49492a00)(.{8})(435202)', re.IGNORECASE),
-        'Creative LablockSize Audio File': re.compile(r'(4372656174697665)', re.IGNORECASE),
-        'Creative Voice': re.compile(r'(437265617469766520566f6963652046)', re.IGNORECASE),
-        'CRI Movie 2 file': re.compile(r'(43524944)', re.IGNORECASE),
-        'Crush compressed archive': re.compile(r'(43525553482076)', re.IGNORECASE),
-        'Csound music': re.compile(r'(3c43736f756e6453796e74686573697a)', re.IGNORECASE),
-        'Daemon Tools image file': re.compile(r'(4d454449412044455343524950544f5202)', re.IGNORECASE),
-        'Dalvik (Android) executable file': re.compile(r'(6465780a|6465780a30303900)', re.IGNORECASE),
-        'David Whittaker audio': re.compile(r'(48e7f1fe6100)', re.IGNORECASE),
-        'DAX Compressed CD image': re.compile(r'(44415800)', re.IGNORECASE),
-        'DB2 conversion file': re.compile(r'(53514c4f434f4e56)', re.IGNORECASE),
-        'DesignTools 2D Design file': re.compile(r'(0764743264647464)', re.IGNORECASE),
-        'DeskMate Document': re.compile(r'(0d444f43|0e574b53)', re.IGNORECASE),
-        'desktop configuration file': re.compile(r'(2320436f6e6669672046696c65|23204b444520436f6e6669672046696c65|5b4465736b746f7020416374696f6e|5b4b4445204465736b746f7020456e7472795d)', re.IGNORECASE),
-        'Dial-up networking file': re.compile(r'(5b50686f6e655d)', re.IGNORECASE),
-        'DIB image': re.compile(r'(5c7832385c30305c30305c3030)', re.IGNORECASE),
-        'DICOM image': re.compile(r'(4449434d)', re.IGNORECASE),
-        'Digital Speech Standard file': re.compile(r'(02647373)', re.IGNORECASE),
-        'Digital Watchdog DW-TP-500G audio': re.compile(r'(7e742c015070024d52)', re.IGNORECASE),
-        'DirectDraw surface': re.compile(r'(444453)', re.IGNORECASE),
-        'DirectShow filter': re.compile(r'(4d5a900003000000)', re.IGNORECASE),
-        'DjVu': re.compile(r'(41542654464f524d)(.{8})(444a5655|444a564d)', re.IGNORECASE),
-        'DocBook document': re.compile(r'(3c3f786d6c)', re.IGNORECASE),
-        'DOS font': re.compile(r'(5c7830305c7834355c7834375c783431|5c7830305c7835365c7834395c783434|5c7866665c7834365c7834665c783465)', re.IGNORECASE),
-        'DPX image': re.compile(r'(53445058)', re.IGNORECASE),
-        'Dreamcast audio': re.compile(r'(80000020031204)', re.IGNORECASE),
-        'DST Compression': re.compile(r'(44535462)', re.IGNORECASE),
-        'DTS audio': re.compile(r'(1fffe800|7ffe8001|80017ffe|e8001fff|1f070000)', re.IGNORECASE),
-        'DVD info file': re.compile(r'(445644)', re.IGNORECASE),
-        'DVD video file': re.compile(r'(000001ba)', re.IGNORECASE),
-        'EasyRecovery Saved State file': re.compile(r'(4552465353415645)', re.IGNORECASE),
-        'electronic book document': re.compile(r'(6d696d65747970656170706c69636174696f6e2f657075622b7a6970)', re.IGNORECASE),
-        'electronic business card': re.compile(r'(424547494e3a5643415244|626567696e3a7663617264)', re.IGNORECASE),
-        'ELF executable': re.compile(r'(7f454c46)', re.IGNORECASE),
-        'Elite Plus Commander game file': re.compile(r'(454c49544520436f)', re.IGNORECASE),
-        'Emacs Lisp source code': re.compile(r'(3b454c435c3032335c3030305c3030305c303030|5c30313228)', re.IGNORECASE),
-        'email message': re.compile(r'(232120726e657773|466f727761726420746f|46726f6d3a|4e232120726e657773|5069706520746f|52656365697665643a|52656c61792d56657273696f6e3a|52657475726e2d506174683a|52657475726e2d706174683a|5375626a6563743a20)', re.IGNORECASE),
-        'eMusic download package': re.compile(r'(6e4637594c616f)', re.IGNORECASE),
-        'Encapsulated PostScript file': re.compile(r'(252150532d41646f)', re.IGNORECASE),
-        'EnCase case file': re.compile(r'(5f434153455f)', re.IGNORECASE),
-        'EnCase Evidence File Format V2': re.compile(r'(455646)(090d0aff00|320d0a81)', re.IGNORECASE),
-        'EndNote Library File': re.compile(r'(40404020000040404040)', re.IGNORECASE),
-        'Excel spreadsheet subheader': re.compile(r'(0908100000060500|fdffffff10|fdffffff1f|fdffffff22|fdffffff23|fdffffff28|fdffffff29)', re.IGNORECASE),
-        'Excel spreadsheet': re.compile(r'(4d6963726f736f667420457863656c20352e3020576f726b7368656574)', re.IGNORECASE),
-        'EXR image': re.compile(r'(300600)', re.IGNORECASE),
-        'Extended tcpdump (libpcap) capture file': re.compile(r'(a1b2cd34)', re.IGNORECASE),
-        'Falcon 8 channel module': re.compile(r'(43443831)', re.IGNORECASE),
-        'FAT File Allocation Table': re.compile(r'(f0ffff|f8ffffff|f8ffff0fffffff0f|f8ffff0fffffffff)', re.IGNORECASE),
-        'Fiasco database definition file': re.compile(r'(4644424800)', re.IGNORECASE),
-        'FictionBook 2.0 or CheatEngine': re.compile(r'(3c3f786d6c2076657273696f6e3d22312e302220656e636f64696e673d22)(555|757)(4462d38223f3e0)(d0a3c43686561745461626c65|a3c46696374696f6e426f6f6b)', re.IGNORECASE),
-        'Finale Playback File': re.compile(r'(706c79)', re.IGNORECASE),
-        'Firebird and Interbase database files': re.compile(r'(01003930)', re.IGNORECASE),
-        'FLAC audio': re.compile(r'(664c6143)', re.IGNORECASE),
-        'Flash': re.compile(r'(464c5601)(01|04|05)', re.IGNORECASE),
-        'Flatpak application bundle': re.compile(r'(666c617470616b5c7830305c7830315c7830305c7838395c786535|7864672d6170705c7830305c7830315c7830305c7838395c786535)', re.IGNORECASE),
-        'flegs module train-er module': re.compile(r'(4D264B21)', re.IGNORECASE),
-        'Flexible Image Transport System (FITS) file': re.compile(r'(53494d504c4520203d202020202020202020202020202020202020202054)', re.IGNORECASE),
-        'Flight Simulator Aircraft Configuration': re.compile(r'(5b666c7473696d2e)', re.IGNORECASE),
-        'FLTK Fluid file': re.compile(r'(2320646174612066696c6520666f722074686520466c746b)', re.IGNORECASE),
-        'FPX image': re.compile(r'(46506978)', re.IGNORECASE),
-        'FRED Editor song': re.compile(r'(4672656420456469746f7220)', re.IGNORECASE),
-        'FreeArc compressed file': re.compile(r'(41724301)', re.IGNORECASE),
-        'Fuji RAF raw image': re.compile(r'(46554a4946494c4d4343442d52415720)', re.IGNORECASE),
-        'Fuzzy bitmap (FBM) file': re.compile(r'(256269746d6170)', re.IGNORECASE),
-        'GameCube disc image': re.compile(r'(c2339f3d)', re.IGNORECASE),
-        'gBurner Disk Image': re.compile(r'(474249)', re.IGNORECASE),
-        'GDBM database': re.compile(r'(13579ace|4744424d|ce9a5713)', re.IGNORECASE),
-        'GEDCOM family history': re.compile(r'(302048454144)', re.IGNORECASE),
-        'GEM Raster file': re.compile(r'(eb3c902a)', re.IGNORECASE),
-        'Generic AutoCAD drawing': re.compile(r'(41433130)', re.IGNORECASE),
-        'Generic e-mail': re.compile(r'(46726f6d|52657475726e2d50)', re.IGNORECASE),
-        'Genetec video archive': re.compile(r'(47656e65746563204f6d6e6963617374)', re.IGNORECASE),
-        'GIMP file': re.compile(r'(67696d70207863)(66|6620|662066696c65|67696d70207863662076)', re.IGNORECASE),
-        'GIMP pattern file': re.compile(r'(47504154)', re.IGNORECASE),
-        'GNU Info Reader file': re.compile(r'(5468697320697320)', re.IGNORECASE),
-        'GNU Oleo spreadsheet': re.compile(r'(4f6c656f)', re.IGNORECASE),
-        'GNUnet search file': re.compile(r'(5c323131474e445c725c6e5c3033325c6e)', re.IGNORECASE),
-        'Google Video Pointer': re.compile(r'(2320646f776e6c6f616420746865206672656520476f6f676c6520566964656f20506c61796572|232e646f776e6c6f61642e7468652e667265652e476f6f676c652e566964656f2e506c61796572)', re.IGNORECASE),
-        'GPS Exchange (v1.1)': re.compile(r'(3c6770782076657273696f6e3d22312e)', re.IGNORECASE),
-        'Graphics interchange format file': re.compile(r'(47494638)(37|39)(61)', re.IGNORECASE),
-        'Graphviz DOT graph': re.compile(r'(6469677261706820|677261706820|737472696374206469677261706820|73747269637420677261706820)', re.IGNORECASE),
-        'GTKtalog catalog': re.compile(r'(67746b74616c6f6720)', re.IGNORECASE),
-        'GZIP Archive file': re.compile(r'(1f8b08)', re.IGNORECASE),
-        'Haansoft Hangul document': re.compile(r'(48575020446f63756d656e742046696c65)', re.IGNORECASE),
-        'Hamarsoft compressed archive': re.compile(r'(91334846)', re.IGNORECASE),
-        'Harvard Graphics presentation file': re.compile(r'(4848474231|53484f57)', re.IGNORECASE),
-        'Harvard Graphics symbol graphic': re.compile(r'(414d594f)', re.IGNORECASE),
-        'HCOM Audio File': re.compile(r'(48434f4d|46535344)', re.IGNORECASE),
-        'HDF document': re.compile(r'(5c3031365c3030335c3032335c303031|5c3231314844465c725c6e5c3033325c6e)', re.IGNORECASE),
-        'HEIF Image format': re.compile(r'(667479706865)(766d|7673|7663|7678|696d|6973|6978|6963)', re.IGNORECASE),
-        'HFE floppy disk image': re.compile(r'(4858435049434645)', re.IGNORECASE),
-        'HTML document': re.compile(r'(3c212d2d|3c21444f4354595045|3c21444f43545950452068746d6c|3c21446f6354797065|3c21446f6374797065|3c21646f6374797065|3c21646f63747970652048544d4c|3c424f4459|3c4831|3c626f6479|3c6831|3c3f786d6c)', re.IGNORECASE),
-        'HTML File': re.compile(r'(3c68746d6c)', re.IGNORECASE),
-        'HTTP Live Streaming playlist': re.compile(r'(234558544d3355)', re.IGNORECASE),
-        'Huskygram Poem or Singer embroidery': re.compile(r'(7c4bc374e1c853a479b9011dfc4fdd13)', re.IGNORECASE),
-        'Husqvarna Designer': re.compile(r'(5dfcc800)', re.IGNORECASE),
-        'ICC profile': re.compile(r'(61637370)', re.IGNORECASE),
-        'IE History file': re.compile(r'(436c69656e742055)', re.IGNORECASE),
-        'IFF': re.compile(r'(464f524d)(.{8})(494c424d|38535658|4143424d|414e424d|414e494d|46415858|46545854|534d5553|434d5553|5955564e|46414e54|41494646|41494643|53434448)', re.IGNORECASE),
-        'IGES document': re.compile(r'(53202020202020315c783061|53303030303030315c783061)', re.IGNORECASE),
-        'ILBM image': re.compile(r'(494c424d|50424d20)', re.IGNORECASE),
-        'iMelody ringtone': re.compile(r'(424547494e3a494d454c4f4459)', re.IGNORECASE),
-        'Img Software Bitmap': re.compile(r'(53434d49)', re.IGNORECASE),
-        'Inno Setup Uninstall Log': re.compile(r'(496e6e6f20536574)', re.IGNORECASE),
-        'Install Shield compressed file': re.compile(r'(49536328)', re.IGNORECASE),
-        'Inter@ctive Pager Backup (BlackBerry file': re.compile(r'(496e7465724063746976652050616765)', re.IGNORECASE),
-        'Internet shortcut': re.compile(r'(44454641554c54|496e7465726e657453686f7274637574)', re.IGNORECASE),
-        'iPod firmware': re.compile(r'(532054204f2050)', re.IGNORECASE),
-        'iRiver Playlist': re.compile(r'(69726976657220554d5320504c41)', re.IGNORECASE),
-        'ISO-9660 CD Disc Image file': re.compile(r'(4344303031)', re.IGNORECASE),
-        'IT 8.7 color calibration file': re.compile(r'(4954382e37)', re.IGNORECASE),
-        'JAD document': re.compile(r'(4d49446c65742d)', re.IGNORECASE),
-        'Jar Archive file': re.compile(r'(5f27a889)', re.IGNORECASE),
-        'JARCS compressed archive': re.compile(r'(4a4152435300)', re.IGNORECASE),
-        'Java archive': re.compile(r'(504b030414000)(8000800|800)', re.IGNORECASE),
-        'Java bytecode': re.compile(r'(cafebabe)', re.IGNORECASE),
-        'Java Cryptography Extension keystore': re.compile(r'(cececece)', re.IGNORECASE),
-        'JavaKeyStore': re.compile(r'(feedfeed)', re.IGNORECASE),
-        'JBIG2 image file': re.compile(r'(974a42320d0a1a0a)', re.IGNORECASE),
-        'Jeppesen FliteLog file': re.compile(r'(c8007900)', re.IGNORECASE),
-        'JET database': re.compile(r'(5c7830305c7830315c7830305c7830305374616e64617264204a6574204442)', re.IGNORECASE),
-        'JPEG image 1': re.compile(r'(5c3337375c3333305c333737)', re.IGNORECASE),
-        'JPEG image 2': re.compile(r'(ffd8ff)(ed|e2|e3|db)', re.IGNORECASE),
-        'JPEG image 3': re.compile(r'(ffd8ffe0)(.{2})(4a46494600010)([012])', re.IGNORECASE),
-        'JPEG image 4': re.compile(r'(ffd8ffe1)(.{2})(45786966000049492a00)(.+)(009007000400000030323030|009007000400000030323130|009007000400000030323230)', re.IGNORECASE),
-        'JPEG image 5': re.compile(r'(ffd8ffe1)(.{2})(4578696600004d4d002a)(.+)(900000070000000430323030|900000070000000430323130|900000070000000430323230)', re.IGNORECASE),
-        'JPEG image 6': re.compile(r'(ffd8ffe8)(.{2})53504946460001', re.IGNORECASE),
-        'JPEG ISOBMFF container': re.compile(r'(0000000c4a58)(4c|53)(200d0a870a)', re.IGNORECASE),
-        'JPEG XR': re.compile(r'(4949bc01)(.{172})(574d50484f544f00)', re.IGNORECASE),
-        'JPEG XS codestream': re.compile(r'(ff10ff50)', re.IGNORECASE),
-        'JPEG-2000 image': re.compile(r'(0c6a5020|5c7846465c7834465c7846465c7835315c783030|6a7032)', re.IGNORECASE),
-        'JPEG-LS image': re.compile(r'(ffd8fff7)', re.IGNORECASE),
-        'JPEG2000 image files': re.compile(r'(0000000c6a502020)', re.IGNORECASE),
-        'Key or Cert File': re.compile(r'(2d2d2d2d20424547494e|2d2d2d2d424547494e)', re.IGNORECASE),
-        'Keyboard driver file': re.compile(r'(ff4b455942202020)', re.IGNORECASE),
-        'KGB archive': re.compile(r'(4b47425f61726368)', re.IGNORECASE),
-        'Kodak Cineon image': re.compile(r'(802a5fd7)', re.IGNORECASE),
-        'Kodak KDC raw image': re.compile(r'(454153544d414e204b4f44414b20434f4d50414e59)', re.IGNORECASE),
-        'KSysV init package': re.compile(r'(4b53797356)', re.IGNORECASE),
-        'KWAJ (compressed) file': re.compile(r'(4b57414a88f027d1)', re.IGNORECASE),
-        'Kword or Kspread document (encrypted)': re.compile(r'(0d1a270)(1|2)', re.IGNORECASE),
-        'LDIF address book': re.compile(r'(646e3a20636e3d|646e3a206d61696c3d)', re.IGNORECASE),
-        'LHA archive': re.compile(r'(2d6c68202d|2d6c68302d|2d6c68312d|2d6c68322d|2d6c68332d|2d6c68342d|2d6c6834302d|2d6c68352d|2d6c68642d|2d6c7a342d|2d6c7a352d|2d6c7a732d)', re.IGNORECASE),
-        'LIBGRX font': re.compile(r'(5c7831345c7830325c7835395c783139)', re.IGNORECASE),
-        'Linux PSF console font': re.compile(r'(5c7833365c783034)', re.IGNORECASE),
-        'Linux Unified Key Setup Image': re.compile(r'(4c554b53babe000)(1|2)', re.IGNORECASE),
-        'LMZA XZ Archive file': re.compile(r'(fd377a585a00)', re.IGNORECASE),
-        'Logical File Evidence Format': re.compile(r'(4c5646090d0aff00)', re.IGNORECASE),
-        'Lrzip archive': re.compile(r'(4c525a49)', re.IGNORECASE),
-        'LyX document': re.compile(r'(234c7958)', re.IGNORECASE),
-        'LZ4 archive': re.compile(r'(02214c18|04224d18)', re.IGNORECASE),
-        'LZ4 Tar Archive': re.compile(r'(04224d18)', re.IGNORECASE),
-        'Lzip archive': re.compile(r'(4c5a4950)', re.IGNORECASE),
-        'LZO archive': re.compile(r'(5c7838395c7834635c7835615c7834665c7830305c7830645c7830615c7831615c783061)', re.IGNORECASE),
-        'Macintosh BinHex-encoded file': re.compile(r'(6d75737420626520636f6e76657274656420776974682042696e486578)', re.IGNORECASE),
-        'Macintosh MacBinary file': re.compile(r'(6d42494e)', re.IGNORECASE),
-        'MacOS X icon': re.compile(r'(69636e73)', re.IGNORECASE),
-        'Macromedia Shockwave Flash file': re.compile(r'(465753)', re.IGNORECASE),
-        'Macromedia Shockwave Flash': re.compile(r'(5a5753)', re.IGNORECASE),
-        'Macromedia/Shockwave': re.compile(r'(52494658)(.{8})(4647444d|4d563933)', re.IGNORECASE),
-        'MagicISO Disk Image': re.compile(r'(73696262)', re.IGNORECASE),
-        'MagicISO Encrypted': re.compile(r'(73696262)(.{8})(72686c62)', re.IGNORECASE),
-        'mailbox file': re.compile(r'(46726f6d20)', re.IGNORECASE),
-        'MapInfo Interchange Format file': re.compile(r'(56657273696f6e20)', re.IGNORECASE),
-        'MAr compressed archive': re.compile(r'(4d41723000)', re.IGNORECASE),
-        'Material Definitions for OBJ Files': re.compile(r'(426c656e646572204d544c2046696c65|4d6178324d746c)', re.IGNORECASE),
-        'Mathematica Notebook': re.compile(r'(282a2a2a2a2a2a2a2a2a2a2a2a2a2a20436f6e74656e742d747970653a206170706c69636174696f6e2f6d617468656d6174696361)', re.IGNORECASE),
-        'MATLAB script/function': re.compile(r'(66756e6374696f6e)', re.IGNORECASE),
-        'Matroska stream file': re.compile(r'(6d6174726f736b61)', re.IGNORECASE),
-        'Matroska stream': re.compile(r'(1a45dfa3)', re.IGNORECASE),
-        'Maya Project File': re.compile(r'(4d617961)', re.IGNORECASE),
-        'Mbox table of contents file': re.compile(r'(000dbba0)', re.IGNORECASE),
-        'Merriam-WeblockSizeter Pocket Dictionary': re.compile(r'(4d2d5720506f636b)', re.IGNORECASE),
-        'MicroDVD subtitles': re.compile(r'(7b307d|7b317d)', re.IGNORECASE),
-        'Micrografx vector graphic file': re.compile(r'(01ff02040302)', re.IGNORECASE),
-        'Microsoft Access file': re.compile(r'(000100005374616e6461726420)(4a65742|414345)(04442)', re.IGNORECASE),
-        'Microsoft ASX playlist': re.compile(r'(41534620)', re.IGNORECASE),
-        'Microsoft cabinet file': re.compile(r'(4d5343)(46|465c305c305c305c30)', re.IGNORECASE),
-        'Microsoft Code Page Translation file': re.compile(r'(5b57696e646f7773)', re.IGNORECASE),
-        'Microsoft Document Imaging format': re.compile(r'(5c7834355c7835305c7832415c783030)', re.IGNORECASE),
-        'Microsoft Money file': re.compile(r'(000100004d534953414d204461746162617365)', re.IGNORECASE),
-        'Microsoft Office document': re.compile(r'(d0cf11e0a1b11ae1)', re.IGNORECASE),
-        'Microsoft Office PowerPoint Presentation file': re.compile(r'(006e1ef0|0f00e803|a0461df0)', re.IGNORECASE),
-        'Microsoft Office Word Document file': re.compile(r'(eca5c100)', re.IGNORECASE),
-        'Microsoft Outlook Exchange Offline Storage Folder': re.compile(r'(2142444e)', re.IGNORECASE),
-        'Microsoft Windows Imaging Format': re.compile(r'(4d5357494d)', re.IGNORECASE),
-        'Microsoft Windows Media file': re.compile(r'(3026b2758e66cf11a6d900aa0062ce6c)', re.IGNORECASE),
-        'Microsoft Windows User State Migration Tool': re.compile(r'(504d4f43434d4f43)', re.IGNORECASE),
-        'Microsoft|MSN MARC archive': re.compile(r'(4d415243)', re.IGNORECASE),
-        'MIDI sound file': re.compile(r'(4d546864)', re.IGNORECASE),
-        'Milestones project management file': re.compile(r'(4d494c4553|4d56323134|4d563243)', re.IGNORECASE),
-        'MilkShape 3D Model': re.compile(r'(4d533344)', re.IGNORECASE),
-        'Minolta MRW raw image': re.compile(r'(5c7830304d524d)', re.IGNORECASE),
-        'MMC Snap-in Control file': re.compile(r'(3c3f786d6c2076657273696f6e3d22312e30223f3e0d0a3c4d4d435f436f6e736f6c6546696c6520436f6e736f6c6556657273696f6e3d22)', re.IGNORECASE),
-        'MNG animation': re.compile(r'(5c7838414d4e475c7830445c7830415c7831415c783041)', re.IGNORECASE),
-        'Mobipocket eBook file': re.compile(r'(424f4f4b4d4f4249)', re.IGNORECASE),
-        'Modelica model': re.compile(r'(7265636f7264)', re.IGNORECASE),
-        'Monkeys audio': re.compile(r'(4d414320)', re.IGNORECASE),
-        'Mozilla archive': re.compile(r'(4d41523100)', re.IGNORECASE),
-        'MP3 ID3v2.2': re.compile(r'(4944330200)(.{10})(425546|434E54|434F4D|435241|43524D|455443|455155|47454F|49504C|4C4E4B|4D4349|4D4C4C|504943|504F50|524556|525641|534C54|535443|54414C|544250|54434D|54434F|544352|544441|544459|54454E|544654|54494D|544B45|544C41|544C45|544D54|544F41|544F46|544F4C|544F52|544F54|545031|545032|545033|545034|545041|545042|545243|545244|54524B|545349|545353|545431|545432|545433|545854|545858|545945|554649|554C54|574146|574152|574153|57434D|574350|575042|575858)', re.IGNORECASE),
-        'MP3 ID3v2.3/v2.4': re.compile(r'(4944330300|4944330400)(.{10})(41454E43|41504943|41535049|434F4D4D|434F4D52|454E4352|45515532|4554434F|47454F42|47524944|4C494E4B|4D434449|4D4C4C54|4F574E45|50524956|50434E54|504F504D|504F5353|52425546|52564132|52565242|5345454B|5349474E|53594C54|53595443|54414C42|5442504D|54434F4D|54434F4E|54434F50|5444454E|54444C59|54444F52|54445243|5444524C|54445447|54454E43|54455854|54464C54|5449504C|54495431|54495432|54495433|544B4559|544C414E|544C454E|544D434C|544D4544|544D4F4F|544F414C|544F464E|544F4C59|544F5045|544F574E|54504531|54504532|54504533|54504534|54504F53|5450524F|54505542|5452434B|5452534E|5452534F|54534F41|54534F50|54534F54|54535243|54535345|54535354|54585858|55464944|55534552|55534C54|57434F4D|57434F50|574F4146|574F4152|574F4153|574F5253|57504159|57505542|57585858)', re.IGNORECASE),
-        'MP3 ShoutCast playlist': re.compile(r'(5b504c41594c4953545d|5b506c61796c6973745d|5b706c61796c6973745d)', re.IGNORECASE),
-        'MP4 Video': re.compile(r'(69736f32617663316d7034)', re.IGNORECASE),
-        'MPEG video (streamed)': re.compile(r'(234558544d3455)', re.IGNORECASE),
-        'MPEG video file': re.compile(r'(000001b3)', re.IGNORECASE),
-        'MPEG-4 AAC audio': re.compile(r'(fff1)', re.IGNORECASE),
-        'MPEG-4 audio book': re.compile(r'(667479704d3442)', re.IGNORECASE),
-        'MPEG-4 audio': re.compile(r'(667479704d3441)', re.IGNORECASE),
-        'MPEG-4 video file': re.compile(r'(0000001c66747970|000000186674797033677035|667479704d345620|667479704d534e56|6674797066347620|6674797069736f6d|667479706d703432|000000146674797069736f6d|00000018667479706d703432|0000001c667479704d534e56012900464d534e566d703432|6674797033677035)', re.IGNORECASE),
-        'MRML playlist': re.compile(r'(3c6d726d6c20)', re.IGNORECASE),
-        'MS Agent Character file': re.compile(r'(c3abcdab)', re.IGNORECASE),
-        'MS Answer Wizard': re.compile(r'(8a0109000000e108)', re.IGNORECASE),
-        'MS C++ debugging symbols file': re.compile(r'(4d6963726f736f667420432f432b2b20)', re.IGNORECASE),
-        'MS Compiled HTML Help File': re.compile(r'(49545346)', re.IGNORECASE),
-        'MS Developer Studio project file': re.compile(r'(23204d6963726f73)', re.IGNORECASE),
-        'MS Exchange configuration file': re.compile(r'(5b47656e6572616c)', re.IGNORECASE),
-        'MS Fax Cover Sheet': re.compile(r'(464158434f564552)', re.IGNORECASE),
-        'MS Office subheader': re.compile(r'(fdffffff)(02|04|20)', re.IGNORECASE),
-        'MS OneNote note': re.compile(r'(e4525c7b8cd8a74d)', re.IGNORECASE),
-        'MS Reader eBook': re.compile(r'(49544f4c49544c53)', re.IGNORECASE),
-        'MS Visual Studio workspace file': re.compile(r'(64737766696c65)', re.IGNORECASE),
-        'MS Windows journal': re.compile(r'(4e422a00)', re.IGNORECASE),
-        'MS WinMobile personal note': re.compile(r'(7b5c707769)', re.IGNORECASE),
-        'MS Write file': re.compile(r'(be000000ab)', re.IGNORECASE),
-        'MSinfo file': re.compile(r'(fffe23006c006900)', re.IGNORECASE),
-        'MultiBit Bitcoin blockchain file': re.compile(r'(53505642)', re.IGNORECASE),
-        'MultiBit Bitcoin wallet file': re.compile(r'(0a166f72672e626974636f696e2e7072)', re.IGNORECASE),
-        'MultiBit Bitcoin wallet information': re.compile(r'(6d756c74694269742e696e666f)', re.IGNORECASE),
-        'Mup publication': re.compile(r'(2f2f214d7570)', re.IGNORECASE),
-        'Musepack audio': re.compile(r'(4d502b)', re.IGNORECASE),
-        'National Imagery Transmission Format file': re.compile(r'(4e49544630)', re.IGNORECASE),
-        'National Transfer Format Map': re.compile(r'(30314f52444e414e)', re.IGNORECASE),
-        'NAV quarantined virus file': re.compile(r'(cd20aaaa02000000)', re.IGNORECASE),
-        'Nero CD compilation': re.compile(r'(0e4e65726f49534f)', re.IGNORECASE),
-        'NeXT|Sun Microsystems audio file': re.compile(r'(2e736e64)', re.IGNORECASE),
-        'NIFF image': re.compile(r'(49494e31)', re.IGNORECASE),
-        'NTFS MFT (BAAD)': re.compile(r'(42414144)', re.IGNORECASE),
-        'NTFS MFT (FILE)': re.compile(r'(46494c45)', re.IGNORECASE),
-        'NullSoft video': re.compile(r'(4e535666)', re.IGNORECASE),
-        'Objective-C source code': re.compile(r'(23696d706f7274)', re.IGNORECASE),
-        'OctaComposer module': re.compile(r'(4f435441)', re.IGNORECASE),
-        'Ogg Vorbis Codec compressed file': re.compile(r'(4f676753000)(20000000000000000|20000)', re.IGNORECASE),
-        'Ogg': re.compile(r'(4f676753)', re.IGNORECASE),
-        'OLE|SPSS|Visual C++ library file': re.compile(r'(4d53465402000100)', re.IGNORECASE),
-        'OLE2 compound document storage': re.compile(r'(5c3332305c3331375c3032315c3334305c3234315c3236315c3033325c333431|d0cf11e0)', re.IGNORECASE),
-        'Olympus ORF raw image': re.compile(r'(4949524f5c7830385c7830305c7830305c783030)', re.IGNORECASE),
-        'OpenDocument Presentation': re.compile(r'(70726573656e746174696f6e)', re.IGNORECASE),
-        'OpenDocument Spreadsheet': re.compile(r'(7370726561647368656574)', re.IGNORECASE),
-        'OpenEXR bitmap image': re.compile(r'(762f3101)', re.IGNORECASE),
-        'OpenType font': re.compile(r'(4f54544f)', re.IGNORECASE),
-        'Outlook address file': re.compile(r'(9ccbcb8d1375d211)', re.IGNORECASE),
-        'Outlook Express address book (Win95)': re.compile(r'(813284c18505d011)', re.IGNORECASE),
-        'Outlook Express e-mail folder': re.compile(r'(cfad12fe)', re.IGNORECASE),
-        'Pack200 Java archive': re.compile(r'(cafed00d)', re.IGNORECASE),
-        'Packet sniffer files': re.compile(r'(58435000)', re.IGNORECASE),
-        'Panasonic raw image': re.compile(r'(49495500|4949555c7830305c7831385c7830305c7830305c783030)', re.IGNORECASE),
-        'Parchive archive': re.compile(r'(50415232)', re.IGNORECASE),
-        'PathWay Map file': re.compile(r'(74424d504b6e5772)', re.IGNORECASE),
-        'PAX password protected bitmap': re.compile(r'(504158)', re.IGNORECASE),
-        'pcapng capture file': re.compile(r'(0a0d0d0a)', re.IGNORECASE),
-        'PCF font': re.compile(r'(5c303031666370)', re.IGNORECASE),
-        'PCM audio': re.compile(r'(2e736400)', re.IGNORECASE),
-        'PCX bitmap': re.compile(r'(b168de3a)', re.IGNORECASE),
-        'PDF file': re.compile(r'(25504446)', re.IGNORECASE),
-        'PEF executable': re.compile(r'(4a6f7921)', re.IGNORECASE),
-        'Perfect Office Document file': re.compile(r'(cf11e0a1b11ae100)', re.IGNORECASE),
-        'PestPatrol data|scan strings': re.compile(r'(50455354)', re.IGNORECASE),
-        'Pfaff Home Embroidery': re.compile(r'(3203100000000000000080000000ff00)', re.IGNORECASE),
-        'PGN chess game notation': re.compile(r'(5b4576656e7420)', re.IGNORECASE),
-        'PGP disk image': re.compile(r'(504750644d41494e)', re.IGNORECASE),
-        'PGP keys': re.compile(r'(2d2d2d2d2d424547494e205047502050524956415445204b455920424c4f434b2d2d2d2d2d|2d2d2d2d2d424547494e20504750205055424c4943204b455920424c4f434b2d2d2d2d2d)', re.IGNORECASE),
-        "PGP Whole Disk Encryption": re.compile(r'(eb48905047504755415244)', re.IGNORECASE),
-        'Photoshop Custom Shape': re.compile(r'(6375736800000002)', re.IGNORECASE),
-        'Photoshop Image file': re.compile(r'(384250)(53|5320205c3030305c3030305c3030305c303030)', re.IGNORECASE),
-        'PicaTune 2 module': re.compile(r'(3c747261636b206e616d653d22)', re.IGNORECASE),
-        'PKLITE Compressed ZIP Archive file': re.compile(r'(504b4c495445)', re.IGNORECASE),
-        'PKZIP Archive file': re.compile(r'(504b)(0304|0506|0708|5c3030335c303034)', re.IGNORECASE),
-        'Plucker document': re.compile(r'(44617461506c6b72)', re.IGNORECASE),
-        'PNG image': re.compile(r'(5c783839504e47)', re.IGNORECASE),
-        'Pocket Word document': re.compile(r'(7b5c5c)(727466|707769)', re.IGNORECASE),
-        'PokeyNoise Chiptune audio': re.compile(r'(ffffe002e102)', re.IGNORECASE),
-        'Portable Network Graphics file': re.compile(r'(89504e470d0a1a0a)', re.IGNORECASE),
-        'PowerBASIC Debugger Symbols': re.compile(r'(737a657a)', re.IGNORECASE),
-        'PowerISO Direct Access Archive': re.compile(r'(444141)', re.IGNORECASE),
-        'PowerPacker compressed file': re.compile(r'(50503)(131|230)', re.IGNORECASE),
-        'PowerPacker encrypted compressed file': re.compile(r'(50583230)', re.IGNORECASE),
-        'PowerplayerMusic Cruncher file': re.compile(r'(5346)(43|48)(44)', re.IGNORECASE),
-        'PowerPoint presentation subheader': re.compile(r'(fdffffff0e000000|fdffffff1c000000|fdffffff43000000)', re.IGNORECASE),
-        'PS document': re.compile(r'(5c3030342521)', re.IGNORECASE),
-        'PSF audio': re.compile(r'(505346)', re.IGNORECASE),
-        'Puffer ASCII encrypted archive': re.compile(r'(426567696e20507566666572)', re.IGNORECASE),
-        'Puffer encrypted archive': re.compile(r'(50554658)', re.IGNORECASE),
-        'PuTTY User Key File': re.compile(r'(50755454592d557365722d4b65792d46696c65)', re.IGNORECASE),
-        'Python bytecode': re.compile(r'(994e0d0a)', re.IGNORECASE),
-        'Python script': re.compile(r'(23202d2a2d20636f64696e67|23212f7573722f62696e2f656e7620707974686f6e|696d706f727420|2321202f62696e2f707974686f6e|2321202f7573722f62696e2f707974686f6e|2321202f7573722f6c6f63616c2f62696e2f707974686f6e|23212f62696e2f707974686f6e|23212f7573722f62696e2f707974686f6e|23212f7573722f6c6f63616c2f62696e2f707974686f6e|6576616c205c2265786563202f62696e2f707974686f6e|6576616c205c2265786563202f7573722f62696e2f707974686f6e|6576616c205c2265786563202f7573722f6c6f63616c2f62696e2f707974686f6e)', re.IGNORECASE),
-        'Qimage filter': re.compile(r'(76323030332e3130)', re.IGNORECASE),
-        'QOI': re.compile(r'(716f6966)(.{16})(0300|0301|0400|0401)', re.IGNORECASE),
-        'Qpress archive': re.compile(r'(7170726573733130)', re.IGNORECASE),
-        'QtiPlot document': re.compile(r'(517469506c6f74)', re.IGNORECASE),
-        'Quark Express': re.compile(r'(0000)(4949|4d4d)(585052)', re.IGNORECASE),
-        'Quatro Pro for Windows 7.0': re.compile(r'(3e000300feff090006)', re.IGNORECASE),
-        'QuickBooks backup': re.compile(r'(458600000600)', re.IGNORECASE),
-        'QuickReport Report': re.compile(r'(ff0a00)', re.IGNORECASE),
-        'QuickTime image': re.compile(r'(69646174)', re.IGNORECASE),
-        'QuickTime metalink playlist': re.compile(r'(3c3f786d6c|5254535074657874|534d494c74657874|7274737074657874)', re.IGNORECASE),
-        'QuickTime movie file': re.compile(r'(000000146674797071742020|6d6f6f76)', re.IGNORECASE),
-        'QuickTime movie': re.compile(r'(66726565|6674797071742020|6d646174|706e6f74|736b6970|77696465)', re.IGNORECASE),
-        'QuickTime video': re.compile(r'(667479707174)', re.IGNORECASE),
-        'Quite OK audio': re.compile(r'(716f6166)', re.IGNORECASE),
-        'Radiance High Dynamic Range image file': re.compile(r'(233f52414449414e)', re.IGNORECASE),
-        'RagTime document': re.compile(r'(43232b44a4434da5)', re.IGNORECASE),
-        'RAML document': re.compile(r'(232552414d4c20)', re.IGNORECASE),
-        'RAR archive': re.compile(r'(52617221)', re.IGNORECASE),
-        'Raw Image File': re.compile(r'(49495253|49495500)', re.IGNORECASE),
-        'RealAudio file': re.compile(r'(2e524d4600000012|2e524d460000001200)', re.IGNORECASE),
-        'RealAudio media file': re.compile(r'(2e7261fd00)', re.IGNORECASE),
-        'RealMedia media file': re.compile(r'(2e524)(543|d46)', re.IGNORECASE),
-        'RealMedia metafile': re.compile(r'(727473703a2f2f)', re.IGNORECASE),
-        'RIFF CD audio': re.compile(r'(43444441666d7420)', re.IGNORECASE),
-        'RIFF Qualcomm PureVoice': re.compile(r'(514c434d666d7420)', re.IGNORECASE),
-        'RIFF Windows MIDI': re.compile(r'(524d494464617461)', re.IGNORECASE),
-        'RIFF': re.compile(r'(52494646)(.{8})(57415645|41564920|57454250|41434f4e|43444441|514c434d|5644524d|54524944|73687734|73687735|73687235|73686235|524d4d50|7366626b4c495354|5745425056503820|574542505650384c|5745425056503858|696d6167)', re.IGNORECASE),
-        'RTF file': re.compile(r'(7b5c72746631)', re.IGNORECASE),
-        'Runtime Software disk image': re.compile(r'(1a52545320434f4d)', re.IGNORECASE),
-        'SAP Thomson floppy disk image': re.compile(r'(53595354454d452044274152434849564147452050554b414c4c20532e412e502e2028632920416c6578616e6472652050554b414c4c20417672696c2031393938)', re.IGNORECASE),
-        'SAS Transport dataset': re.compile(r'(484541444552205245434f52442a2a2a)', re.IGNORECASE),
-        'SC/Xspread spreadsheet': re.compile(r'(5370726561647368656574)', re.IGNORECASE),
-        'Scalable Vector Graphics Image': re.compile(r'(3c3f786d6c2076657273696f6e3d22312e3022207374616e64616c6f6e653d22796573223f3e0a3c73766720|3c3f786d6c2076657273696f6e3d22312e3022207374616e64616c6f6e653d22796573223f3e3c73766720|3c73766720)', re.IGNORECASE),
-        'PKSFX Compressed file': re.compile(r'(504b537058)', re.IGNORECASE),
-        'SGF record': re.compile(r'(283b46465b335d|283b46465b345d)', re.IGNORECASE),
-        'SGI Bitmap': re.compile(r'(01da)(00010001|01010001|00020001|01020001|00010002|01010002|00020002|01020002|00010003|01010003|00020003|01020003)', re.IGNORECASE),
-        'SGI video': re.compile(r'(4d4f5649)', re.IGNORECASE),
-        'Shanda Bambook eBook file': re.compile(r'(534e425030303042)', re.IGNORECASE),
-        'Shareaza (P2P) thumbnail': re.compile(r'(52415a4154444231)', re.IGNORECASE),
-        'shared library': re.compile(r'(5c313737454c46|5c313737454c462020202020202020202020205c303033)', re.IGNORECASE),
-        'shell script': re.compile(r'(2320546869732069732061207368656c6c2061726368697665)', re.IGNORECASE),
-        'Shorten audio': re.compile(r'(616a6b67)', re.IGNORECASE),
-        'Shotcut project': re.compile(r'(3c6d6c74)', re.IGNORECASE),
-        'Show Partner graphics file': re.compile(r'(475832)', re.IGNORECASE),
-        'Sietronics CPI XRD document': re.compile(r'(53494554524f4e49)', re.IGNORECASE),
-        'Sigma X3F raw image': re.compile(r'(464f5662)', re.IGNORECASE),
-        'SIS package': re.compile(r'(19040010|7a1a2010)', re.IGNORECASE),
-        'Skencil document': re.compile(r'(2323536b65746368)', re.IGNORECASE),
-        'SkinCrafter skin': re.compile(r'(07534b46)', re.IGNORECASE),
-        'Skype audio compression': re.compile(r'(232153494c4b0a)', re.IGNORECASE),
-        'Skype localization data file': re.compile(r'(4d4c5357)', re.IGNORECASE),
-        'Skype user data file': re.compile(r'(6c33336c)', re.IGNORECASE),
-        'Smacker video file (Early format)': re.compile(r'(534d4b32)', re.IGNORECASE),
-        'SmartDraw Drawing file': re.compile(r'(534d415254445257)', re.IGNORECASE),
-        'SMPTE DPX file (little endian)': re.compile(r'(58504453)', re.IGNORECASE),
-        'Softimage XSI 3D Image': re.compile(r'(787369)', re.IGNORECASE),
-        'Sonic Foundry Acid Music File': re.compile(r'(72696666)', re.IGNORECASE),
-        'SoundTool/SNDTOOL Audio File': re.compile(r'(534f554e44)', re.IGNORECASE),
-        'Speedo font': re.compile(r'(44312e305c303135)', re.IGNORECASE),
-        'Speedtouch router firmware': re.compile(r'(424c49323233|424c4932323351)', re.IGNORECASE),
-        'Speex audio': re.compile(r'(5370656578)', re.IGNORECASE),
-        'spreadsheet interchange document': re.compile(r'(49443b)', re.IGNORECASE),
-        'Sprint Music Store audio': re.compile(r'(49443303000000)', re.IGNORECASE),
-        'SPSS Data File': re.compile(r'(24464c32|24464c3240282329|24464c33)', re.IGNORECASE),
-        'SPSS Portable Data File': re.compile(r'(4153434949205350535320504f52542046494c45)', re.IGNORECASE),
-        'SQLite2 database': re.compile(r'(2a2a20546869732066696c6520636f6e7461696e7320616e2053514c697465)', re.IGNORECASE),
-        'SQLite3 database': re.compile(r'(53514c69746520666f726d61742033)', re.IGNORECASE),
-        'Squashfs filesystem': re.compile(r'(68737173|73717368)', re.IGNORECASE),
-        'StarWriter document': re.compile(r'(53746172577269746572)', re.IGNORECASE),
-        'Steganos virtual secure drive': re.compile(r'(414376)', re.IGNORECASE),
-        'StorageCraft ShadownProtect backup file': re.compile(r'(5350464900)', re.IGNORECASE),
-        'StuffIt archive': re.compile(r'(53495421|5349542100)', re.IGNORECASE),
-        'StuffIt compressed archive': re.compile(r'(5374756666497420)', re.IGNORECASE),
-        'SubViewer subtitles': re.compile(r'(5b494e464f524d4154494f4e5d)', re.IGNORECASE),
-        'Sun Raster': re.compile(r'(59a66a95)(.{36})(00000000|00010000|00020000|00030000|00040000|00050000|FFFF0000|00000001|00010001|00020001|00030001|00040001|00050001|FFFF0001|00000002|00010002|00020002|00030002|00040002|00050002|FFFF0002)', re.IGNORECASE),
-        'SuperCalc worksheet': re.compile(r'(537570657243616c)', re.IGNORECASE),
-        'Surfplan kite project file': re.compile(r'(3a56455253494f4e)', re.IGNORECASE),
-        'Symantec Wise Installer log': re.compile(r'(2a2a2a2020496e73)', re.IGNORECASE),
-        'SZDD file format': re.compile(r'(535a444488f02733)', re.IGNORECASE),
-        'Tagged Image File Format file (Motorola)': re.compile(r'(4d4d002a)', re.IGNORECASE),
-        'Tape Archive file': re.compile(r'(7573746172)', re.IGNORECASE),
-        'Tar archive': re.compile(r'(75737461725c30|75737461725c3034305c3034305c30)', re.IGNORECASE),
-        'TargetExpress target file': re.compile(r'(4d435720546563686e6f676f6c696573)', re.IGNORECASE),
-        'Tcpdump capture file': re.compile(r'(34cdb2a1|a1b2c3d4)', re.IGNORECASE),
-        'TESTFILE': re.compile(r'(30313233343536373839)', re.IGNORECASE),
-        'TeX document': re.compile(r'(646f63756d656e74636c617373)', re.IGNORECASE),
-        'TeX font': re.compile(r'(5c3336375c3133315c3336375c3230335c3336375c333132)', re.IGNORECASE),
-        'TGA image': re.compile(r'(5c305c32)', re.IGNORECASE),
-        'TGIF document': re.compile(r'(2554474946)', re.IGNORECASE),
-        'The Bat! Message Base Index': re.compile(r'(01014719a400000000000000)', re.IGNORECASE),
-        'ThumblockSize.db subheader': re.compile(r'(fdffffff)', re.IGNORECASE),
-        'Thunderbird|Mozilla Mail Summary File': re.compile(r'(2f2f203c212d2d203c6d64623a6d6f726b3a7a)', re.IGNORECASE),
-        'TIFF file larger than 4 GB': re.compile(r'(4d4d002b)', re.IGNORECASE),
-        'TIFF file': re.compile(r'(492049|49492a00)', re.IGNORECASE),
-        'TomeRaider2 eBook file': re.compile(r'(370000106d000010d2160010dcf4ddfcd1)', re.IGNORECASE),
-        'TomeRaider3 eBook file': re.compile(r'(5452334454523343)', re.IGNORECASE),
-        'TomTom traffic data': re.compile(r'(4e41565452414646)', re.IGNORECASE),
-        'translated messages (machine-readable)': re.compile(r'(5c3232355c345c32325c333336|5c3333365c32325c345c323235)', re.IGNORECASE),
-        'Troff document': re.compile(r'(272e5c5c5c22|275c5c5c22|2e5c5c5c22|5c5c5c22|54544131)', re.IGNORECASE),
-        'TrueType or TeX font': re.compile(r'(5c3030305c303)(03|23)(15c3030305c3030305c30)(3030|3232)', re.IGNORECASE),
-        'txt2tags document': re.compile(r'(2521656e636f64696e67|2521706f737470726f63)', re.IGNORECASE),
-        'TZX Cassette Tape File': re.compile(r'(5a585461706521)', re.IGNORECASE),
-        'UFA compressed archive': re.compile(r'(554641c6d2c1)', re.IGNORECASE),
-        'UFO Capture map file': re.compile(r'(55464f4f72626974)', re.IGNORECASE),
-        'Underground Audio': re.compile(r'(5343486c)', re.IGNORECASE),
-        'Unicode extensions': re.compile(r'(55434558)', re.IGNORECASE),
-        'Unix archiver (ar)|MS COFF': re.compile(r'(213c617263683e0a)', re.IGNORECASE),
-        'UNIX-compressed file': re.compile(r'(5c3033375c323)(133|335)', re.IGNORECASE),
-        'Usenet news message': re.compile(r'(41727469636c65|506174683a|587265663a)', re.IGNORECASE),
-        'UUencoded file': re.compile(r'(626567696e|626567696e20)', re.IGNORECASE),
-        'V font': re.compile(r'(464f4e54)', re.IGNORECASE),
-        'vCard': re.compile(r'(424547494e3a5643)', re.IGNORECASE),
-        'VCS/ICS calendar': re.compile(r'(424547494e3a5643414c454e444152|626567696e3a7663616c656e646172)', re.IGNORECASE),
-        'VideoVCD|VCDImager file': re.compile(r'(454e545259564344)', re.IGNORECASE),
-        'Visual Basic User-defined Control file': re.compile(r'(56455253494f4e20)', re.IGNORECASE),
-        'Visual C PreCompiled header': re.compile(r'(564350434830)', re.IGNORECASE),
-        'Visual C++ Workbench Info File': re.compile(r'(5b4d535643)', re.IGNORECASE),
-        'Visual Studio .NET file': re.compile(r'(4d6963726f736f66742056697375616c)', re.IGNORECASE),
-        'VMapSource GPS Waypoint Database': re.compile(r'(4d73526366)', re.IGNORECASE),
-        'VocalTec VoIP media file': re.compile(r'(5b564d445d)', re.IGNORECASE),
-        'VRML document': re.compile(r'(2356524d4c20)', re.IGNORECASE),
-        'VRML World': re.compile(r'(56524d4c)', re.IGNORECASE),
-        'Walkman MP3 file': re.compile(r'(574d4d50)', re.IGNORECASE),
-        'WAV audio': re.compile(r'(57415620|57415645)', re.IGNORECASE),
-        'WavPack audio': re.compile(r'(7776706b)', re.IGNORECASE),
-        'Web application cache manifest': re.compile(r'(4341434845204d414e4946455354)', re.IGNORECASE),
-        'WebVTT subtitles': re.compile(r'(574542565454)', re.IGNORECASE),
-        'WhereIsIt Catalog': re.compile(r'(436174616c6f6720)', re.IGNORECASE),
-        'WIM disk Image': re.compile(r'(4d5357494d5c3030305c3030305c303030)', re.IGNORECASE),
-        'Windows audio file ': re.compile(r'(57415645666d7420)', re.IGNORECASE),
-        'Windows Audio Video Interleave file': re.compile(r'(41564)(630|920)(4c495354)', re.IGNORECASE),
-        'Windows graphics metafile': re.compile(r'(d7cdc69a)', re.IGNORECASE),
-        'Windows Media Player playlist': re.compile(r'(4d6963726f736f66742057696e646f7773204d6564696120506c61796572202d2d20)', re.IGNORECASE),
-        'Windows Media Station file': re.compile(r'(5b416464726573735d)', re.IGNORECASE),
-        'WinDump (winpcap) capture file': re.compile(r'(d4c3b2a1)', re.IGNORECASE),
-        'WinHelp': re.compile(r'(3f5f0300)(.{4})(0000ffffffff)', re.IGNORECASE),
-        'WinNT Netmon capture file': re.compile(r'(52545353)', re.IGNORECASE),
-        'WinNT printer spool file': re.compile(r'(66490000)', re.IGNORECASE),
-        'WinNT registry file': re.compile(r'(72656766)', re.IGNORECASE),
-        'WinNT Registry|Registry Undo files': re.compile(r'(52454745444954)', re.IGNORECASE),
-        'WinOnCD Image file (Adaptec version)': re.compile(r'(4164617074656320436551756164726174205669727475616c43442046696c65)', re.IGNORECASE),
-        'WinOnCD Image file (Roxio version)': re.compile(r'(526f78696f20496d6167652046696c6520466f726d617420332e30)', re.IGNORECASE),
-        'WinRAR Compressed Archive file': re.compile(r'(526172211a070)(0|100)', re.IGNORECASE),
-        'WOFF font': re.compile(r'(774f4646)', re.IGNORECASE),
-        'WOFF2 Font': re.compile(r'(774f4632)', re.IGNORECASE),
-        'Word 2.0 file': re.compile(r'(dba52d00)', re.IGNORECASE),
-        'Word document': re.compile(r'(4d6963726f736f667420576f726420646f63756d656e742064617461|504f5e5160|5c3333335c3234352d5c305c305c30|5c3337365c3036375c305c303433|5c7833315c7862655c7830305c783030|626a626a|6a626a62)', re.IGNORECASE),
-        'WordPerfect dictionary': re.compile(r'(434246494c45)', re.IGNORECASE),
-        'WordPerfect document': re.compile(r'(575043)', re.IGNORECASE),
-        'WordPerfect text and graphics': re.compile(r'(ff575043)', re.IGNORECASE),
-        'WordPerfect text': re.compile(r'(81cdab)', re.IGNORECASE),
-        'WordStar for Windows file': re.compile(r'(575332303030)', re.IGNORECASE),
-        'X BitMap image': re.compile(r'(23646566696e6520)', re.IGNORECASE),
-        'X11 cursor': re.compile(r'(58637572)', re.IGNORECASE),
-        'XAR archive': re.compile(r'(78617221)', re.IGNORECASE),
-        'Xara3D Project': re.compile(r'(583344)', re.IGNORECASE),
-        'XFig image': re.compile(r'(23464947)', re.IGNORECASE),
-        'XMCD CD database': re.compile(r'(2320786d6364)', re.IGNORECASE),
-        'XMF audio': re.compile(r'(584d465f|5c3133305c3131355c3130365c3133375c3036325c3035365c3036305c3036305c3030305c3030305c3030305c303032)', re.IGNORECASE),
-        'XPACK compressed file': re.compile(r'(585041434b)', re.IGNORECASE),
-        'XPCOM libraries': re.compile(r'(5850434f4d0a5479)', re.IGNORECASE),
-        'XPM image': re.compile(r'(2f2a2058504d)', re.IGNORECASE),
-        'XZ archive': re.compile(r'(5c7866645c7833375c7837615c7835385c7835615c783030)', re.IGNORECASE),
-        'Yamaha SMAF (MMF)': re.compile(r'(4d4d4d44)', re.IGNORECASE),
-        'YAML document': re.compile(r'(2559414d4c)', re.IGNORECASE),
-        'YUV4MPEG2 video file': re.compile(r'(595556344d504547)', re.IGNORECASE),
-        'zisofs compressed file': re.compile(r'(37e45396c9dbd607)', re.IGNORECASE),
-        'ZoneAlam data file': re.compile(r'(4d5a90000300000004000000ffff)', re.IGNORECASE),
-        'Zoo archive': re.compile(r'(dca7c4fd)', re.IGNORECASE),
-        'ZOO compressed archive': re.compile(r'(5a4f4f20)', re.IGNORECASE),
-        'ZoomBrowser Image Index': re.compile(r'(7a626578)', re.IGNORECASE),
-        'ZStandard Archive': re.compile(r'(28b52ffd)', re.IGNORECASE)
-    }
 
-    found_signatures_total = dict.fromkeys(signatures.keys(), 0)
+def perform_signature_analysis(filename, bs: int, index_path: str | None = None,
+                               families=None) -> dict[str | Any, int]:
+    # Усі сигнатури шукаються за один прохід по байтах, а не окремими regex по hex-рядку.
+    # Автомат вибраних родин береться з кешу signature_db
+    matcher = signature_db.get_matcher(families)
+    # Якщо задано index_path, зберігаються також зсуви всіх збігів
+    scanner = signature_engine.SignatureScanner(matcher, record_hits=index_path is not None)
 
-    with open(filename, 'rb') as file:
+    # filename - шлях або compacted_image.CompactedImage
+    with open_source(filename, use_mmap=False) as source:
         n = 0
-        while True:
-            chunk = file.read(bs)
-            if not chunk:
-                break
+        for _, chunk in source.blocks(0, bs):
             n += len(chunk)
             # print(n / 1048576, end=": ")
-            for idx, sig_type in enumerate(signatures):
-                sig = signatures[sig_type]
-                # if idx % 100 == 0:
-                    # print(idx, end=", ", flush=True)
-                found_signatures_total[sig_type] += find_bytes_pattern(chunk.hex(), sig)
+            scanner.feed(chunk)
             del chunk
             # print('\r')
 
-    with open(f"{filename.split("/")[-1]}_signatures_total.txt", "w") as file:
-        file.write(f"{filename}\t{sum(found_signatures_total.values())}\t{found_signatures_total}")
+    scanner.finish()
+    found_signatures_total = scanner.totals()
+
+    save_signature_totals(image_name(filename), found_signatures_total)
+    if index_path is not None:
+        # Зсуви збігів у представленні переводяться в координати оригінального образу
+        hit_offsets, hit_ids = scanner.hits()
+        SignatureIndex.build(matcher.names, original_offsets(filename, hit_offsets), hit_ids).save(index_path)
 
     return found_signatures_total
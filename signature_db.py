@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+import signature_engine
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "signatures.json")
+CACHE_DIR = os.environ.get("SIGNATURE_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "dec24_signatures"))
+
+FAMILIES = ("archive", "audio", "crypto", "database", "disk_image", "document", "executable", "font", "image",
+            "video", "other")
+# Групи родин, які можна вказувати замість окремих родин
+FAMILY_GROUPS = {
+    "media": ("audio", "image", "video"),
+}
+
+
+def resolve_families(families: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """
+    Перетворює список родин і груп на відсортований кортеж родин.
+    None означає всі сигнатури.
+    """
+    if families is None:
+        return None
+    if isinstance(families, str):
+        families = [families]
+    resolved = set()
+    for family in families:
+        if family in FAMILY_GROUPS:
+            resolved.update(FAMILY_GROUPS[family])
+        elif family in FAMILIES:
+            resolved.add(family)
+        else:
+            raise ValueError(f"Невідома родина сигнатур: {family}")
+    return tuple(sorted(resolved))
+
+
+@lru_cache(maxsize=None)
+def _read_db(db_path: str) -> Tuple[bytes, tuple]:
+    with open(db_path, "rb") as file:
+        raw = file.read()
+    entries = tuple((entry["name"], entry["family"], entry["pattern"]) for entry in json.loads(raw))
+    return raw, entries
+
+
+def load_signatures(families: Optional[Iterable[str]] = None, db_path: str = DB_PATH) -> dict[str, str]:
+    """
+    Повертає hex-шаблони сигнатур {назва: шаблон} вибраних родин у порядку бази.
+    """
+    families = resolve_families(families)
+    _, entries = _read_db(db_path)
+    return {name: pattern for name, family, pattern in entries if families is None or family in families}
+
+
+def signature_families(db_path: str = DB_PATH) -> dict[str, str]:
+    # Родина кожної сигнатури бази {назва: родина}
+    _, entries = _read_db(db_path)
+    return {name: family for name, family, _ in entries}
+
+
+def database_hash(db_path: str = DB_PATH) -> str:
+    raw, _ = _read_db(db_path)
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compile_signatures(families: Optional[Iterable[str]] = None, db_path: str = DB_PATH) -> dict[str, re.Pattern]:
+    return {name: re.compile(pattern, re.IGNORECASE)
+            for name, pattern in load_signatures(families, db_path).items()}
+
+
+def _cache_key(families: Optional[Tuple[str, ...]], db_path: str) -> str:
+    # Кеш залежить від вмісту бази, вибраних родин і коду рушія
+    raw, _ = _read_db(db_path)
+    with open(signature_engine.__file__, "rb") as file:
+        engine_source = file.read()
+    digest = hashlib.sha256()
+    digest.update(raw)
+    digest.update(repr(families).encode())
+    digest.update(engine_source)
+    return digest.hexdigest()
+
+
+def _load_cached_matcher(cache_path: str) -> Optional[signature_engine.SignatureMatcher]:
+    try:
+        with open(cache_path, "rb") as file:
+            return pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def _save_cached_matcher(cache_path: str, matcher: signature_engine.SignatureMatcher) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Запис через тимчасовий файл, щоб паралельні процеси не прочитали неповний кеш
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(matcher, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Кеш необов'язковий: без доступу на запис автомат просто будується щоразу
+        pass
+
+
+@lru_cache(maxsize=None)
+def _get_matcher(families: Optional[Tuple[str, ...]], db_path: str,
+                 cache_dir: Optional[str]) -> signature_engine.SignatureMatcher:
+    if cache_dir is None:
+        return signature_engine.SignatureMatcher(load_signatures(families, db_path))
+
+    cache_path = os.path.join(cache_dir, f"{_cache_key(families, db_path)}.pickle")
+    matcher = _load_cached_matcher(cache_path)
+    if matcher is None:
+        matcher = signature_engine.SignatureMatcher(load_signatures(families, db_path))
+        _save_cached_matcher(cache_path, matcher)
+    return matcher
+
+
+def get_matcher(families: Optional[Iterable[str]] = None, db_path: str = DB_PATH,
+                cache_dir: Optional[str] = CACHE_DIR) -> signature_engine.SignatureMatcher:
+    """
+    Автомат сигнатур вибраних родин. Будується один раз на процес, а між
+    запусками зберігається на диску в cache_dir (None вимикає дисковий кеш).
+
+    Args:
+        families: Родини або групи родин (FAMILIES, FAMILY_GROUPS), None - усі
+        db_path: Шлях до бази сигнатур
+        cache_dir: Каталог дискового кешу
+    """
+    return _get_matcher(resolve_families(families), os.path.abspath(db_path), cache_dir)
@@ -0,0 +1,326 @@
+import itertools
+import re
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numba
+import numpy as np
+
+# Елементи шістнадцяткових шаблонів сигнатур: група з альтернативами, пропуск
+# .{N}, довільна послідовність .+, клас символів [..] або літерал
+_TOKEN = re.compile(r'\(([^()]*)\)|\.\{(\d+)\}|(\.\+)|\[([0-9a-fA-F]+)\]|([0-9a-fA-F]+)')
+
+# Позначка для .+ серед альтернатив елемента
+_ANY = '+'
+
+
+def _parse_hex_pattern(pattern: str) -> List[List[str]]:
+    """
+    Розбирає шістнадцятковий шаблон у послідовність елементів. Кожен елемент -
+    список альтернатив на рівні півбайтів, '.' позначає довільний півбайт.
+    """
+    elements = []
+    pos = 0
+    while pos < len(pattern):
+        match = _TOKEN.match(pattern, pos)
+        if match is None:
+            raise ValueError(f"Непідтримуваний синтаксис у шаблоні {pattern!r} на позиції {pos}")
+        group, gap, any_seq, char_class, literal = match.groups()
+        if group is not None:
+            alternatives = []
+            for alternative in group.split('|'):
+                # Альтернатива сама може складатися з пропусків чи класів
+                sub_elements = _parse_hex_pattern(alternative)
+                if any(_ANY in element for element in sub_elements):
+                    if len(sub_elements) != 1:
+                        raise ValueError(f"Непідтримуваний синтаксис у шаблоні {pattern!r}")
+                    alternatives.append(_ANY)
+                else:
+                    alternatives.extend(''.join(parts) for parts in itertools.product(*sub_elements))
+            elements.append(alternatives)
+        elif gap is not None:
+            elements.append(['.' * int(gap)])
+        elif any_seq is not None:
+            elements.append([_ANY])
+        elif char_class is not None:
+            elements.append(list(char_class))
+        else:
+            elements.append([literal])
+        pos = match.end()
+    return elements
+
+
+def _to_pieces(nibbles: str) -> Tuple[tuple, tuple, int]:
+    """
+    Рядок півбайтів -> конкретні шматки (зсув, байти), байти з маскою
+    (зсув, значення, маска) для половинних пропусків та загальна довжина.
+    """
+    if len(nibbles) % 2:
+        # Непарний шаблон закінчується на старшому півбайті наступного байта
+        nibbles += '.'
+
+    pieces = []
+    masked = []
+    run_start = None
+    for i in range(0, len(nibbles), 2):
+        pair = nibbles[i:i + 2]
+        if '.' in pair and run_start is not None:
+            pieces.append((run_start // 2, bytes.fromhex(nibbles[run_start:i])))
+            run_start = None
+        if pair == '..':
+            continue
+        if '.' in pair:
+            masked.append((i // 2, int(pair.replace('.', '0'), 16), 0xf0 if pair[1] == '.' else 0x0f))
+        elif run_start is None:
+            run_start = i
+    if run_start is not None:
+        pieces.append((run_start // 2, bytes.fromhex(nibbles[run_start:])))
+    return tuple(pieces), tuple(masked), len(nibbles) // 2
+
+
+def compile_variants(pattern: str) -> list:
+    """
+    Перетворює шістнадцятковий шаблон на список варіантів у порядку, в якому їх
+    перебирає re: (шматки, байти з маскою, фіксована довжина, хвости після .+
+    або None).
+    """
+    elements = _parse_hex_pattern(pattern.lower())
+
+    any_idx = next((i for i, element in enumerate(elements) if _ANY in element), None)
+    head = elements if any_idx is None else elements[:any_idx]
+    tails = None
+    if any_idx is not None:
+        if elements[any_idx] != [_ANY]:
+            raise ValueError(f"Непідтримуваний синтаксис у шаблоні {pattern!r}")
+        tail_elements = elements[any_idx + 1:]
+        if not tail_elements or any(_ANY in element or any('.' in alt for alt in element) for element in tail_elements):
+            raise ValueError(f"Після .+ очікуються лише літерали у шаблоні {pattern!r}")
+        tails = tuple(bytes.fromhex(''.join(parts)) for parts in itertools.product(*tail_elements))
+
+    variants = []
+    for parts in itertools.product(*head):
+        pieces, masked, length = _to_pieces(''.join(parts))
+        if not pieces or pieces[0][0] != 0:
+            raise ValueError(f"Шаблон {pattern!r} має починатися з літерала")
+        variants.append((pieces, masked, length, tails))
+    return variants
+
+
+@numba.njit(cache=True, nogil=True)
+def _scan(data, delta, out_ptr, out_ids, state, hit_pos, hit_ids):
+    n_hits = 0
+    cap = len(hit_pos)
+    for i in range(len(data)):
+        state = delta[state, data[i]]
+        for k in range(out_ptr[state], out_ptr[state + 1]):
+            if n_hits < cap:
+                hit_pos[n_hits] = i
+                hit_ids[n_hits] = out_ids[k]
+            n_hits += 1
+    return state, n_hits
+
+
+class SignatureMatcher(object):
+    """
+    Скомпільований набір сигнатур: один автомат Ахо-Корасік на рівні байтів.
+
+    Якорем кожного варіанта є його початковий літерал (до першого пропуску).
+    Автомат за один прохід знаходить усі входження якорів, а пропуски,
+    подальші літерали та хвости після .+ перевіряються лише для знайдених
+    якорів.
+    """
+    def __init__(self, signatures: dict):
+        self._names = list(signatures.keys())
+        self._variants = []
+
+        anchors = dict()
+        anchor_variants = []
+        max_length = 1
+        for sig_id, (name, regex) in enumerate(signatures.items()):
+            pattern = regex.pattern if isinstance(regex, re.Pattern) else regex
+            for priority, (pieces, masked, length, tails) in enumerate(compile_variants(pattern)):
+                variant_id = len(self._variants)
+                self._variants.append((sig_id, pieces, masked, length, tails))
+                anchor = pieces[0][1]
+                if anchor not in anchors:
+                    anchors[anchor] = len(anchors)
+                    anchor_variants.append([])
+                anchor_variants[anchors[anchor]].append((sig_id, priority, variant_id))
+                max_length = max(max_length, length + (1 + max(map(len, tails)) if tails else 0))
+
+        self._anchors = list(anchors.keys())
+        self._anchor_lengths = [len(anchor) for anchor in self._anchors]
+        self._anchor_variants = anchor_variants
+        # Найдовший можливий збіг з фіксованою довжиною
+        self._max_length = max_length
+        self._build_automaton()
+
+    def _build_automaton(self):
+        goto = [dict()]
+        outputs = [[]]
+        for anchor_id, anchor in enumerate(self._anchors):
+            state = 0
+            for byte in anchor:
+                if byte not in goto[state]:
+                    goto.append(dict())
+                    outputs.append([])
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].append(anchor_id)
+
+        n_states = len(goto)
+        delta = np.zeros((n_states, 256), dtype=np.int32)
+        fail = [0] * n_states
+
+        # Обхід у ширину: рядок переходів стану успадковується від стану відмови
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            if state != 0:
+                delta[state] = delta[fail[state]]
+            for byte, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state], byte] if state != 0 else 0
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+                queue.append(next_state)
+            for byte, next_state in goto[state].items():
+                delta[state, byte] = next_state
+
+        out_ptr = np.zeros(n_states + 1, dtype=np.int64)
+        out_ptr[1:] = np.cumsum([len(output) for output in outputs])
+        self._delta = delta
+        self._out_ptr = out_ptr
+        self._out_ids = np.array([anchor_id for output in outputs for anchor_id in output], dtype=np.int32)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def max_length(self) -> int:
+        return self._max_length
+
+    def find_anchors(self, data: np.ndarray, state: int = 0) -> Tuple[int, np.ndarray, np.ndarray]:
+        """
+        Повертає (новий стан, кінцеві позиції, ідентифікатори якорів).
+        Стан автомата передається між блоками, тож збіги на межах не губляться.
+        """
+        hit_pos = np.empty(max(16, len(data) // 1024), dtype=np.int64)
+        hit_ids = np.empty(len(hit_pos), dtype=np.int32)
+        new_state, n_hits = _scan(data, self._delta, self._out_ptr, self._out_ids, state, hit_pos, hit_ids)
+        if n_hits > len(hit_pos):
+            # Буфер замалий: повторюємо прохід з того ж стану
+            hit_pos = np.empty(n_hits, dtype=np.int64)
+            hit_ids = np.empty(n_hits, dtype=np.int32)
+            new_state, n_hits = _scan(data, self._delta, self._out_ptr, self._out_ids, state, hit_pos, hit_ids)
+        return new_state, hit_pos[:n_hits], hit_ids[:n_hits]
+
+    def candidates(self, base: int, hit_pos: np.ndarray, hit_ids: np.ndarray) -> list:
+        # (сигнатура, абсолютний початок, пріоритет варіанта, варіант)
+        result = []
+        for pos, anchor_id in zip(hit_pos.tolist(), hit_ids.tolist()):
+            start = base + pos - self._anchor_lengths[anchor_id] + 1
+            for sig_id, priority, variant_id in self._anchor_variants[anchor_id]:
+                result.append((sig_id, start, priority, variant_id))
+        return result
+
+    def match_length(self, variant_id: int, window: bytes, start: int) -> int:
+        """
+        Довжина збігу варіанта, що починається з індексу start у window, або -1.
+        """
+        _, pieces, masked, length, tails = self._variants[variant_id]
+        if start + length > len(window):
+            return -1
+        for offset, literal in pieces:
+            if window[start + offset:start + offset + len(literal)] != literal:
+                return -1
+        for offset, value, mask in masked:
+            if window[start + offset] & mask != value:
+                return -1
+        if tails is None:
+            return length
+
+        # .+ жадібний: береться останнє входження хвоста у вікні
+        best_end = -1
+        for tail in tails:
+            pos = window.rfind(tail, start + length + 1)
+            if pos >= 0:
+                best_end = max(best_end, pos + len(tail))
+        return best_end - start if best_end >= 0 else -1
+
+
+class SignatureScanner(object):
+    """
+    Потоковий підрахунок сигнатур.
+
+    Для кожної сигнатури рахуються неперекривні збіги зліва направо, як у
+    re.findall по байтах, тобто лише збіги, вирівняні на межу байта. Збіги, що
+    перетинають межі блоків, враховуються. Хвіст після .+ шукається в межах
+    поточного вікна (блок разом із залишком попереднього).
+    """
+    def __init__(self, matcher: SignatureMatcher, count_from: int = 0, count_to: Optional[int] = None, base: int = 0,
+                 record_hits: bool = False):
+        self._matcher = matcher
+        self._state = 0
+        self._offset = base
+        self._tail = b""
+        self._pending = []
+        self._next_free = [0] * len(matcher.names)
+        self._counts = [0] * len(matcher.names)
+        # Збіги з початком поза [count_from, count_to) впливають на перекриття, але не рахуються
+        self._count_from = count_from
+        self._count_to = count_to
+        # Зсуви та номери сигнатур усіх врахованих збігів для signature_index
+        self._record_hits = record_hits
+        self._hit_offsets = []
+        self._hit_ids = []
+
+    def feed(self, chunk) -> None:
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        self._state, hit_pos, hit_ids = self._matcher.find_anchors(data, self._state)
+        self._pending.extend(self._matcher.candidates(self._offset, hit_pos, hit_ids))
+
+        window = self._tail + bytes(chunk)
+        window_base = self._offset - len(self._tail)
+        self._offset += len(data)
+        self._process(window, window_base, final=False)
+
+        keep = self._matcher.max_length - 1
+        self._tail = window[max(0, len(window) - keep):] if keep else b""
+
+    def finish(self) -> None:
+        self._process(self._tail, self._offset - len(self._tail), final=True)
+
+    def _process(self, window: bytes, window_base: int, final: bool):
+        if not self._pending:
+            return
+        self._pending.sort()
+        limit = window_base + len(window) - self._matcher.max_length
+
+        deferred = []
+        for candidate in self._pending:
+            sig_id, start, priority, variant_id = candidate
+            # Можливо, збіг ще не повністю прочитаний
+            if not final and start > limit:
+                deferred.append(candidate)
+                continue
+            if start < self._next_free[sig_id]:
+                continue
+            length = self._matcher.match_length(variant_id, window, start - window_base)
+            if length < 0:
+                continue
+            self._next_free[sig_id] = start + length
+            if start >= self._count_from and (self._count_to is None or start < self._count_to):
+                self._counts[sig_id] += 1
+                if self._record_hits:
+                    self._hit_offsets.append(start)
+                    self._hit_ids.append(sig_id)
+        self._pending = deferred
+
+    def totals(self) -> dict:
+        return dict(zip(self._matcher.names, self._counts))
+
+    def hits(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (зсуви, номери сигнатур) врахованих збігів; потребує record_hits=True.
+        """
+        return np.array(self._hit_offsets, dtype=np.uint64), np.array(self._hit_ids, dtype=np.uint16)
@@ -0,0 +1,125 @@
+import json
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+import signature_db
+
+
+def _paths(path: str) -> Tuple[str, str, str, str]:
+    return f"{path}.offsets.npy", f"{path}.ids.npy", f"{path}.by_signature.npy", f"{path}.names.json"
+
+
+class SignatureIndex(object):
+    """
+    Індекс знайдених сигнатур: абсолютний зсув (uint64) та номер сигнатури
+    (uint16) кожного збігу, відсортовані за зсувом.
+
+    На диску зберігається як кілька .npy файлів, які відкриваються через
+    memory map, тож запити не читають увесь індекс і не потребують повторного
+    сканування образу. Разом з назвами зберігаються родини сигнатур з
+    signature_db, тож збіги можна вибирати за родиною.
+    """
+    def __init__(self, names: List[str], offsets: np.ndarray, ids: np.ndarray, by_signature: np.ndarray,
+                 signature_ptr: List[int], families: Optional[List[Optional[str]]] = None):
+        self._names = list(names)
+        self._families = list(families) if families is not None else _families_of(self._names)
+        self._name_ids = {name: idx for idx, name in enumerate(self._names)}
+        self._offsets = offsets
+        self._ids = ids
+        # Номери збігів, згруповані за сигнатурою (CSR), для запитів за сигнатурою
+        self._by_signature = by_signature
+        self._signature_ptr = list(signature_ptr)
+
+    @classmethod
+    def build(cls, names: List[str], offsets, ids, families: Optional[List[Optional[str]]] = None) -> "SignatureIndex":
+        offsets = np.asarray(offsets)
+        ids = np.asarray(ids, dtype=np.uint16)
+        if offsets.dtype.kind == "i":
+            # Збіги без відповідника в образі (зсув -1) не індексуються
+            mapped = offsets >= 0
+            offsets, ids = offsets[mapped], ids[mapped]
+        offsets = offsets.astype(np.uint64)
+        order = np.lexsort((ids, offsets))
+        offsets = offsets[order]
+        ids = ids[order]
+        # Стабільне сортування зберігає порядок зсувів усередині сигнатури
+        by_signature = np.argsort(ids, kind="stable").astype(np.uint64)
+        signature_ptr = [0] + np.cumsum(np.bincount(ids, minlength=len(names))).tolist()
+        return cls(names, offsets, ids, by_signature, signature_ptr, families)
+
+    @classmethod
+    def load(cls, path: str) -> "SignatureIndex":
+        offsets_path, ids_path, by_signature_path, names_path = _paths(path)
+        with open(names_path, "r") as file:
+            meta = json.load(file)
+        return cls(meta["names"],
+                   np.load(offsets_path, mmap_mode="r"),
+                   np.load(ids_path, mmap_mode="r"),
+                   np.load(by_signature_path, mmap_mode="r"),
+                   meta["signature_ptr"],
+                   # Індекси, збережені без родин, доповнюються з бази
+                   meta.get("families"))
+
+    def save(self, path: str) -> None:
+        offsets_path, ids_path, by_signature_path, names_path = _paths(path)
+        np.save(offsets_path, self._offsets)
+        np.save(ids_path, self._ids)
+        np.save(by_signature_path, self._by_signature)
+        with open(names_path, "w") as file:
+            json.dump({"names": self._names, "families": self._families, "signature_ptr": self._signature_ptr},
+                      file)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def families(self) -> List[Optional[str]]:
+        return self._families
+
+    def counts(self) -> dict:
+        return dict(zip(self._names, np.diff(self._signature_ptr).tolist()))
+
+    def hits_in_range(self, start: int, end: int) -> List[Tuple[int, str]]:
+        """
+        Збіги з початком у [start, end): список (зсув, назва сигнатури).
+        """
+        lo = np.searchsorted(self._offsets, start, side="left")
+        hi = np.searchsorted(self._offsets, end, side="left")
+        return [(offset, self._names[sig_id]) for offset, sig_id in
+                zip(self._offsets[lo:hi].tolist(), self._ids[lo:hi].tolist())]
+
+    def hits_of(self, names: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        Відсортовані зсуви всіх збігів заданої сигнатури або групи сигнатур.
+        """
+        if isinstance(names, str):
+            names = [names]
+        parts = []
+        for name in names:
+            if name not in self._name_ids:
+                raise KeyError(f"Невідома сигнатура: {name}")
+            sig_id = self._name_ids[name]
+            rows = self._by_signature[self._signature_ptr[sig_id]:self._signature_ptr[sig_id + 1]]
+            parts.append(self._offsets[rows])
+        if not parts:
+            return np.empty(0, dtype=np.uint64)
+        return np.sort(np.concatenate(parts))
+
+    def hits_of_family(self, families: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        Відсортовані зсуви всіх збігів сигнатур заданих родин або груп родин
+        (signature_db.FAMILIES, signature_db.FAMILY_GROUPS).
+        """
+        families = set(signature_db.resolve_families(families))
+        return self.hits_of([name for name, family in zip(self._names, self._families) if family in families])
+
+
+def _families_of(names: List[str]) -> List[Optional[str]]:
+    # Родини з бази сигнатур; сигнатури поза базою не належать жодній родині
+    families = signature_db.signature_families()
+    return [families.get(name) for name in names]
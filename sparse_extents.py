@@ -0,0 +1,108 @@
+import errno
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+
+def data_extents(fd: int, size: int) -> List[Tuple[int, int]]:
+    """
+    Діапазони (start, end) файлу, що містять дані, за SEEK_DATA/SEEK_HOLE.
+    Решта файлу - діри, які читаються як нулі. Якщо файлова система не
+    повідомляє про діри, весь файл вважається даними.
+    """
+    if size <= 0:
+        return []
+    if not hasattr(os, "SEEK_DATA"):
+        return [(0, size)]
+
+    extents = []
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # Після offset лише діра до кінця файлу
+                break
+            if e.errno in (errno.EINVAL, errno.EOPNOTSUPP):
+                return [(0, size)]
+            raise
+        if start >= size:
+            break
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        extents.append((start, end))
+        offset = end
+    return extents
+
+
+def holes_of(extents: List[Tuple[int, int]], size: int) -> List[Tuple[int, int]]:
+    # Доповнення діапазонів даних до [0, size)
+    holes = []
+    position = 0
+    for start, end in extents:
+        if start > position:
+            holes.append((position, start))
+        position = end
+    if position < size:
+        holes.append((position, size))
+    return holes
+
+
+def merge(regions: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # Об'єднує суміжні впорядковані регіони, щоб блоки на їх межі теж вважались дірою
+    merged = []
+    for start, end in regions:
+        if merged and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def hole_bytes(holes: List[Tuple[int, int]], start: int, end: int) -> int:
+    # Кількість байтів дір у [start, end)
+    return sum(max(0, min(end, hole_end) - max(start, hole_start)) for hole_start, hole_end in holes)
+
+
+def clip(extents: List[Tuple[int, int]], start: int, end: int) -> List[Tuple[int, int]]:
+    # Частини діапазонів, що лежать у [start, end)
+    return [(max(start, s), min(end, e)) for s, e in extents if s < end and e > start]
+
+
+def region_blocks(regions, offset: int, length: int, block_size: int) -> np.ndarray:
+    """
+    Номер регіону (start, end, ...), в якому повністю лежить кожен блок
+    [offset + i * block_size, ...) діапазону довжиною length, або -1.
+    Регіони не перетинаються і впорядковані. Останній блок може бути неповним.
+    """
+    n_blocks = -(-length // block_size)
+    if not len(regions) or not n_blocks:
+        return np.full(n_blocks, -1, dtype=np.int64)
+    region_starts = np.array([region[0] for region in regions], dtype=np.int64)
+    region_ends = np.array([region[1] for region in regions], dtype=np.int64)
+    block_starts = offset + np.arange(n_blocks, dtype=np.int64) * block_size
+    block_ends = np.minimum(block_starts + block_size, offset + length)
+    # Блок може лежати лише в останньому регіоні, що починається не пізніше за нього
+    idx = np.searchsorted(region_starts, block_starts, side="right") - 1
+    inside = (idx >= 0) & (region_ends[np.maximum(idx, 0)] >= block_ends)
+    return np.where(inside, idx, -1)
+
+
+def hole_blocks(holes: List[Tuple[int, int]], offset: int, length: int, block_size: int) -> np.ndarray:
+    """
+    Маска блоків [offset + i * block_size, ...) діапазону довжиною length,
+    що повністю лежать у дірах. Останній блок може бути неповним.
+    """
+    return region_blocks(holes, offset, length, block_size) >= 0
+
+
+def chunks(size: int, chunk_size: int, holes: List[Tuple[int, int]]) -> Iterator[Tuple[int, int, bool]]:
+    """
+    Фрагменти (offset, length, у_дірі) сітки chunk_size. Фрагмент вважається
+    дірою, лише якщо повністю в ній лежить, тож межі блоків аналізаторів не зсуваються.
+    """
+    mask = hole_blocks(holes, 0, size, chunk_size)
+    for i, in_hole in enumerate(mask.tolist()):
+        offset = i * chunk_size
+        yield offset, min(chunk_size, size - offset), in_hole
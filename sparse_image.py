@@ -0,0 +1,194 @@
+import struct
+from typing import List, Tuple
+
+import numpy as np
+
+import sparse_extents
+from block_source import BlockSource, ReadOnlyView, validate_image_file
+
+SPARSE_HEADER_MAGIC = 0xED26FF3A
+
+# Типи фрагментів формату Android sparse (system/core/libsparse/sparse_format.h)
+CHUNK_TYPE_RAW = 0xCAC1
+CHUNK_TYPE_FILL = 0xCAC2
+CHUNK_TYPE_DONT_CARE = 0xCAC3
+CHUNK_TYPE_CRC32 = 0xCAC4
+
+_FILE_HEADER = struct.Struct("<IHHHHIIII")
+_CHUNK_HEADER = struct.Struct("<HHII")
+
+
+def is_sparse_image(path: str) -> bool:
+    if not validate_image_file(path):
+        return False
+    with open(path, "rb") as file:
+        magic = file.read(4)
+    return len(magic) == 4 and struct.unpack("<I", magic)[0] == SPARSE_HEADER_MAGIC
+
+
+def open_image(path: str, use_mmap: bool = True):
+    # SparseImage для Android sparse образу, інакше BlockSource
+    return SparseImage(path) if is_sparse_image(path) else BlockSource(path, use_mmap)
+
+
+class SparseImage(ReadOnlyView):
+    """
+    Android sparse образ (simg), який читається як розгорнутий образ без
+    simg2img.
+
+    Розбираються лише заголовки фрагментів: RAW читаються з файлу через
+    BlockSource, FILL і DONT_CARE дані генеруються при читанні, CRC32
+    пропускаються. Об'єкт має інтерфейс BlockSource і файлу (як
+    compacted_image.CompactedImage), тож його можна передавати аналізаторам
+    замість шляху. DONT_CARE і нульові FILL повідомляються як діри (holes),
+    інші FILL - як fills, тому гістограма і пошук порожніх регіонів не читають
+    їх зовсім.
+    """
+    def __init__(self, path: str):
+        self._path = path
+        self._source = BlockSource(path)
+        self._parse()
+        self._position = 0
+
+    def _parse(self) -> None:
+        header = self._source.read_block(0, _FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError(f"Файл не є Android sparse образом: {self._path}")
+        (magic, major, _, file_header_size, chunk_header_size, block_size, total_blocks, total_chunks,
+         _) = _FILE_HEADER.unpack(header)
+        if magic != SPARSE_HEADER_MAGIC:
+            raise ValueError(f"Файл не є Android sparse образом: {self._path}")
+        if major != 1 or file_header_size < _FILE_HEADER.size or chunk_header_size < _CHUNK_HEADER.size:
+            raise ValueError(f"Непідтримувана версія sparse формату: {major}")
+
+        self._block_size = block_size
+        starts = [0]
+        types = []
+        file_offsets = []
+        patterns = []
+        position = file_header_size
+        for i in range(total_chunks):
+            chunk_header = self._source.read_block(position, _CHUNK_HEADER.size)
+            if len(chunk_header) < _CHUNK_HEADER.size:
+                raise ValueError(f"Образ обрізаний: фрагмент {i} з {total_chunks}")
+            chunk_type, _, chunk_blocks, total_size = _CHUNK_HEADER.unpack(chunk_header)
+            data_offset = position + chunk_header_size
+            data_size = total_size - chunk_header_size
+            length = chunk_blocks * block_size
+
+            if chunk_type == CHUNK_TYPE_RAW:
+                if data_size != length:
+                    raise ValueError(f"Неправильний розмір RAW фрагмента {i}")
+                pattern = None
+            elif chunk_type == CHUNK_TYPE_FILL:
+                if data_size != 4:
+                    raise ValueError(f"Неправильний розмір FILL фрагмента {i}")
+                pattern = bytes(self._source.read_block(data_offset, 4))
+            elif chunk_type == CHUNK_TYPE_DONT_CARE:
+                pattern = None
+            elif chunk_type == CHUNK_TYPE_CRC32:
+                # Контрольна сума не займає місця в розгорнутому образі
+                position += total_size
+                continue
+            else:
+                raise ValueError(f"Невідомий тип фрагмента 0x{chunk_type:04X}")
+
+            if length:
+                types.append(chunk_type)
+                file_offsets.append(data_offset)
+                patterns.append(pattern)
+                starts.append(starts[-1] + length)
+            position += total_size
+
+        if starts[-1] != total_blocks * block_size:
+            raise ValueError(f"Фрагменти займають {starts[-1] // block_size} блоків замість {total_blocks}")
+
+        self._starts = np.array(starts, dtype=np.int64)
+        self._types = types
+        self._file_offsets = file_offsets
+        self._patterns = patterns
+        self._size = starts[-1]
+
+        ranges = list(zip(starts[:-1], starts[1:]))
+        self._data_extents = sparse_extents.merge([r for r, t in zip(ranges, types) if t == CHUNK_TYPE_RAW])
+        self._holes = sparse_extents.merge([r for r, t, p in zip(ranges, types, patterns)
+                                            if t == CHUNK_TYPE_DONT_CARE or (t == CHUNK_TYPE_FILL and p == bytes(4))])
+        self._fills = [(start, end, p) for (start, end), t, p in zip(ranges, types, patterns)
+                       if t == CHUNK_TYPE_FILL and p != bytes(4)]
+
+    def __reduce__(self):
+        # Процеси пулу розбирають заголовки того ж образу самостійно
+        return self.__class__, (self._path,)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def block_size(self) -> int:
+        return self._block_size
+
+    @property
+    def data_extents(self) -> List[Tuple[int, int]]:
+        # Лише RAW фрагменти; FILL і DONT_CARE описані в holes і fills
+        return self._data_extents
+
+    @property
+    def holes(self) -> List[Tuple[int, int]]:
+        return self._holes
+
+    @property
+    def fills(self) -> List[Tuple[int, int, bytes]]:
+        """
+        Регіони (start, end, шаблон) FILL фрагментів з ненульовим 4-байтовим шаблоном.
+        """
+        return self._fills
+
+    def hole_blocks(self, offset: int, length: int, block_size: int) -> np.ndarray:
+        return sparse_extents.hole_blocks(self._holes, offset, length, block_size)
+
+    def to_original(self, offset):
+        # Зсуви вже відповідають розгорнутому образу
+        offsets = np.asarray(offset, dtype=np.int64)
+        return offsets if offsets.ndim else int(offsets)
+
+    def _extent_index(self, offset: int) -> int:
+        return int(np.searchsorted(self._starts, offset, side="right")) - 1
+
+    def read_block(self, offset: int, block_size: int) -> memoryview:
+        """
+        Блок розгорнутого образу. Блок у межах одного RAW фрагмента повертається
+        без копіювання, інші збираються в новий буфер.
+        """
+        end = min(offset + block_size, self._size)
+        if offset >= end:
+            return memoryview(b"")
+        first = self._extent_index(offset)
+        if end <= self._starts[first + 1] and self._types[first] == CHUNK_TYPE_RAW:
+            return self._source.read_block(int(self._file_offsets[first] + offset - self._starts[first]), end - offset)
+        buffer = bytearray(end - offset)
+        self._copy_into(memoryview(buffer), offset, first)
+        return memoryview(buffer)
+
+    def _copy_into(self, target: memoryview, offset: int, first: int) -> None:
+        data = np.frombuffer(target, dtype=np.uint8)
+        position = 0
+        idx = first
+        while position < len(target):
+            chunk_offset = offset + position - int(self._starts[idx])
+            length = min(len(target) - position, int(self._starts[idx + 1]) - int(self._starts[idx]) - chunk_offset)
+            if self._types[idx] == CHUNK_TYPE_RAW:
+                target[position:position + length] = self._source.read_block(self._file_offsets[idx] + chunk_offset,
+                                                                             length)
+            elif self._types[idx] == CHUNK_TYPE_FILL:
+                # Шаблон повторюється від початку фрагмента
+                phase = chunk_offset % 4
+                pattern = self._patterns[idx][phase:] + self._patterns[idx][:phase]
+                data[position:position + length] = np.resize(np.frombuffer(pattern, dtype=np.uint8), length)
+            else:
+                data[position:position + length] = 0
+            position += length
+            idx += 1
+
+    def close(self):
+        self._source.close()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Модулі проєкту лежать у корені репозиторію
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# parallel_executor створює пул процесів через fork; після паралельних ядер
+# numba (nist_core) з шаром TBB такий процес зависає при завершенні
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import autocorr_test
+
+
+def _reference_autocorrelation(data, max_lag=50):
+    # Попередня реалізація: np.corrcoef окремо для кожного зсуву
+    values = np.frombuffer(data, dtype=np.uint8)
+    values = values - np.mean(values)
+
+    autocorr = []
+    for lag in range(max_lag):
+        if len(values[lag:]) < 2:
+            break
+        correlation = np.corrcoef(values[lag:], values[: -lag if lag > 0 else None])[0, 1]
+        autocorr.append(correlation)
+    return autocorr
+
+
+def _blocks():
+    rng = np.random.default_rng(0)
+    text = (b"Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 80)[:4096]
+    return {
+        "random": rng.integers(0, 256, 4096, dtype=np.uint8).tobytes(),
+        "random_odd": rng.integers(0, 256, 1000, dtype=np.uint8).tobytes(),
+        "text": text,
+        "periodic": bytes([1, 2]) * 2048,
+        # Ненульові дані лише на початку чи в кінці: частина зсувів вироджена
+        "zero_tail": bytes(1024) + b"\x01" * 10,
+        "zero_head": b"\x01" * 10 + bytes(1024),
+        "zero_random_tail": bytes(4000) + rng.integers(0, 256, 60, dtype=np.uint8).tobytes(),
+        "constant_tail": b"\x05" * 3000 + b"\x07" * 5,
+        "zero": bytes(4096),
+        "short": b"ab",
+    }
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("name", sorted(_blocks()))
+def test_autocorrelation_matches_per_lag_corrcoef(name):
+    data = _blocks()[name]
+    expected = _reference_autocorrelation(data)
+    result = autocorr_test.calculate_autocorrelation(data)
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_analyze_block_accepts_arrays_and_keeps_degenerate_lags():
+    data = bytes(1024) + b"\x01" * 10
+    mean_autocorr, _ = autocorr_test.analyze_block(data)
+    assert mean_autocorr == pytest.approx(np.mean(np.abs(_reference_autocorrelation(data)[1:])), abs=1e-9)
+    assert autocorr_test.analyze_block(np.frombuffer(data, dtype=np.uint8))[0] == pytest.approx(mean_autocorr)
+    assert autocorr_test.analyze_block(np.zeros(0, dtype=np.uint8)) == (0.0, False)
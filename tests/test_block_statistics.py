@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import block_statistics
+import byte_histogram
+import kolmogorov_test
+import pearson_criterion
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    # Дані з низькою ентропією, два випадкові блоки поспіль, знову текст, випадковий неповний хвіст
+    return (b"abcd" * 1024 + rng.bytes(8192) + b"text " * 819 + b"t" + rng.bytes(3000))
+
+
+def test_block_statistics_match_whole_file_tests(image):
+    histograms = block_statistics.chunk_block_histograms(image, 4096)
+    statistics = block_statistics.block_statistics(histograms, 4096)
+    assert statistics["offset"].tolist() == [0, 4096, 8192, 12288, 16384]
+    assert statistics["size"].tolist() == [4096, 4096, 4096, 4096, 3000]
+    for i, offset in enumerate(statistics["offset"].tolist()):
+        block = image[offset:offset + 4096]
+        counts = byte_histogram.histogram_of(block)
+        assert statistics["chi_square"][i] == pytest.approx(
+            pearson_criterion.calculate_pearson_criterion("", len(block), counts)[1], rel=1e-12)
+        assert statistics["ks"][i] == pytest.approx(
+            kolmogorov_test.calculate_kolmogorov_smirnov("", len(block), counts, False)[1], rel=1e-12)
+
+
+def test_high_entropy_regions_are_saved_with_the_block_map(image, tmp_path):
+    histograms = block_statistics.chunk_block_histograms(image, 4096)
+    statistics = block_statistics.block_statistics(histograms, 4096)
+    path = str(tmp_path / "image_blocks")
+    # Випадковий хвіст з 3000 байтів має ентропію трохи нижчу за 7.95
+    regions = block_statistics.save_block_map(path, histograms, statistics, 7.95)
+    assert regions == [(4096, 12288)]
+    assert (tmp_path / "image_blocks_high_entropy.txt").read_text() == "4096\t12288\n"
+    assert np.array_equal(np.load(f"{path}.npy"), histograms)
+    assert block_statistics.high_entropy_regions(statistics, 7.0) == [(4096, 12288), (16384, 19384)]
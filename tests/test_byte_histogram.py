@@ -0,0 +1,89 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import byte_histogram
+import kolmogorov_test
+import pearson_criterion
+
+
+def _reference_counter(path, bs):
+    # Попередній підрахунок: Counter по блоках файлу
+    byte_counts = Counter()
+    n = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(bs):
+            n += len(chunk)
+            byte_counts += Counter(chunk)
+    return n, byte_counts
+
+
+def _reference_pearson(n, byte_counts):
+    expected = n / 256
+    chi_square = 0
+    for byte_value in range(256):
+        observed = byte_counts.get(byte_value, 0)
+        chi_square += (observed - expected) ** 2 / expected
+    return chi_square
+
+
+def _reference_ks(n, counter):
+    empirical_cdf = np.zeros(256)
+    cumsum = 0
+    for i in range(256):
+        cumsum += counter.get(i, 0)
+        empirical_cdf[i] = cumsum / n
+    differences = np.abs(empirical_cdf - np.linspace(1 / 256, 1, 256))
+    return np.max(differences), np.argmax(differences)
+
+
+@pytest.fixture(params=["random", "skewed", "text"])
+def image(request, tmp_path):
+    rng = np.random.default_rng(0)
+    if request.param == "random":
+        data = rng.integers(0, 256, 100003, dtype=np.uint8).tobytes()
+    elif request.param == "skewed":
+        # Частина значень байтів не зустрічається зовсім
+        data = np.minimum(rng.geometric(0.05, 70000), 200).astype(np.uint8).tobytes()
+    else:
+        data = b"The quick brown fox jumps over the lazy dog.\n" * 1500
+    path = tmp_path / "image.bin"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_histogram_matches_counter(image):
+    n, byte_counts = _reference_counter(image, 4096)
+    name, size, histogram = byte_histogram.create_histogram(image, 4096)
+    assert (name, size) == (image, n)
+    assert byte_histogram.to_counter(histogram) == byte_counts
+    assert np.array_equal(byte_histogram.as_counts(byte_counts), histogram)
+
+
+def test_statistics_match_counter_versions(image):
+    n, byte_counts = _reference_counter(image, 4096)
+    _, _, histogram = byte_histogram.create_histogram(image, 4096)
+
+    _, chi_square = pearson_criterion.calculate_pearson_criterion(image, n, histogram)
+    assert chi_square == pytest.approx(_reference_pearson(n, byte_counts), rel=1e-12)
+
+    ks_statistic, position = _reference_ks(n, byte_counts)
+    result = kolmogorov_test.calculate_kolmogorov_smirnov(image, n, histogram, False)
+    assert result[1] == pytest.approx(ks_statistic, rel=1e-12)
+    assert result[2] == position
+
+
+def test_entropy_matches_counter_version(image):
+    pytest.importorskip("parted")
+    import mpmath
+    import primary_analysis
+
+    n, byte_counts = _reference_counter(image, 4096)
+    _, _, histogram = byte_histogram.create_histogram(image, 4096)
+    expected = mpmath.mpf(0)
+    for count in byte_counts.values():
+        p = mpmath.fdiv(count, n)
+        expected = mpmath.fadd(expected, mpmath.fmul(p, mpmath.log(p, 2)))
+    # Порядок додавання інший, тож збіг з точністю до округлення
+    assert float(primary_analysis.entropy_estimation(image, n, histogram)[1]) == pytest.approx(float(-expected), rel=1e-12)
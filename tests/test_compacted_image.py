@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from compacted_image import CompactedImage
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "image.bin"
+    data = np.random.default_rng(0).integers(0, 256, 65536, dtype=np.uint8).tobytes()
+    path.write_bytes(data)
+    return str(path), data
+
+
+@pytest.mark.parametrize("extents", [
+    [(0, 4096), (8192, 20000), (32768, 65536)],
+    [(4096, 8192)],
+    # Діапазони не за зростанням, як у логічних розділах super
+    [(40960, 49152), (0, 4096), (12288, 16384)],
+])
+def test_view_reads_extents_and_offsets_round_trip(image, extents):
+    path, data = image
+    with CompactedImage(path, extents) as view:
+        expected = b"".join(data[start:end] for start, end in extents)
+        assert view.size == len(expected)
+        assert view.read() == expected
+        assert view[100:9000] == expected[100:9000]
+        assert b"".join(bytes(block) for _, block in view.blocks(0, 3000)) == expected
+
+        offsets = np.arange(0, view.size, 97, dtype=np.int64)
+        originals = view.to_original(offsets)
+        assert bytes(data[o] for o in originals.tolist()) == bytes(expected[o] for o in offsets.tolist())
+        assert np.array_equal(view.to_compacted(originals), offsets)
+        assert view.to_compacted(view.to_original(int(offsets[-1]))) == int(offsets[-1])
+
+        for start, end in extents:
+            originals = np.arange(start, end, 61, dtype=np.int64)
+            assert np.array_equal(view.to_original(view.to_compacted(originals)), originals)
+
+
+def test_removed_regions_have_no_compacted_offset(image):
+    path, _ = image
+    with CompactedImage(path, [(0, 4096), (8192, 12288)]) as view:
+        with pytest.raises(ValueError):
+            view.to_compacted(4096)
+        with pytest.raises(ValueError):
+            view.to_compacted(np.array([0, 12288]))
+        with pytest.raises(ValueError):
+            view.to_original(view.size + 1)
+        assert view.empty_regions == [(4096, 8192), (12288, 65536)]
+
+
+def test_from_empty_regions_is_inverse_of_empty_regions(image):
+    path, _ = image
+    empty_regions = [(0, 4096), (16384, 20480), (61440, 65536)]
+    with CompactedImage.from_empty_regions(path, empty_regions) as view:
+        assert view.extents == [(4096, 16384), (20480, 61440)]
+        assert view.empty_regions == empty_regions
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import fill_detection
+import prepare
+
+
+def _reference_empty_regions(data, block_size):
+    # Попередній prepare.find_empty_regions: лише нульові блоки, побайтова перевірка
+    empty_regions = []
+    region_start = None
+    for pos in range(0, len(data), block_size):
+        is_empty = all(b == 0 for b in data[pos:pos + block_size])
+        if is_empty and region_start is None:
+            region_start = pos
+        elif not is_empty and region_start is not None:
+            empty_regions.append((region_start, pos))
+            region_start = None
+    if region_start is not None:
+        empty_regions.append((region_start, len(data)))
+    return empty_regions
+
+
+def _random_image(rng, block_size):
+    # Суміш нульових, 0xFF, періодичних блоків і даних; останній блок неповний
+    blocks = []
+    for kind in rng.integers(0, 5, int(rng.integers(1, 60))):
+        if kind <= 1:
+            blocks.append(bytes(block_size))
+        elif kind == 2:
+            blocks.append(b"\xff" * block_size)
+        elif kind == 3:
+            blocks.append((b"abc" * block_size)[:block_size])
+        else:
+            block = bytearray(block_size)
+            block[int(rng.integers(0, block_size))] = int(rng.integers(1, 256))
+            blocks.append(bytes(block))
+    data = b"".join(blocks)
+    return data[:len(data) - int(rng.integers(0, block_size))]
+
+
+@pytest.mark.parametrize("block_size", [512, 4096, 1000])
+def test_default_regions_match_zero_only_scan(tmp_path, block_size):
+    rng = np.random.default_rng(block_size)
+    path = tmp_path / "image.bin"
+    for _ in range(15):
+        data = _random_image(rng, block_size)
+        path.write_bytes(data)
+        # Вікно менше за образ, щоб регіони склеювались між вікнами
+        assert prepare.find_empty_regions(str(path), block_size, window=3 * block_size) == \
+            _reference_empty_regions(data, block_size)
+
+
+def _reference_is_periodic(data, max_period):
+    return any(data[period:] == data[:-period] for period in range(1, min(max_period, len(data) // 2) + 1))
+
+
+def test_patterns_of_every_length_are_periodic():
+    rng = np.random.default_rng(0)
+    for period in list(range(2, 40)) + [100, 255, 384, 512]:
+        pattern = rng.integers(0, 256, period, dtype=np.uint8).tobytes()
+        # Шаблон може починатися з будь-якої фази
+        phase = int(rng.integers(0, period))
+        block = (pattern * (4096 // period + 2))[phase:phase + 4096]
+        assert fill_detection.classify_blocks(block, 4096).tolist() == [fill_detection.PERIODIC]
+        assert fill_detection.fill_kind(pattern) == fill_detection.PERIODIC
+    # Період, довший за max_period, не вважається заповненням
+    pattern = rng.integers(0, 256, 600, dtype=np.uint8).tobytes()
+    assert fill_detection.classify_blocks((pattern * 7)[:4096], 4096).tolist() == [fill_detection.DATA]
+
+
+@pytest.mark.parametrize("block_size", [4096, 1000, 7])
+def test_classification_matches_bytewise_reference(block_size):
+    rng = np.random.default_rng(block_size)
+    blocks = []
+    for _ in range(200):
+        period = int(rng.integers(1, 700))
+        block = bytearray((rng.integers(0, 256, period, dtype=np.uint8).tobytes() * (block_size // period + 1))[:block_size])
+        if rng.random() < 0.3:
+            # Один змінений байт руйнує період
+            block[int(rng.integers(0, block_size))] ^= 1
+        blocks.append(bytes(block))
+    data = b"".join(blocks) + blocks[0][:block_size // 2 + 1]
+
+    kinds = fill_detection.classify_blocks(data, block_size).tolist()
+    for index, start in enumerate(range(0, len(data), block_size)):
+        block = data[start:start + block_size]
+        if len(set(block)) == 1:
+            expected = {0: fill_detection.ZERO, 0xFF: fill_detection.ERASED}.get(block[0], fill_detection.CONSTANT)
+        elif _reference_is_periodic(block, 512):
+            expected = fill_detection.PERIODIC
+        else:
+            expected = fill_detection.DATA
+        assert kinds[index] == expected
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import byte_histogram
+from histogram_index import HistogramIndex
+
+
+def test_range_histogram_matches_reading_the_range(tmp_path):
+    rng = np.random.default_rng(0)
+    data = bytes(5000) + rng.integers(0, 64, 30000, dtype=np.uint8).tobytes() + b"\xff" * 3001
+    image = tmp_path / "image.bin"
+    image.write_bytes(data)
+    HistogramIndex.build(str(image), str(tmp_path / "index"), block_size=4096, bs=8192).close()
+
+    with HistogramIndex.load(str(tmp_path / "index")) as index:
+        # Вирівняні, невирівняні, всередині одного блоку і до кінця образу з неповним блоком
+        for start, end in [(0, len(data)), (4096, 16384), (100, 30000), (5000, 5001), (4097, 8190),
+                           (8191, len(data) + 100), (-5, 10)]:
+            name, n, counts = index.range_histogram(start, end)
+            expected = data[max(0, start):end]
+            assert n == len(expected)
+            assert np.array_equal(counts, byte_histogram.histogram_of(expected))
+        with pytest.raises(ValueError):
+            index.range_histogram(100, 100)
+
+
+def test_index_of_changed_image_is_rejected(tmp_path):
+    image = tmp_path / "image.bin"
+    image.write_bytes(bytes(10000))
+    HistogramIndex.build(str(image), str(tmp_path / "index"), block_size=4096).close()
+    image.write_bytes(bytes(10001))
+    with pytest.raises(ValueError):
+        HistogramIndex.load(str(tmp_path / "index"))
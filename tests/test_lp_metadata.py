@@ -0,0 +1,17 @@
+import numpy as np
+
+from lp_metadata import LogicalPartitionView
+
+
+def test_zero_extents_read_as_holes_without_image_offsets(tmp_path):
+    path = tmp_path / "super.bin"
+    data = np.random.default_rng(0).integers(1, 256, 32768, dtype=np.uint8).tobytes()
+    path.write_bytes(data)
+    # ZERO діапазон зберігається як (0, довжина) і не є місцем в образі
+    with LogicalPartitionView(str(path), "system_a", [(16384, 20480), (0, 8192), (4096, 8192)],
+                              [False, True, False]) as view:
+        assert view.read() == data[16384:20480] + bytes(8192) + data[4096:8192]
+        assert view.holes == [(4096, 12288)]
+        assert view.to_original(np.array([0, 4095, 4096, 12287, 12288, 16383])).tolist() == \
+            [16384, 20479, -1, -1, 4096, 8191]
+        assert view.to_compacted(np.array([16384, 4096, 8191])).tolist() == [0, 12288, 16383]
@@ -0,0 +1,245 @@
+from math import fabs, floor, log, sqrt
+
+import numpy as np
+import pytest
+import scipy.fftpack as sff
+from scipy.special import erfc, gammaincc
+from scipy.stats import norm
+
+import nist_core
+
+# Порти тестів randomness_testsuite над рядками '0'/'1', з якими порівнюється nist_core
+
+
+def _monobit_test(binary_data):
+    count = binary_data.count('1') - binary_data.count('0')
+    p_value = erfc(fabs(count / sqrt(len(binary_data))) / sqrt(2))
+    return p_value, p_value >= 0.01
+
+
+def _block_frequency(binary_data, block_size=128):
+    n = len(binary_data)
+    if n < block_size:
+        block_size = n
+    number_of_blocks = floor(n / block_size)
+    if number_of_blocks == 1:
+        return _monobit_test(binary_data[0:block_size])
+    proportion_sum = 0.0
+    for counter in range(number_of_blocks):
+        block = binary_data[counter * block_size:(counter + 1) * block_size]
+        proportion_sum += pow(block.count('1') / block_size - 0.5, 2.0)
+    p_value = gammaincc(number_of_blocks / 2, 4.0 * block_size * proportion_sum / 2)
+    return p_value, p_value >= 0.01
+
+
+def _run_test(binary_data):
+    n = len(binary_data)
+    pi = binary_data.count('1') / n
+    if abs(pi - 0.5) >= 2 / sqrt(n):
+        return 0.0000, False
+    v_obs = sum(1 for item in range(1, n) if binary_data[item] != binary_data[item - 1]) + 1
+    p_value = erfc(abs(v_obs - (2 * n * pi * (1 - pi))) / (2 * sqrt(2 * n) * pi * (1 - pi)))
+    return p_value, p_value > 0.01
+
+
+def _longest_one_block_test(binary_data):
+    n = len(binary_data)
+    if n < 128:
+        return 0.00000, False, 'Error: Not enough data to run this test'
+    elif n < 6272:
+        k, m, v_values = 3, 8, [1, 2, 3, 4]
+        pi_values = [0.21484375, 0.3671875, 0.23046875, 0.1875]
+    elif n < 750000:
+        k, m, v_values = 5, 128, [4, 5, 6, 7, 8, 9]
+        pi_values = [0.1174035788, 0.242955959, 0.249363483, 0.17517706, 0.102701071, 0.112398847]
+    else:
+        k, m, v_values = 6, 10000, [10, 11, 12, 13, 14, 15, 16]
+        pi_values = [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727]
+    number_of_blocks = floor(n / m)
+    frequencies = np.zeros(k + 1)
+    for counter in range(number_of_blocks):
+        block = binary_data[counter * m:(counter + 1) * m]
+        max_run_count = max(len(run) for run in block.split('0'))
+        if max_run_count < v_values[0]:
+            frequencies[0] += 1
+        for j in range(k):
+            if max_run_count == v_values[j]:
+                frequencies[j] += 1
+        if max_run_count > v_values[k - 1]:
+            frequencies[k] += 1
+    xObs = 0
+    for count in range(len(frequencies)):
+        xObs += pow(frequencies[count] - number_of_blocks * pi_values[count], 2.0) / (number_of_blocks * pi_values[count])
+    p_value = gammaincc(float(k / 2), float(xObs / 2))
+    return p_value, p_value > 0.01
+
+
+def _spectral_test(binary_data):
+    n = len(binary_data)
+    plus_minus_one = [1 if char == '1' else -1 for char in binary_data]
+    modulus = abs(sff.fft(plus_minus_one)[0:n // 2])
+    tau = sqrt(log(1 / 0.05) * n)
+    n0 = 0.95 * (n / 2)
+    n1 = len(np.where(modulus < tau)[0])
+    d = (n1 - n0) / sqrt(n * 0.95 * 0.05 / 4)
+    p_value = erfc(fabs(d) / sqrt(2))
+    return p_value, p_value >= 0.01
+
+
+def _cumulative_sums_test(binary_data, mode=0):
+    n = len(binary_data)
+    if mode != 0:
+        binary_data = binary_data[::-1]
+    counts = np.cumsum([1 if char == '1' else -1 for char in binary_data])
+    abs_max = max(abs(counts))
+    start, end = int(floor(0.25 * floor(-n / abs_max) + 1)), int(floor(0.25 * floor(n / abs_max) - 1))
+    terms_one = [norm.cdf((4 * k + 1) * abs_max / sqrt(n)) - norm.cdf((4 * k - 1) * abs_max / sqrt(n))
+                 for k in range(start, end + 1)]
+    start, end = int(floor(0.25 * floor(-n / abs_max - 3))), int(floor(0.25 * floor(n / abs_max) - 1))
+    terms_two = [norm.cdf((4 * k + 3) * abs_max / sqrt(n)) - norm.cdf((4 * k + 1) * abs_max / sqrt(n))
+                 for k in range(start, end + 1)]
+    p_value = 1.0 - sum(np.array(terms_one))
+    p_value += sum(np.array(terms_two))
+    return p_value, p_value >= 0.01
+
+
+def _samples():
+    rng = np.random.default_rng(3)
+    return {
+        "random_small": rng.bytes(100),
+        "random": rng.bytes(4096),
+        "random_large": rng.bytes(131072),
+        "half_zero": bytes(4096) + rng.bytes(4096),
+        "biased": (np.frombuffer(rng.bytes(20000), np.uint8) & 0xF7).tobytes(),
+        "text": b"abc" * 3000,
+    }
+
+
+def _core_results(bits):
+    return [
+        nist_core.monobit_test(bits),
+        nist_core.block_frequency(bits),
+        nist_core.run_test(bits),
+        nist_core.longest_one_block_test(bits),
+        nist_core.spectral_test(bits),
+        nist_core.cumulative_sums_test(bits, 0),
+        nist_core.cumulative_sums_test(bits, 1),
+    ]
+
+
+def _reference_results(binary_data):
+    return [
+        _monobit_test(binary_data),
+        _block_frequency(binary_data),
+        _run_test(binary_data),
+        _longest_one_block_test(binary_data),
+        _spectral_test(binary_data),
+        _cumulative_sums_test(binary_data, 0),
+        _cumulative_sums_test(binary_data, 1),
+    ]
+
+
+def test_bits_are_msb_first_in_file_order():
+    assert nist_core.to_str(nist_core.to_bits(b"\x01\x80")) == "0000000110000000"
+    assert nist_core.to_str(nist_core.to_bits("A")) == "01000001"
+
+
+@pytest.mark.parametrize("name", sorted(_samples()))
+def test_core_tests_match_reference(name):
+    bits = nist_core.to_bits(_samples()[name])
+    for result, expected in zip(_core_results(bits), _reference_results(nist_core.to_str(bits))):
+        assert result[0] == pytest.approx(expected[0], rel=1e-12, abs=1e-15)
+        assert result[1:] == expected[1:]
+
+
+def test_verdict_row_matches_randomness_testsuite():
+    pytest.importorskip("randomness_testsuite")
+    from randomness_testsuite import CumulativeSum, FrequencyTest, RunTest, Spectral
+
+    freq, runs, fft, cusum = (FrequencyTest.FrequencyTest(), RunTest.RunTest(), Spectral.SpectralTest(),
+                              CumulativeSum.CumulativeSums())
+    for data in _samples().values():
+        bits = nist_core.to_bits(data)
+        binary_data = nist_core.to_str(bits)
+        expected = [
+            freq.monobit_test(binary_data),
+            freq.block_frequency(binary_data),
+            runs.run_test(binary_data),
+            runs.longest_one_block_test(binary_data),
+            fft.spectral_test(binary_data),
+            cusum.cumulative_sums_test(binary_data, 0),
+            cusum.cumulative_sums_test(binary_data, 1),
+        ]
+        assert [result[1] for result in _core_results(bits)] == [result[1] for result in expected]
+
+
+def _berlekamp_massey_algorithm(block_data):
+    # ComplexityTest.berlekamp_massey_algorithm з randomness_testsuite
+    n = len(block_data)
+    c = np.zeros(n)
+    b = np.zeros(n)
+    c[0], b[0] = 1, 1
+    l, m, i = 0, -1, 0
+    int_data = [int(el) for el in block_data]
+    while i < n:
+        v = int_data[(i - l):i]
+        v = v[::-1]
+        cc = c[1:l + 1]
+        d = (int_data[i] + np.dot(v, cc)) % 2
+        if d == 1:
+            temp = np.copy(c)
+            p = np.zeros(n)
+            for j in range(0, l):
+                if b[j] == 1:
+                    p[j + i - m] = 1
+            c = (c + p) % 2
+            if l <= 0.5 * i:
+                l = i + 1 - l
+                m = i
+                b = temp
+        i += 1
+    return l
+
+
+def _linear_complexity_test(binary_data, block_size=500):
+    n = len(binary_data)
+    pi = [0.01047, 0.03125, 0.125, 0.5, 0.25, 0.0625, 0.020833]
+    t2 = (block_size / 3.0 + 2.0 / 9) / 2 ** block_size
+    mean = 0.5 * block_size + (1 / 36) * (9 + (-1) ** (block_size + 1)) - t2
+    number_of_blocks = int(n / block_size)
+    if number_of_blocks > 1:
+        blocks = [binary_data[i * block_size:(i + 1) * block_size] for i in range(number_of_blocks)]
+        complexities = [_berlekamp_massey_algorithm(block) for block in blocks]
+        t = [-1.0 * (((-1) ** block_size) * (chunk - mean) + 2.0 / 9) for chunk in complexities]
+        vg = np.histogram(t, bins=[-9999999999, -2.5, -1.5, -0.5, 0.5, 1.5, 2.5, 9999999999])[0][::-1]
+        im = [((vg[ii] - number_of_blocks * pi[ii]) ** 2) / (number_of_blocks * pi[ii]) for ii in range(7)]
+        xObs = 0.0
+        for i in range(len(pi)):
+            xObs += im[i]
+        p_value = gammaincc(6 / 2.0, xObs / 2.0)
+        return p_value, p_value >= 0.01
+    return -1.0, False
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 63, 64, 65, 128, 500, 1000])
+def test_linear_complexities_match_reference(block_size):
+    rng = np.random.default_rng(block_size)
+    blocks = [rng.integers(0, 2, block_size, dtype=np.uint8) for _ in range(25)]
+    # Крайні випадки: сталі блоки, одна одиниця на початку чи в кінці, періодичний і зміщений блоки
+    for position in (0, -1):
+        block = np.zeros(block_size, dtype=np.uint8)
+        block[position] = 1
+        blocks.append(block)
+    blocks += [np.zeros(block_size, dtype=np.uint8), np.ones(block_size, dtype=np.uint8),
+               np.tile(np.array([1, 1, 0], dtype=np.uint8), block_size)[:block_size]]
+    blocks += [(rng.random(block_size) < 0.05).astype(np.uint8) for _ in range(10)]
+
+    complexities = nist_core.linear_complexities(np.concatenate(blocks), block_size)
+    expected = [_berlekamp_massey_algorithm(nist_core.to_str(block)) for block in blocks]
+    assert complexities.tolist() == expected
+
+
+@pytest.mark.parametrize("size", [100, 4096, 8192])
+def test_linear_complexity_test_matches_reference(size):
+    bits = nist_core.to_bits(np.random.default_rng(size).bytes(size))
+    assert nist_core.linear_complexity_test(bits) == _linear_complexity_test(nist_core.to_str(bits))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import parallel_executor
+import signature_db
+import signature_engine
+from signature_index import SignatureIndex
+
+
+def test_split_ranges_cover_image_on_aligned_bounds():
+    for size, n_shards, alignment in [(1, 4, 4096), (4096, 4, 4096), (100000, 7, 4096), (1 << 20, 16, 65536)]:
+        ranges = parallel_executor.split_ranges(size, n_shards, alignment)
+        assert ranges[0][0] == 0 and ranges[-1][1] == size
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(start % alignment == 0 for start, _ in ranges)
+        assert len(ranges) <= n_shards
+
+
+def test_merge_moments_matches_single_pass():
+    values = np.random.default_rng(0).normal(3.0, 2.0, 1000)
+    merged = (0, 0.0, 0.0)
+    # Шарди різного розміру, зокрема порожні
+    for part in np.split(values, [0, 1, 10, 10, 400, 999]):
+        merged = parallel_executor.merge_moments(merged, parallel_executor.moments(part.tolist()))
+    n, mean, m2 = parallel_executor.moments(values.tolist())
+    assert merged[0] == n
+    assert merged[1] == pytest.approx(mean, rel=1e-12)
+    assert merged[2] == pytest.approx(m2, rel=1e-12)
+    assert np.sqrt(merged[2] / merged[0]) == pytest.approx(np.std(values), rel=1e-12)
+
+
+def test_merge_regions_joins_regions_across_shard_edges():
+    regions = []
+    parallel_executor.merge_regions(regions, [(0, 4096), (8192, 12288)])
+    # Регіон до кінця шарда продовжується на початку наступного
+    parallel_executor.merge_regions(regions, [(12288, 16384)])
+    parallel_executor.merge_regions(regions, [])
+    parallel_executor.merge_regions(regions, [(20480, 24576), (24576, 28672)])
+    parallel_executor.merge_regions(regions, [(32768, 36864)])
+    assert regions == [(0, 4096), (8192, 16384), (20480, 28672), (32768, 36864)]
+
+
+# Сигнатури з бази: JBIG2, Blender, Alzip (короткий, для ланцюжка збігів)
+_PLANTED = [bytes.fromhex("974a42320d0a1a0a"), bytes.fromhex("424c454e444552"), bytes.fromhex("414c5a") * 3]
+
+
+def _image_with_signatures_on_shard_edges(path, size, shard_size):
+    data = bytearray(np.random.default_rng(1).integers(0, 256, size, dtype=np.uint8).tobytes())
+    for edge in range(shard_size, size, shard_size):
+        for shift, signature in zip((-3, -1, -5), _PLANTED):
+            position = edge + shift + (edge // shard_size % 2) * 2
+            data[position:position + len(signature)] = signature
+    path.write_bytes(bytes(data))
+    return bytes(data)
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_sharded_signatures_match_single_scan(tmp_path, monkeypatch, backend):
+    monkeypatch.chdir(tmp_path)
+    image = tmp_path / "image.bin"
+    # 2 потоки -> 8 шардів по 8 КіБ
+    data = _image_with_signatures_on_shard_edges(image, 65536, 8192)
+    matcher = signature_db.get_matcher(None, cache_dir=None)
+
+    # Послідовний аналіз читає образ блоками по bs
+    scanner = signature_engine.SignatureScanner(matcher, record_hits=True)
+    for start in range(0, len(data), 4096):
+        scanner.feed(data[start:start + 4096])
+    scanner.finish()
+    expected_offsets, expected_ids = scanner.hits()
+    assert len(expected_offsets) >= 3 * 7
+
+    index_path = str(tmp_path / "image.bin_signatures")
+    results = parallel_executor.run_sharded_analysis(str(image), 4096, 4096, 4096, 2, backend, ("signatures",),
+                                                     index_path)
+    assert results["Signatures"] == scanner.totals()
+
+    index = SignatureIndex.load(index_path)
+    expected = SignatureIndex.build(matcher.names, expected_offsets, expected_ids)
+    assert index.hits_in_range(0, len(data)) == expected.hits_in_range(0, len(data))
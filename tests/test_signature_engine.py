@@ -0,0 +1,32 @@
+import numpy as np
+
+import signature_db
+import signature_engine
+
+# Сигнатури з бази: JBIG2, Blender, Alzip (короткий, для ланцюжка збігів)
+_PLANTED = [bytes.fromhex("974a42320d0a1a0a"), bytes.fromhex("424c454e444552"), bytes.fromhex("414c5a") * 3]
+
+
+def test_signature_scanner_is_independent_of_chunk_size():
+    # Хвіст після .+ шукається в межах вікна, тож для незалежності від блоків він виключений
+    matcher = signature_engine.SignatureMatcher({name: pattern for name, pattern in signature_db.load_signatures().items()
+                                                 if ".+" not in pattern})
+    rng = np.random.default_rng(2)
+    data = bytearray(rng.integers(0, 256, 20000, dtype=np.uint8).tobytes())
+    for position in range(0, len(data) - 16, 997):
+        signature = _PLANTED[position % len(_PLANTED)]
+        data[position:position + len(signature)] = signature
+    data = bytes(data)
+
+    def scan(chunk_size):
+        scanner = signature_engine.SignatureScanner(matcher, record_hits=True)
+        for start in range(0, len(data), chunk_size):
+            scanner.feed(data[start:start + chunk_size])
+        scanner.finish()
+        offsets, ids = scanner.hits()
+        # Збіги записуються в порядку обробки кандидатів, тому порівнюються відсортованими
+        return scanner.totals(), sorted(zip(offsets.tolist(), ids.tolist()))
+
+    expected = scan(len(data))
+    for chunk_size in (1, 7, 64, 4096):
+        assert scan(chunk_size) == expected
@@ -0,0 +1,25 @@
+import numpy as np
+
+import signature_db
+from signature_index import SignatureIndex
+
+
+def test_hits_of_family_resolves_groups_and_survives_save(tmp_path):
+    families = signature_db.signature_families()
+    names = [next(name for name, family in families.items() if family == wanted)
+             for wanted in ("image", "audio", "archive", "video")]
+    offsets = np.array([50, 10, 40, 20, 30, 60], dtype=np.int64)
+    ids = np.array([0, 1, 2, 3, 0, 2])
+    SignatureIndex.build(names, offsets, ids).save(str(tmp_path / "index"))
+    index = SignatureIndex.load(str(tmp_path / "index"))
+
+    assert index.families == ["image", "audio", "archive", "video"]
+    assert index.hits_of_family("image").tolist() == [30, 50]
+    assert index.hits_of_family("media").tolist() == [10, 20, 30, 50]
+    assert index.hits_of_family(["archive", "audio"]).tolist() == [10, 40, 60]
+    assert index.hits_of_family("font").tolist() == []
+
+
+def test_hits_without_image_offset_are_not_indexed():
+    index = SignatureIndex.build(["a", "b"], np.array([-1, 5, -1, 7]), np.array([0, 1, 1, 0]), ["image", "audio"])
+    assert index.hits_in_range(0, 100) == [(5, "b"), (7, "a")]
@@ -0,0 +1,106 @@
+import struct
+
+import numpy as np
+import pytest
+
+import byte_histogram
+import fill_detection
+import sparse_image
+from block_source import BlockSource
+
+BLOCK_SIZE = 4096
+
+
+def _write_sparse(path, chunks):
+    """
+    Android sparse образ з фрагментів (тип, кількість блоків, дані) і його
+    розгорнутий вміст.
+    """
+    body = b""
+    expanded = b""
+    total_blocks = 0
+    for chunk_type, blocks, payload in chunks:
+        body += struct.pack("<HHII", chunk_type, 0, blocks, 12 + len(payload)) + payload
+        if chunk_type == sparse_image.CHUNK_TYPE_RAW:
+            expanded += payload
+        elif chunk_type == sparse_image.CHUNK_TYPE_FILL:
+            expanded += payload * (blocks * BLOCK_SIZE // 4)
+        elif chunk_type == sparse_image.CHUNK_TYPE_DONT_CARE:
+            expanded += bytes(blocks * BLOCK_SIZE)
+        total_blocks += blocks
+    header = struct.pack("<IHHHHIIII", sparse_image.SPARSE_HEADER_MAGIC, 1, 0, 28, 12, BLOCK_SIZE, total_blocks,
+                         len(chunks), 0)
+    path.write_bytes(header + body)
+    return expanded
+
+
+@pytest.fixture
+def images(tmp_path):
+    rng = np.random.default_rng(0)
+    text = (b"partition table " * 512)[:2 * BLOCK_SIZE]
+    chunks = [
+        (sparse_image.CHUNK_TYPE_RAW, 3, rng.integers(0, 256, 3 * BLOCK_SIZE, dtype=np.uint8).tobytes()),
+        (sparse_image.CHUNK_TYPE_FILL, 2, b"\x00\x00\x00\x00"),
+        (sparse_image.CHUNK_TYPE_RAW, 2, text),
+        (sparse_image.CHUNK_TYPE_CRC32, 0, b"\x12\x34\x56\x78"),
+        (sparse_image.CHUNK_TYPE_FILL, 3, b"\xde\xad\xbe\xef"),
+        (sparse_image.CHUNK_TYPE_DONT_CARE, 4, b""),
+        (sparse_image.CHUNK_TYPE_FILL, 1, b"\xff\xff\xff\xff"),
+        (sparse_image.CHUNK_TYPE_RAW, 1, bytes(BLOCK_SIZE)),
+    ]
+    simg = tmp_path / "image.simg"
+    raw = tmp_path / "image.raw"
+    raw.write_bytes(_write_sparse(simg, chunks))
+    return str(simg), str(raw)
+
+
+def test_sparse_image_reads_as_expanded_image(images):
+    simg, raw = images
+    with open(raw, "rb") as file:
+        expected = file.read()
+    assert sparse_image.is_sparse_image(simg) and not sparse_image.is_sparse_image(raw)
+    with sparse_image.SparseImage(simg) as image:
+        assert image.size == len(expected)
+        assert image.read() == expected
+        for offset, length in [(0, 1), (100, 5000), (3 * BLOCK_SIZE - 7, 20), (6 * BLOCK_SIZE + 3, 9000),
+                               (len(expected) - 10, 100)]:
+            assert bytes(image.read_block(offset, length)) == expected[offset:offset + length]
+            image.seek(offset)
+            buffer = bytearray(length)
+            n = image.readinto(buffer)
+            assert bytes(buffer[:n]) == expected[offset:offset + length]
+        assert b"".join(bytes(block) for _, block in image.blocks(0, 3000)) == expected
+
+
+def test_sparse_image_describes_chunks(images):
+    simg, _ = images
+    with sparse_image.SparseImage(simg) as image:
+        assert image.data_extents == [(0, 3 * BLOCK_SIZE), (5 * BLOCK_SIZE, 7 * BLOCK_SIZE),
+                                      (15 * BLOCK_SIZE, 16 * BLOCK_SIZE)]
+        assert image.holes == [(3 * BLOCK_SIZE, 5 * BLOCK_SIZE), (10 * BLOCK_SIZE, 14 * BLOCK_SIZE)]
+        assert image.fills == [(7 * BLOCK_SIZE, 10 * BLOCK_SIZE, b"\xde\xad\xbe\xef"),
+                               (14 * BLOCK_SIZE, 15 * BLOCK_SIZE, b"\xff\xff\xff\xff")]
+
+
+def test_sparse_image_analysis_matches_expanded_image(images):
+    simg, raw = images
+    with sparse_image.SparseImage(simg) as image:
+        _, n, counter = byte_histogram.create_histogram(image, 8192)
+    _, raw_n, raw_counter = byte_histogram.create_histogram(raw, 8192)
+    assert n == raw_n
+    assert np.array_equal(counter, raw_counter)
+
+    for kinds in [("zero",), ("zero", "erased"), tuple(fill_detection.FILL_KINDS)]:
+        mask = fill_detection.resolve_kinds(kinds)
+        with sparse_image.SparseImage(simg) as image, BlockSource(raw) as source:
+            assert fill_detection.scan_empty_regions(image, 0, image.size, BLOCK_SIZE, mask) == \
+                fill_detection.scan_empty_regions(source, 0, source.size, BLOCK_SIZE, mask)
+
+
+def test_truncated_sparse_image_is_rejected(images, tmp_path):
+    simg, _ = images
+    truncated = tmp_path / "truncated.simg"
+    with open(simg, "rb") as file:
+        truncated.write_bytes(file.read()[:28 + 12 + 100])
+    with pytest.raises(ValueError):
+        sparse_image.SparseImage(str(truncated))